@@ -1,137 +1,333 @@
 #!/usr/bin/python3
+"""
+Assembler for B322 assembly code.
+Can be used from the command line (see getArguments), or imported as library:
 
+    import Assembler
+    program = Assembler.assemble(pathlib.Path("code.asm"))
+    program.binary(pad=4096)
+
+Errors are raised as AssemblerError.
+"""
+
+import io
+import os
 import sys
+import pickle
+import struct
+import hashlib
+import pathlib
+import argparse
 import CompileInstruction
 
-#List of already inserted libraries. 
-#To prevent multiple insertions of the same library.
-#Global to allow access in recursion
-libraryList = []
+#Directory next to each library where its compiled lines are cached
+CACHE_DIR = "__asmcache__"
+
+#maximum depth of macros that use other macros
+MAX_MACRO_DEPTH = 64
+
+#instructions that jump relative to their own address, with a function that returns the offset from the instruction word
+RELATIVE_JUMPS = {
+    "beq"   : lambda word: word >> 12 & 0xFFFF,
+    "bne"   : lambda word: word >> 12 & 0xFFFF,
+    "bgt"   : lambda word: word >> 12 & 0xFFFF,
+    "bge"   : lambda word: word >> 12 & 0xFFFF,
+    "jumpo" : lambda word: word >> 1 & 0x7FFFFFF,
+}
+
+#Error that is raised when the code cannot be assembled
+#fileName, lineNumber and line are set when the error belongs to a line of the source code
+class AssemblerError(Exception):
+    def __init__(self, message, fileName=None, lineNumber=None, line=None):
+        super().__init__(message)
+        self.message = message
+        self.fileName = fileName
+        self.lineNumber = lineNumber
+        self.line = line
+
+    #returns the error in the format that is printed by the assembler
+    def report(self):
+        if self.line is None:
+            return "Error: " + self.message
+        return "Error in line " + str(self.lineNumber) + ": " + self.line + "\nThe error is: " + self.message
+
+#Result of assembling a program
+class AssembledProgram:
+    def __init__(self, instructions, symbols):
+        self.words = [line.word for line in instructions]                               #instruction words
+        self.comments = [line.comment for line in instructions]                         #comment of each word
+        self.lines = [(line.fileName, line.lineNumber) for line in instructions]        #source file and line of each word
+        self.symbols = symbols                                                          #map of labels to addresses
+
+    #returns the program as text lines with comments
+    def text(self):
+        return "".join([CompileInstruction.formatWord(word, comment) + "\n" for word, comment in zip(self.words, self.comments)])
+
+    #returns the program as big endian 32 bit words
+    #if pad is given, the result is padded with 0xFF bytes until its size is a multiple of pad
+    def binary(self, pad=0):
+        binary = struct.pack(">" + str(len(self.words)) + "I", *self.words)
+
+        if pad > 0 and len(binary) % pad != 0:
+            binary += b"\xFF" * (pad - len(binary) % pad)
+
+        return binary
+
+#Maps labels to addresses
+#Global labels start a new scope for local labels (.name), which are stored as global.name
+#Numeric labels (like 1:) can be defined multiple times, and are referenced by 1f (next) or 1b (previous)
+class SymbolTable:
+    def __init__(self):
+        self.addresses = {}         #map of full label names to addresses
+        self.scope = None           #last global label
+        self.numericCount = {}      #number of definitions of each numeric label so far
+
+    #returns the full name of a local label
+    def local(self, name):
+        if self.scope is None:
+            raise ValueError("local label " + name + " has no global label above it")
+        return self.scope + name
+
+    #returns the full name of a label definition, and updates the scope
+    def define(self, name):
+        if name.isdigit():
+            count = self.numericCount.get(name, 0)
+            self.numericCount[name] = count + 1
+            return name + "@" + str(count)
+
+        if name[0] == ".":
+            return self.local(name)
+
+        self.scope = name
+        return name
+
+    #returns the full name of a label reference
+    def reference(self, name):
+        if name[0] == ".":
+            return self.local(name)
+
+        if len(name) > 1 and name[:-1].isdigit() and name[-1] in ("f", "b"):
+            count = self.numericCount.get(name[:-1], 0)
+            if name[-1] == "b":
+                if count == 0:
+                    raise ValueError("label " + name + " has no definition above it")
+                count = count - 1
+            return name[:-1] + "@" + str(count)
+
+        return name
+
+#Instruction record that is passed between the passes.
+#The source line is split only once, after that each pass works on these records.
+#word is None as long as the instruction still has a label as argument.
+class Instruction:
+    __slots__ = ("fileName", "lineNumber", "mnemonic", "args", "address", "labels", "word", "comment", "optional")
+
+    def __init__(self, lineNumber, mnemonic, args, word=None, comment=""):
+        self.fileName = None            #source file, set by passOne
+        self.lineNumber = lineNumber    #line number in the source file
+        self.mnemonic = mnemonic        #lowercase mnemonic
+        self.args = args                #list of arguments
+        self.address = 0                #address in the assembled program
+        self.labels = ()                #labels that point to this instruction
+        self.word = word                #compiled instruction word
+        self.comment = comment          #comment for the text output
+        self.optional = False           #can be removed if the highest 16 bits of its label value are 0
+
+    #returns the words of the instruction line
+    def line(self):
+        return [self.mnemonic] + self.args
+
+#Source file that is assembled as a whole
+#libraries are cached per fragment, so only changed files have to be compiled again
+class Fragment:
+    __slots__ = ("fileName", "text", "lines")
+
+    def __init__(self, fileName, text, lines):
+        self.fileName = fileName        #name of the source file
+        self.text = text                #content of the source file
+        self.lines = lines              #parsed lines as (line number, words)
+
+#joins the words of expressions that are written with spaces, like "label - other"
+#a word is joined with the previous word if it is a binary operator or starts with ')',
+#or if the previous word ends with an operator or '('
+def joinExpressions(words):
+    joinedWords = []
+    for word in words:
+        if joinedWords and (word in CompileInstruction.BINARY_OPERATORS or word[0] == ")" or joinedWords[-1][-1] in CompileInstruction.OPERATOR_CHARS and joinedWords[-1][-1] != ")"):
+            joinedWords[-1] = joinedWords[-1] + word
+        else:
+            joinedWords.append(word)
+    return joinedWords
 
-def parseLines(fileName):
+def parseLines(text):
     parsedLines = []
-    with open(fileName, 'r') as f:
-        for i, line in enumerate(f, start=1):
-            # do something special in case of a .ds instruction
-            if (len(line) > 4 and line.split(" ",maxsplit=1)[0] == ".ds"):
-                parsedLines.append((i, ['.ds', line.split(" ",maxsplit=1)[1].rstrip('\n')]))
-            else:
-                parsedLine = line.strip().split(";",maxsplit=1)[0].split()
-                if (parsedLine != []):
-                    parsedLines.append((i, parsedLine))
+    for i, line in enumerate(io.StringIO(text), start=1):
+        # do something special in case of a .ds instruction
+        if (len(line) > 4 and line.split(" ",maxsplit=1)[0] == ".ds"):
+            parsedLines.append((i, ['.ds', line.split(" ",maxsplit=1)[1].rstrip('\n')]))
+        else:
+            parsedLine = line.strip().split(";",maxsplit=1)[0].split()
+            if (parsedLine != []):
+                parsedLines.append((i, joinExpressions(parsedLine)))
     return parsedLines
 
-def insertLibraries(parsedLines):
-    returnList = []
-    returnList.extend(parsedLines)
-
-    for line in parsedLines:
+def parseFile(fileName):
+    with open(fileName, 'r') as f:
+        text = f.read()
+    return Fragment(fileName, text, parseLines(text))
+
+#returns the path of an included file by searching the include paths
+def findLibrary(fileName, includePaths):
+    for path in includePaths:
+        fullName = os.path.join(path, fileName)
+        if os.path.isfile(fullName):
+            return fullName
+    return None
+
+#returns a list of fragments with all included libraries in front of the given fragment
+#libraryList contains the already inserted libraries, to prevent multiple insertions of the same library
+def insertLibraries(fragment, libraryList, includePaths):
+    insertLists = []
+
+    for line in fragment.lines:
         if (len(line[1]) == 2):
             if (line[1][0]) == "`include":
                 if (line[1][1] not in libraryList):
                     libraryList.append(line[1][1])
-                    insertList = insertLibraries(parseLines(line[1][1])) #recursion to include libraries within libraries
-                    for i in range(len(insertList)): 
-                        returnList.insert(i, insertList[i]) 
+                    fileName = findLibrary(line[1][1], includePaths)
+                    try:
+                        library = parseFile(fileName)
+                    except (OSError, TypeError):
+                        raise AssemblerError("Could not read included file " + line[1][1], fragment.fileName, line[0], " ".join(line[1]))
+                    insertLists.append(insertLibraries(library, libraryList, includePaths)) #recursion to include libraries within libraries
+
+    #the last included library ends up first
+    returnList = []
+    for insertList in reversed(insertLists):
+        returnList.extend(insertList)
+    returnList.append(fragment)
 
     return returnList
 
+#compiles a line into a list of instruction records
+#instructions with a label as argument are compiled in pass two
+def compileLine(line, lineNumber=0):
+    mnemonic = line[0].lower()
 
-def compileLine(line):
-    compiledLine = ""
-
-    #check what kind of instruction this line is
-    switch = {
-        "halt"      : CompileInstruction.compileHalt,
-        "read"      : CompileInstruction.compileRead,
-        "write"     : CompileInstruction.compileWrite,
-        "copy"      : CompileInstruction.compileCopy,
-        "push"      : CompileInstruction.compilePush,
-        "pop"       : CompileInstruction.compilePop,
-        "jump"      : CompileInstruction.compileJump,
-        "jumpo"     : CompileInstruction.compileJumpo,
-        "jumpr"     : CompileInstruction.compileJumpr,
-        "jumpro"    : CompileInstruction.compileJumpro,
-        "load"      : CompileInstruction.compileLoad,
-        "loadhi"    : CompileInstruction.compileLoadhi,
-        "beq"       : CompileInstruction.compileBeq,
-        "bne"       : CompileInstruction.compileBne,
-        "bgt"       : CompileInstruction.compileBgt,
-        "bge"       : CompileInstruction.compileBge,
-        "savpc"     : CompileInstruction.compileSavpc,
-        "reti"      : CompileInstruction.compileReti,
-        "or"        : CompileInstruction.compileOr,
-        "and"       : CompileInstruction.compileAnd,
-        "xor"       : CompileInstruction.compileXor,
-        "add"       : CompileInstruction.compileAdd,
-        "sub"       : CompileInstruction.compileSub,
-        "shiftl"    : CompileInstruction.compileShiftl,
-        "shiftr"    : CompileInstruction.compileShiftr,
-        "mult"      : CompileInstruction.compileMult,
-        "not"       : CompileInstruction.compileNot,
-        "addr2reg"  : CompileInstruction.compileAddr2reg,
-        "load32"    : CompileInstruction.compileLoad32,
-        "nop"       : CompileInstruction.compileNop,
-        ".dw"       : CompileInstruction.compileDw,
-        ".dd"       : CompileInstruction.compileDd,
-        ".db"       : CompileInstruction.compileDb,
-        ".ds"       : CompileInstruction.compileDs,
-        "loadlabellow" : CompileInstruction.compileLoadLabelLow,
-        "loadlabelhigh" : CompileInstruction.compileLoadLabelHigh,
-        "readintid" : CompileInstruction.compileReadIntID,
-        "`include" : CompileInstruction.compileNothing
-    }
+    if mnemonic in CompileInstruction.ISA:
+        if CompileInstruction.getLabelArg(line) is not None:
+            return [Instruction(lineNumber, mnemonic, line[1:])]
+        word, comment = CompileInstruction.encode(line)
+        return [Instruction(lineNumber, mnemonic, line[1:], word, comment)]
 
+    if mnemonic in CompileInstruction.PSEUDO:
+        compiledLines = []
+        for expandedLine in CompileInstruction.PSEUDO[mnemonic](line):
+            compiledLines.extend(compileLine(expandedLine, lineNumber))
 
-    try:
-        compiledLine = switch[line[0].lower()](line)
-
-    #print errors
-    except KeyError:
-        #check if line is a label
-        if len(line) == 1 and line[0][-1] == ':':
-            compiledLine = "Label " + str(line[0])
-        #if not a label, raise error
-        else:
-            raise Exception("Unknown instruction '" + str(line[0]) + "'" )
+        #loading the highest 16 bits of a label is not needed if they are 0,
+        #since the load of the lowest 16 bits already clears them
+        for compiledLine in compiledLines:
+            if compiledLine.mnemonic == "loadlabelhigh":
+                compiledLine.optional = True
+        return compiledLines
+
+    if mnemonic in CompileInstruction.DATA:
+        return [Instruction(lineNumber, mnemonic, [], word, "data") for word in CompileInstruction.DATA[mnemonic](line)]
 
-    return compiledLine
+    if mnemonic == "`include":
+        return []
+
+    #check if line is a label
+    if len(line) == 1 and line[0][-1] == ':':
+        return [Instruction(lineNumber, "label", [line[0][:-1]])]
+
+    #if not a label, raise error
+    raise Exception("Unknown instruction '" + str(line[0]) + "'" )
 
 #compiles lines that can be compiled directly
-def passOne(parsedLines):
+def passOne(parsedLines, fileName=None):
     passOneResult = []
 
     for line in parsedLines:
         try:
-            compiledLine = compileLine(line[1])
+            compiledLines = compileLine(line[1], line[0])
+        except Exception as e:
+            raise AssemblerError(str(e), fileName, line[0], " ".join(line[1]))
 
-            #fix instructions that have multiple lines
+        for compiledLine in compiledLines:
+            compiledLine.fileName = fileName
+        passOneResult.extend(compiledLines)
 
-            if compiledLine.split()[0] == "loadBoth":
-                passOneResult.append((line[0], compileLine(["load", compiledLine.split()[2], compiledLine.split()[3]])))
-                compiledLine = compileLine(["loadhi", compiledLine.split()[1], compiledLine.split()[3]])
+    return passOneResult
 
-            if compiledLine.split()[0] == "loadLabelHigh":
-                passOneResult.append((line[0], "loadLabelLow " + " ".join(compiledLine.split()[1:])))
+#returns the hash of the assembler itself, so the cache is invalidated when the assembler changes
+def getAssemblerHash():
+    h = hashlib.sha1()
+    for module in (__file__, CompileInstruction.__file__):
+        with open(module, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+#returns the name of the cache file of a library
+def getCacheFileName(fileName):
+    return os.path.join(os.path.dirname(fileName), CACHE_DIR, os.path.basename(fileName) + ".pickle")
+
+#returns the words in the given lines, including the labels and names in expressions
+def getWords(lines):
+    words = set()
+    for line in lines:
+        for word in line:
+            words.add(word)
+            if CompileInstruction.isExpression(word):
+                words.update(CompileInstruction.getSymbols(word))
+    return words
+
+#returns the defines and macros that are used in the given words
+def getUsedDefinitions(words, defines, macros):
+    usedDefinitions = {}
+    words = list(words)
+    for word in words:
+        if word in usedDefinitions:
+            continue
+        if word in defines:
+            usedDefinitions[word] = defines[word]
+        elif word in macros:
+            usedDefinitions[word] = macros[word]
+            words.extend(getWords(macros[word][1]))
+    return usedDefinitions
+
+#returns the cached pass one result of a fragment, or None if the cache is outdated
+#the cache is valid if the content of the file, the assembler and the used defines and macros did not change
+def loadFragment(fragment, defines, macros, assemblerHash):
+    try:
+        with open(getCacheFileName(fragment.fileName), 'rb') as f:
+            key, words, usedDefinitions, passOneResult = pickle.load(f)
+    except Exception:
+        return None
 
-            if compiledLine.split()[0] == "data":
-                for i in compiledLine.split():
-                    if i != "data":
-                        passOneResult.append((line[0], i + " //data"))
-            else:
-                if (compiledLine != "ignore"):
-                    passOneResult.append((line[0], compiledLine))
-        except Exception as e:
-            print("Error in line " + str(line[0]) + ": " + " ".join(line[1]))
-            print("The error is: {0}".format(e))
-            print("Assembler will now exit")
-            sys.exit(1)
+    if key != hashlib.sha1((assemblerHash + fragment.text).encode()).hexdigest():
+        return None
+
+    if getUsedDefinitions(words, defines, macros) != usedDefinitions:
+        return None
 
     return passOneResult
 
-#reads and removes define statements, stores them into dictionary
-def obtainDefines(content):
-    defines = {} #list of definitions with their value
+#stores the pass one result of a fragment in the cache
+#labels are not yet resolved at this point, so the result does not depend on other files
+def saveFragment(fragment, defines, macros, assemblerHash, passOneResult):
+    key = hashlib.sha1((assemblerHash + fragment.text).encode()).hexdigest()
+    words = getWords([line[1] for line in fragment.lines])
+    try:
+        os.makedirs(os.path.join(os.path.dirname(fragment.fileName), CACHE_DIR), exist_ok=True)
+        with open(getCacheFileName(fragment.fileName), 'wb') as f:
+            pickle.dump((key, words, getUsedDefinitions(words, defines, macros), passOneResult), f, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass #the cache is optional
+
+#reads and removes define statements, stores them into the defines dictionary
+def obtainDefines(content, defines, fileName=None):
 
     contentWithoutDefines = [] #lines without defines
     defineLines = [] #lines with defines
@@ -142,10 +338,7 @@ def obtainDefines(content):
 
             #do error checking
             if len(line[1]) != 4 or line[1][2] != "=":
-                print("Error in line " + str(line[0]) + ": " + " ".join(line[1]))
-                print("Invalid define statement")
-                print("Assembler will now exit")
-                sys.exit(1)
+                raise AssemblerError("Invalid define statement", fileName, line[0], " ".join(line[1]))
 
             defineLines.append(line)
         else:
@@ -154,13 +347,28 @@ def obtainDefines(content):
     #parse the lines with defines
     for line in defineLines:
         if (line[1][1] in defines):
-            print("Error: define " + line[1][1] + " is already defined")
-            print("Assembler will now exit")
-            sys.exit(1)
+            raise AssemblerError("define " + line[1][1] + " is already defined")
         defines.update({line[1][1]:line[1][3]})
 
-    return defines, contentWithoutDefines
+    return contentWithoutDefines
+
 
+#returns the word where the names in replacements are replaced by their value
+#names within expressions are replaced as well, values that are expressions are put between parentheses
+def replaceWord(replacements, word):
+    if word in replacements:
+        return replacements[word]
+
+    if CompileInstruction.isExpression(word):
+        def replaceSymbol(symbol):
+            if symbol not in replacements:
+                return symbol
+            if CompileInstruction.isExpression(replacements[symbol]):
+                return "(" + replacements[symbol] + ")"
+            return replacements[symbol]
+        return CompileInstruction.mapSymbols(word, replaceSymbol)
+
+    return word
 
 #replace defined words with their value
 def processDefines(defines, content):
@@ -168,161 +376,375 @@ def processDefines(defines, content):
 
     #for each line, replace the words with their corresponding value if defined
     for line in content:
-        replacedContent.append((line[0], [defines.get(word, word) for word in line[1]]))
+        if line[1][0] == ".ds":
+            replacedContent.append(line)
+        else:
+            replacedContent.append((line[0], [replaceWord(defines, word) for word in line[1]]))
 
     return replacedContent
 
-#adds interrupts and jump to main
-def addHeaderCode(parsedLines):
-    header = [(0,"jump Main"),(0,"jump Int1"),(0,"jump Int2"),(0,"jump Int3"),(0,"jump Int4"), (0,"LengthOfProgram")]
-    
-    return header + parsedLines
+#reads and removes macro definitions, stores them into the macros dictionary
+#a macro is defined by the lines between "macro NAME PARAM1 PARAM2 ..." and "endm"
+#each macro is stored as (parameters, lines)
+def obtainMacros(content, macros, fileName=None):
+    contentWithoutMacros = [] #lines without macro definitions
+    macroLine = None #first line of the macro that is being read
+    macroLines = [] #lines of the macro that is being read
 
-#move labels to the next line
-def moveLabels(parsedLines):
-    returnList = []
+    for line in content:
+        if line[1][0].lower() == "macro":
+            #do error checking
+            if macroLine is not None:
+                raise AssemblerError("Macro definition inside macro " + macroLine[1][1], fileName, line[0], " ".join(line[1]))
+            if len(line[1]) < 2:
+                raise AssemblerError("Invalid macro statement", fileName, line[0], " ".join(line[1]))
+            name = line[1][1]
+            if name in macros or name.lower() in CompileInstruction.ISA or name.lower() in CompileInstruction.PSEUDO or name.lower() in CompileInstruction.DATA:
+                raise AssemblerError("macro " + name + " is already defined", fileName, line[0], " ".join(line[1]))
+
+            macroLine = line
+            macroLines = []
+
+        elif line[1][0].lower() == "endm":
+            if macroLine is None:
+                raise AssemblerError("endm without macro", fileName, line[0], " ".join(line[1]))
+            macros[macroLine[1][1]] = (macroLine[1][2:], macroLines)
+            macroLine = None
+
+        elif macroLine is not None:
+            macroLines.append(line[1])
 
-    #move to next line
-    # (old iteration) for idx, line in enumerate(parsedLines):
-    idx = 0;
-    while idx < len(parsedLines):
-        line = parsedLines[idx]
-        if line[1].lower().split()[0] == "label":
-            if idx < len(parsedLines) - 1:
-                # if we have a label directly below, insert a nop as a quick fix
-                if parsedLines[idx+1][1].lower().split()[0] == "label":
-                    parsedLines.insert(idx+1, (0, "_*" + line[1].split()[1] + "*_ " +"00000000000000000000000000000000 //NOP to quickfix double labels"))
-                else:
-                    parsedLines[idx+1] = (parsedLines[idx+1][0], "_*" + line[1].split()[1] + "*_ " + parsedLines[idx+1][1])
-            else:
-                print("Error: label " + line[1].split()[1] + " has no instructions below it")
-                print("Assembler will now exit")
-                sys.exit(1)
-        idx += 1
+        else:
+            contentWithoutMacros.append(line)
 
-    #remove original labels
-    for line in parsedLines:
-        if line[1].lower().split()[0] != "label":
-            returnList.append(line)
+    if macroLine is not None:
+        raise AssemblerError("macro " + macroLine[1][1] + " has no endm", fileName, macroLine[0], " ".join(macroLine[1]))
 
-    return returnList
+    return contentWithoutMacros
 
+#replaces a line that uses a macro by the lines of the macro, with the parameters replaced by the arguments
+#the lines keep the line number of the macro usage
+def expandMacro(macros, line, fileName=None, depth=0):
+    if line[1][0] not in macros:
+        return [line]
 
-#renumbers each line
-def redoLineNumbering(parsedLines):
-    returnList = []
+    params, macroLines = macros[line[1][0]]
+    args = line[1][1:]
 
-    for idx, line in enumerate(parsedLines):
-        returnList.append((idx, line[1]))
+    if len(args) != len(params):
+        raise AssemblerError("Incorrect number of arguments for macro " + line[1][0] + ". Expected " + str(len(params)) + ", but got " + str(len(args)), fileName, line[0], " ".join(line[1]))
+    if depth == MAX_MACRO_DEPTH:
+        raise AssemblerError("macro " + line[1][0] + " is used recursively", fileName, line[0], " ".join(line[1]))
 
-    return returnList
+    replacements = dict(zip(params, args))
+    expandedLines = []
+    for macroLine in macroLines:
+        if macroLine[0] != ".ds":
+            macroLine = [replaceWord(replacements, word) for word in macroLine]
+        expandedLines.extend(expandMacro(macros, (line[0], macroLine), fileName, depth + 1))
+
+    return expandedLines
+
+#replaces all lines that use a macro
+def expandMacros(macros, content, fileName=None):
+    if not macros:
+        return content
 
-#removes label prefix and returns a map of labels to line numbers
+    expandedContent = []
+    for line in content:
+        expandedContent.extend(expandMacro(macros, line, fileName))
+
+    return expandedContent
+
+#adds interrupts and jump to main
+def addHeaderCode(parsedLines):
+    header = [Instruction(0, "jump", [label]) for label in ["Main", "Int1", "Int2", "Int3", "Int4"]]
+    header.append(Instruction(0, "lengthofprogram", [], 0, "Length of program"))
+
+    return header + parsedLines
+
+#attaches labels to the first instruction below them,
+#sets the address of each instruction and creates a map of labels to addresses
 def getLabelMap(parsedLines):
-    labelMap = {}
+    symbols = SymbolTable()
     returnList = []
+    labels = [] #labels that are waiting for an instruction
+    fileName = None
+
+    for line in parsedLines:
+        #local labels cannot refer to a global label of another file
+        if line.fileName != fileName:
+            fileName = line.fileName
+            symbols.scope = None
 
+        try:
+            if line.mnemonic == "label":
+                label = symbols.define(line.args[0])
+                if label in symbols.addresses or label in labels:
+                    raise AssemblerError("label " + line.args[0] + " is already defined")
+                labels.append(label)
+            else:
+                #replace label argument by its full name
+                if line.word is None:
+                    labelIdx = CompileInstruction.getLabelArg(line.line()) - 1
+                    line.args[labelIdx] = CompileInstruction.mapSymbols(line.args[labelIdx], symbols.reference)
+
+                line.address = len(returnList)
+                if labels:
+                    for label in labels:
+                        symbols.addresses[label] = line.address
+                    line.labels = labels
+                    labels = []
+                returnList.append(line)
+        except ValueError as e:
+            raise AssemblerError(str(e), line.fileName, line.lineNumber, " ".join(line.line()))
+
+    if labels:
+        raise AssemblerError("label " + labels[0] + " has no instructions below it")
+
+    return returnList, symbols.addresses
+
+#sets the address of each instruction and returns the new map of labels to addresses
+#the branches in farBranches take two addresses, since they become an inverted branch over a jump
+def setAddresses(parsedLines, farBranches=()):
+    labelMap = {}
+    address = 0
     for line in parsedLines:
-        if line[1].split()[0][:2] == "_*" and line[1].split()[0][-3:] == ":*_":
-            if (line[1].split()[0][2:-3] in labelMap):
-                print("Error: label " + line[1].split()[0][2:-3] + " is already defined")
-                print("Assembler will now exit")
-                sys.exit(1)
+        line.address = address
+        for label in line.labels:
+            labelMap[label] = address
+        address += 2 if line in farBranches else 1
+    return labelMap
+
+#returns the value of the label argument of an instruction, or None if it cannot be computed yet
+def getLabelValue(line, labelMap):
+    arg = line.args[CompileInstruction.getLabelArg(line.line()) - 1]
+    try:
+        value, neg = CompileInstruction.getNumber(CompileInstruction.mapSymbols(arg, lambda label: str(labelMap.get(label, label))), True)
+    except ValueError:
+        return None
+    return -value if neg else value
+
+#checks if the optional instruction is needed, because its label value does not fit in 16 bits
+def isNeeded(line, labelMap):
+    value = getLabelValue(line, labelMap)
+    return value is None or value < 0 or value >> 16 != 0
+
+#checks if the branch cannot reach its label, since branches can only jump 16 bits forward
+def isFarBranch(line, labelMap):
+    value = getLabelValue(line, labelMap)
+    return value is not None and not 0 <= value - line.address <= 0xFFFF
+
+#replaces each far branch by an inverted branch over a jump to the label
+def expandFarBranches(parsedLines, farBranches):
+    expandedLines = []
+    for line in parsedLines:
+        if line not in farBranches:
+            expandedLines.append(line)
+            continue
+
+        branch, jump = [compileLine(expandedLine, line.lineNumber)[0] for expandedLine in CompileInstruction.compileFarBranch(line.line())]
+        branch.labels = line.labels
+        branch.fileName = jump.fileName = line.fileName
+        expandedLines.extend([branch, jump])
+
+    return expandedLines
+
+#removes the optional instructions that are not needed and finds the branches that cannot reach their label,
+#by iterating the label addresses to a fixed point
+#initially all optional instructions are removed and all branches are short,
+#each iteration adds back the optional instructions with a value above 16 bits and extends the far branches
+#since instructions only grow, the label addresses only grow until nothing changes
+def relaxLabels(parsedLines, labelMap):
+    #instructions within the range of a branch with a constant offset should keep their size,
+    #since otherwise the target of the branch would change
+    pinned = set()
+    for idx, line in enumerate(parsedLines):
+        if line.word is not None and line.mnemonic in RELATIVE_JUMPS:
+            offset = RELATIVE_JUMPS[line.mnemonic](line.word)
+            for coveredLine in parsedLines[idx:idx + offset + 1]:
+                coveredLine.optional = False
+                pinned.add(coveredLine)
 
-            labelMap[line[1].split()[0][2:-3]] = line[0]
+    removed = {line for line in parsedLines if line.optional}
+    branches = [line for line in parsedLines if line.word is None and CompileInstruction.hasBranchLabel(line.line())]
+    farBranches = set()
 
+    if not removed and not branches:
+        return parsedLines, labelMap
 
-    for line in parsedLines:
-        if line[1].split()[0][:2] == "_*" and line[1].split()[0][-2:] == "*_":
-            returnList.append((line[0], line[1].split("*_ ", maxsplit=1)[1]))
-        else:
-            returnList.append(line)
+    while True:
+        relaxedLines = [line for line in parsedLines if line not in removed]
+        labelMap = setAddresses(relaxedLines, farBranches)
+
+        needed = [line for line in removed if isNeeded(line, labelMap)]
+        far = [line for line in branches if line not in farBranches and isFarBranch(line, labelMap)]
+        if not needed and not far:
+            break
+
+        for line in far:
+            if line in pinned:
+                raise AssemblerError("label is out of range of the branch, and the branch is within the range of a branch with a constant offset", line.fileName, line.lineNumber, " ".join(line.line()))
+
+        removed.difference_update(needed)
+        farBranches.update(far)
 
-    return returnList, labelMap
+    relaxedLines = expandFarBranches(relaxedLines, farBranches)
+    return relaxedLines, setAddresses(relaxedLines)
 
 #compiles all labels
 def passTwo(parsedLines, labelMap):
-    #lines that start with these names should be compiled
-    toCompileList = ["jump", "beq", "bne", "bgt", "bge", "loadlabellow" ,"loadlabelhigh"]
-
-    for idx, line in enumerate(parsedLines):
-        if line[1].lower().split()[0] in toCompileList:
-            for idx2, word in enumerate(line[1].split()):              
-                if word in labelMap:
-                    x = line[1].split()
-                    x[idx2] = str(labelMap.get(word))
-                    y = compileLine(x)
-                    parsedLines[idx] = (parsedLines[idx][0], y)
-                 
+    for line in parsedLines:
+        if line.word is None:
+            x = line.line()
+            labelIdx = CompileInstruction.getLabelArg(x)
+            x[labelIdx] = CompileInstruction.mapSymbols(x[labelIdx], lambda label: str(labelMap.get(label, label)))
+            if not CompileInstruction.isLabel(x[labelIdx]):
+                try:
+                    #branches jump relative to their own address
+                    if CompileInstruction.hasBranchLabel(line.line()):
+                        offset = getLabelValue(line, labelMap) - line.address
+                        if offset < 0:
+                            raise Exception("Branch target is above the branch, but branches can only jump forward")
+                        x[labelIdx] = str(offset)
+                    line.word, line.comment = CompileInstruction.encode(x)
+                except Exception as e:
+                    raise AssemblerError(str(e), line.fileName, line.lineNumber, " ".join(line.line()))
 
     return parsedLines
 
 #check if all labels are compiled
-def checkNoLabels(parsedLines):
-    toCompileList = ["jump", "beq", "bne", "bgt", "bge", "loadlabellow" ,"loadlabelhigh"]
-    
-    for idx, line in enumerate(parsedLines):
-        if line[1].lower().split()[0] in toCompileList:
-            labelPos = 0
-            if line[1].lower().split()[0] in ["jump", "loadlabellow" ,"loadlabelhigh"]:
-                labelPos = 1
-            if line[1].lower().split()[0] in ["beq", "bne", "bgt", "bge"]:
-                labelPos = 3
-            print("Error: label " + line[1].split()[labelPos] + " is undefined")
-            print("Assembler will now exit")
-            sys.exit(1)
-
-        if line[1].lower().split()[0] == "label":
-            print("Error: label " + line[1].split()[1] + " is used directly after another label")
-            print("Assembler will now exit")
-            sys.exit(1)
-        
+def checkNoLabels(parsedLines, labelMap):
+    for line in parsedLines:
+        if line.word is None:
+            arg = line.args[CompileInstruction.getLabelArg(line.line()) - 1]
+            label = [label for label in CompileInstruction.getSymbols(arg) if label not in labelMap][0]
+            #undefined numeric labels are always forward references
+            if "@" in label:
+                label = label.split("@")[0] + "f"
+            raise AssemblerError("label " + label + " is undefined")
+
+#assembles source into an AssembledProgram
+#source is either assembly code as string, or the path of an assembly file as pathlib.Path
+#included files are searched in include_paths, by default in the directory of source and the current directory
+#defines is an optional map of names to values, which are handled as define statements
+#included libraries are cached if cache is True
+#if relax is True, the highest 16 bits of label values are only loaded when they are not 0,
+#and branches that cannot reach their label are replaced by an inverted branch over a jump
+def assemble(source, include_paths=None, defines=None, cache=True, relax=True):
+    if isinstance(source, str):
+        fileName = None
+        text = source
+    else:
+        fileName = os.fspath(source)
+        try:
+            with open(fileName, 'r') as f:
+                text = f.read()
+        except OSError:
+            raise AssemblerError("Could not read file " + fileName)
 
+    if include_paths is None:
+        include_paths = ["."]
+        if fileName is not None and os.path.dirname(fileName) != "":
+            include_paths.insert(0, os.path.dirname(fileName))
 
-def main():
+    #parse lines from source and insert libraries
+    fragments = insertLibraries(Fragment(fileName, text, parseLines(text)), [], include_paths)
 
-    #parse lines from file
-    parsedLines = parseLines("code.asm")
+    #obtain and remove the define statements
+    allDefines = {name: str(value) for name, value in (defines or {}).items()}
+    for fragment in fragments:
+        fragment.lines = obtainDefines(fragment.lines, allDefines, fragment.fileName)
 
-    #insert libraries
-    parsedLines = insertLibraries(parsedLines)
+    #obtain and remove the macro definitions
+    macros = {}
+    for fragment in fragments:
+        fragment.lines = obtainMacros(fragment.lines, macros, fragment.fileName)
 
-    #obtain and remove the define statements
-    defines, parsedLines = obtainDefines(parsedLines)
+    #do pass one for each fragment, libraries are taken from the cache if possible
+    assemblerHash = getAssemblerHash() if cache else None
+    passOneResult = []
+    for fragment in fragments:
+        isLibrary = fragment is not fragments[-1]
+        fragmentResult = None
+
+        if isLibrary and cache:
+            fragmentResult = loadFragment(fragment, allDefines, macros, assemblerHash)
 
-    #replace defined words with their value
-    parsedLines = processDefines(defines, parsedLines) 
+        if fragmentResult is None:
+            #expand macros and replace defined words with their value
+            fragmentResult = passOne(processDefines(allDefines, expandMacros(macros, fragment.lines, fragment.fileName)), fragment.fileName)
+            if isLibrary and cache:
+                saveFragment(fragment, allDefines, macros, assemblerHash, fragmentResult)
 
-    #do pass one
-    passOneResult = passOne(parsedLines)
+        passOneResult.extend(fragmentResult)
 
     #add interrupt code and jumps
     passOneResult = addHeaderCode(passOneResult)
 
-    #move labels to the next line
-    passOneResult = moveLabels(passOneResult)
-
-    #redo line numbers for jump addressing
+    #attach labels, set addresses for jump addressing and create mapping from label to address
     #from this point no line should become multiple lines in the final code!
-    #also no shifting in line numbers!
-    passOneResult = redoLineNumbering(passOneResult)
+    #only relaxLabels is allowed to remove lines
+    passOneResult, labelMap = getLabelMap(passOneResult)
 
-    #removes label prefixes and creates mapping from label to line
-    passOneResult, labelMap = getLabelMap(passOneResult) 
+    #remove the instructions that are not needed for the final label addresses,
+    #and replace branches that cannot reach their label
+    if relax:
+        passOneResult, labelMap = relaxLabels(passOneResult, labelMap)
 
     #do pass two
     passTwoResult = passTwo(passOneResult, labelMap)
 
     #check if all labels are processed
-    checkNoLabels(passTwoResult)
+    checkNoLabels(passTwoResult, labelMap)
 
-    lenString = '{0:032b}'.format(len(passTwoResult)) + " //Length of program"
     #calculate length of program
-    passTwoResult[5] = (5, lenString)
+    passTwoResult[5].word = len(passTwoResult)
+
+    return AssembledProgram(passTwoResult, labelMap)
+
+
+def getArguments():
+    parser = argparse.ArgumentParser(
+        description="Assemble B322 assembly code. Without -o or -l, the text output is printed to stdout.")
+
+    parser.add_argument("input", nargs="?", default="code.asm",
+                        help="assembly file to assemble (default: code.asm)")
+    parser.add_argument("-o", "--output",
+                        help="write the program as binary (big endian 32 bit words) to OUTPUT")
+    parser.add_argument("-p", "--pad", type=int, default=0,
+                        help="pad the binary output with 0xFF bytes to a multiple of PAD bytes")
+    parser.add_argument("-l", "--list", dest="listFile",
+                        help="write the text output to LISTFILE")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="do not use or update the cache of compiled libraries")
+    parser.add_argument("--no-relax", dest="relax", action="store_false",
+                        help="always load all 32 bits of label values")
 
-    #print result without line numbers
-    for line in passTwoResult:
-        print(line[1])
+    return parser.parse_args()
+
+
+def main():
+    args = getArguments()
+
+    try:
+        program = assemble(pathlib.Path(args.input), cache=args.cache, relax=args.relax)
+    except AssemblerError as e:
+        print(e.report())
+        print("Assembler will now exit")
+        sys.exit(1)
+
+    #write result
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(program.binary(args.pad))
+
+    if args.listFile:
+        with open(args.listFile, 'w') as f:
+            f.write(program.text())
+
+    if not args.output and not args.listFile:
+        sys.stdout.write(program.text())
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
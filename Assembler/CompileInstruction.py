@@ -1,1295 +1,477 @@
-'''
-Library for compiling single instructions
-'''
-
-#converts string to int
-#string can by binary, decimal or hex
-def getNumber(word, allowNeg=False):
-    value = 0
-    #check for binary number
-    if len(word) > 2 and word[:2] == '0b':
-        try:
-            value = int(word, 2)
-        except ValueError:
-            raise ValueError(str(word) + " is not a valid binary number")
-
-    #check for hex number
-    elif len(word) > 2 and word[:2] == '0x':
-        try:
-            value = int(word, 16)
-        except ValueError:
-            raise ValueError(str(word) + " is not a valid hex number")
-
-    #check for decimal number
-    else:
-        try:
-            value = int(word, 10)
-        except ValueError:
-            raise ValueError(str(word) + " is not a valid decimal number")
-
-    #check for negative numbers
-    if value < 0 and not allowNeg:
-        raise ValueError(str(word) + " is a negative number (which are not allowed)")
-
-    if allowNeg:
-
-        if value < 0:
-            return abs(value), True
-        else:
-            return value, False
-    return value
-
-
-#converts string to int, representing the register
-#string must be in format: rx
-#where x is a number between 0 and 15 (including 0 and 15)
-def getReg(word):
-    value = 0
-    
-    #check if first char starts with an r
-    if word[0].lower() == 'r':
-        #check for rbp and rsp (rbp == r14, rsp == r15)
-        if word.lower() == "rbp":
-            return 14
-        if word.lower() == "rsp":
-            return 15
-
-        #parse number after r
-        try:
-            value = int(word[1:], 10)
-        except ValueError:
-            raise ValueError("Register" + str(word) + " is not a valid register")
-    else:
-        raise ValueError("Register " + str(word) + " does not start with 'r'")
-
-    if value < 0 or value > 15:
-        raise ValueError("Register " + str(word) + " is not a valid register")
-
-    return value
-
-#checks if the given value fits in the given number of bits
-def CheckFitsInBits(value, bits):
-    if not (value.bit_length() <= bits):
-        raise ValueError("Value " + str(value) + " does not fit in " + str(bits) + " bits")
-
-"""
-------------------LINE COMPILING FUNCTIONS---------------------
-"""
-
-#compiles halt instruction
-#should have 0 arguments
-def compileHalt(line):
-    if len(line) != 1:
-        raise Exception("Incorrect number of arguments. Expected 0, but got " + str(len(line)-1))
-
-    return "11111111111111111111111111111111 //Halt"
-
-
-#compiles read instruction
-#should have 3 arguments
-#arg1 should be a positive number that is within 12 bits unsigned
-#arg2 should be a valid register
-#arg3 should be a valid register
-def compileRead(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int, neg = getNumber(line[1], True)
-
-    negsString = ""
-    if neg:
-        negsString = "1"
-    else:
-        negsString = "0"
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    areg = format(arg2Int, '04b')
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    instruction = "1110" + const16 + areg + "00" + negsString + "0" + dreg + " //Read at address in " + line[2] + " with offset " + line[1] + " to " + line[3]
-
-    return instruction
-
-
-#compiles write instruction
-#should have 3 arguments
-#arg1 should be a positive number that is within 12 bits unsigned
-#arg2 should be a valid register
-#arg3 should be a valid register
-def compileWrite(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int, neg = getNumber(line[1], True)
-
-    negsString = ""
-    if neg:
-        negsString = "1"
-    else:
-        negsString = "0"
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    areg = format(arg2Int, '04b')
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    breg = format(arg3Int, '04b')
-
-    #create instruction
-    instruction = "1101" + const16 + areg + breg + "000" + negsString + " //Write value in " + line[3] + " to address in " + line[2] + " with offset " + line[1]
-
-    return instruction
-
-
-#compiles copy instruction
-#should have 3 arguments
-#arg1 should be a positive number that is within 12 bits unsigned
-#arg2 should be a valid register
-#arg3 should be a valid register
-def compileCopy(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int, neg = getNumber(line[1], True)
-
-    negsString = ""
-    if neg:
-        negsString = "1"
-    else:
-        negsString = "0"
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    areg = format(arg2Int, '04b')
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    breg = format(arg3Int, '04b')
-
-    #create instruction
-    instruction = "1100" + const16 + areg + breg + "000" + negsString + " //Copy from address in " + line[2] + " to address in " + line[3] + " with offset " + line[1]
-
-    return instruction
-
-
-#compiles push instruction
-#should have 1 argument
-def compilePush(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    breg = format(arg1Int, '04b')
-
-    #create instruction
-    instruction = "101100000000000000000000" + breg + "0000" + " //Push " + line[1] + " to stack"
-
-    return instruction
-
-
-#compiles push instruction
-#should have 1 argument
-def compilePop(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    dreg = format(arg1Int, '04b')
-
-    #create instruction
-    instruction = "1010000000000000000000000000" + dreg + " //Pop from stack to " + line[1]
-
-    return instruction
-
-
-
-#compiles jump instruction
-#should have 1 argument or a label
-#arg1 should be a positive number that is within 27 bits unsigned
-def compileJump(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    instruction = ""
-    ARG1isAlabel = False
-
-
-    try:
-        getNumber(line[1])
-        ARG1isAlabel = False
-    except:
-        ARG1isAlabel = True
-
-
-    #if no label is given
-    if not ARG1isAlabel:
-
-        #convert arg1 to number
-        arg1Int = getNumber(line[1])
-
-        #convert arg1 to binary
-        CheckFitsInBits(arg1Int, 27)
-        const27 = format(arg1Int, '027b')
-
-        #create instruction
-        instruction = "1001" + const27 + "0" + " //Jump to constant address " + line[1]
-
-    #if a label is given, process it later
-    else:
-        instruction = " ".join(line)
-
-    return instruction
-
-
-#compiles jump instruction to offset
-#should have 1 argument
-#arg1 should be a positive number that is within 20 bits unsigned
-def compileJumpo(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    instruction = ""
-    
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 27)
-    const27 = format(arg1Int, '027b')
-
-    #create instruction
-    instruction = "1001" + const27 + "1" + " //Jump to offset address " + line[1]
-
-    return instruction
-
-
-#compiles jump instruction to reg with offset
-#should have 2 arguments
-#arg1 should be a positive number that is within 16 bits unsigned
-#arg2 should be a reg
-def compileJumpr(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    instruction = ""
-    
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "1000" + const16 + "0000" + breg + "000" + "0" + " //Jump to reg " + line[2] + " with offset " + line[1]
-
-    return instruction
-
-
-#compiles jump instruction to offset in reg with offset
-#should have 2 arguments
-#arg1 should be a positive number that is within 16 bits unsigned
-#arg2 should be a reg
-def compileJumpro(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    instruction = ""
-    
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "1000" + const16 + "0000" + breg + "000" + "1" + " //Jump to offset in reg " + line[2] + " with offset " + line[1]
-
-    return instruction
-
-
-#compiles load instruction
-#should have 2 arguments
-#arg1 should be a positive number that is within 16 bits unsigned
-#arg2 should be a valid register
-def compileLoad(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    dreg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "0111" + const16 + "000" + "0" + "0000" + dreg + " //Set " + line[2] + " to " + line[1]
-
-    return instruction
-
-
-#compiles loadhi instruction
-#should have 2 arguments
-#arg1 should be a positive number that is within 16 bits unsigned
-#arg2 should be a valid register
-def compileLoadhi(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    dreg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "0111" + const16 + "000" + "1" + "0000" + dreg + " //Set highest 16 bits of " + line[2] + " to " + line[1]
-
-    return instruction
-
-
-#compiles beq instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should be a valid register
-#arg3 should be a positive number that is within 16 bits unsigned
-def compileBeq(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg1 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    arg3Int = 0
-
-    #convert arg3 to number
-    arg3Int = getNumber(line[3])
-
-    #convert arg3 to binary
-    CheckFitsInBits(arg3Int, 16)
-    const16 = format(arg3Int, '016b')
-
-    #create instruction
-    instruction = "0110" + const16 + areg + breg + "0000" + " //If " + line[1] + " == " + line[2] + ", then jump to offset " + line[3]
-
-    return instruction
-
-
-#compiles bne instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should be a valid register
-#arg3 should be a positive number that is within 16 bits unsigned
-def compileBne(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg1 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    arg3Int = 0
-
-    #convert arg3 to number
-    arg3Int = getNumber(line[3])
-
-    #convert arg3 to binary
-    CheckFitsInBits(arg3Int, 16)
-    const16 = format(arg3Int, '016b')
-
-    #create instruction
-    instruction = "0101" + const16 + areg + breg + "0000" + " //If " + line[1] + " != " + line[2] + ", then jump to offset " + line[3]
-
-    return instruction
-
-
-#compiles bgt instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should be a valid register
-#arg3 should be a positive number that is within 16 bits unsigned
-def compileBgt(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg1 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    arg3Int = 0
-
-    #convert arg3 to number
-    arg3Int = getNumber(line[3])
-
-    #convert arg3 to binary
-    CheckFitsInBits(arg3Int, 16)
-    const16 = format(arg3Int, '016b')
-
-    #create instruction
-    instruction = "0100" + const16 + areg + breg + "0000" + " //If " + line[1] + " > " + line[2] + ", then jump to offset " + line[3]
-
-    return instruction
-
-
-#compiles bge instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should be a valid register
-#arg3 should be a positive number that is within 16 bits unsigned
-def compileBge(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg1 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    breg = format(arg2Int, '04b')
-
-    arg3Int = 0
-
-    #convert arg3 to number
-    arg3Int = getNumber(line[3])
-
-    #convert arg3 to binary
-    CheckFitsInBits(arg3Int, 16)
-    const16 = format(arg3Int, '016b')
-
-    #create instruction
-    instruction = "0011" + const16 + areg + breg + "0000" + " //If " + line[1] + " >= " + line[2] + ", then jump to offset " + line[3]
-
-    return instruction
-
-
-#compiles savpc instruction
-#should have 1 argument
-def compileSavpc(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    dreg = format(arg1Int, '04b')
-
-    #create instruction
-    instruction = "0010000000000000000000000000" + dreg + " //Save PC to " + line[1]
-
-    return instruction
-
-
-#compiles reti instruction
-#should have 0 arguments
-def compileReti(line):
-    if len(line) != 1:
-        raise Exception("Incorrect number of arguments. Expected 0, but got " + str(len(line)-1))
-
-    return "00010000000000000000000000000000 //Return from interrupt"
-
-
-#compiles or instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileOr(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0000" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " OR " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0000" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " OR " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles and instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileAnd(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0001" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " AND " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0001" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " AND " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-#compiles xor instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileXor(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0010" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " XOR " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0010" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " XOR " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles add instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileAdd(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0011" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " + " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0011" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " + " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles sub instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileSub(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0100" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " - " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0100" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " - " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles shiftl instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileShiftl(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0101" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " << " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0101" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " << " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles shiftr instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileShiftr(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0110" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " >> " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0110" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " >> " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles mult instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileMult(line):
-    if len(line) != 4:
-        raise Exception("Incorrect number of arguments. Expected 3, but got " + str(len(line)-1))
-
-    const11 = ""
-    arg2Int = 0
-    constantEnable = 0
-    breg = ""
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-
-    #convert arg2 to number
-    if line[2][0].lower() == 'r':   #if arg1 is a register argument
-        constantEnable = 0
-        arg2Int = getReg(line[2])
-    else:                           #arg1 is a constant
-        constantEnable = 1
-        arg2Int = getNumber(line[2])
-
-    #convert arg2 to binary
-    if constantEnable:
-        CheckFitsInBits(arg2Int, 11)
-        const11 = format(arg2Int, '011b')
-    else:
-        breg = format(arg2Int, '04b')
-        
-
-    #convert arg3 to number
-    arg3Int = getReg(line[3])
-
-    #convert arg3 to binary
-    dreg = format(arg3Int, '04b')
-
-    #create instruction
-    if constantEnable:
-        instruction = "0000" + "1" "0111" + const11 + areg + "0000" + dreg + " //Compute " +  line[1] + " * " + line[2] + " and write result to " + line[3]
-    else:
-        instruction = "0000" + "0" "0111" + "00000000000" + areg + breg + dreg + " //Compute " +  line[1] + " * " + line[2] + " and write result to " + line[3]
-
-    return instruction
-
-
-#compiles not instruction
-#should have 3 arguments
-#arg1 should be a valid register
-#arg2 should either be a positive number that is within 11 bits unsigned, 
-# or a valid register
-#arg3 should be a valid register
-def compileNot(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    instruction = ""
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg2 to binary
-    areg = format(arg1Int, '04b')
-       
-
-    #convert arg3 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg3 to binary
-    dreg = format(arg2Int, '04b')
-
-    instruction = "0000" + "0" "1000" + "00000000000" + areg + "0000" + dreg + " //Compute NOT " +  line[1] + " and write result to " + line[2]
-
-    return instruction
-
-
-
-#compiles addr2reg instruction
-#should have 2 arguments
-#arg 1 should be a valid label
-#arg 2 should be a reg
-def compileAddr2reg(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    instruction = "loadLabelHigh " + line[1] + " " + line[2]
-
-    #check if register is valid
-    getReg(line[2])
-
-    return instruction
-
-
-#compiles load32 instruction
-#should have 2 arguments
-#arg 1 should be a number within 32 bits
-#arg 2 should be a reg
-def compileLoad32(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    const32 = ""
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-
-    #check if it fits in 16 bits, so we can skip the loadhi
-    try:
-        CheckFitsInBits(arg1Int, 16)
-        return compileLoad(line)
-    except:
-        pass #continue
-
-    #check if it fits in 32 bits
-    CheckFitsInBits(arg1Int, 32)
-
-    #convert to 32 bit
-    const32 = format(arg1Int, '032b')
-
-    constLow = int(const32[0:16], 2)
-    constHigh = int(const32[16:32], 2)
-
-    #create instruction
-    instruction = "loadBoth " + str(constLow) + " " + str(constHigh) + " " + line[2]
-
-    return instruction
-
-#compiles compileLoadLabelLow instruction
-def compileLoadLabelLow(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    x = '{0:027b}'.format(arg1Int)
-
-    #x[:11] highest 11 bits
-    #x[11:] lowest 16 bits
-
-    arg1Int = getNumber("0b" + x[11:])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16) #should not be needed
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    dreg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "0111" + const16 + "000" + "0" + "0000" + dreg + " //Set " + line[2] + " to " + str(arg1Int)
-
-    return instruction
-
-
-#compiles compileLoadLabelHigh instruction
-def compileLoadLabelHigh(line):
-    if len(line) != 3:
-        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
-
-    const16 = ""
-
-    #convert arg1 to number
-    arg1Int = getNumber(line[1])
-
-    x = '{0:027b}'.format(arg1Int)
-
-    #x[:11] highest 4 bits
-    #x[11:] lowest 16 bits
-
-    arg1Int = getNumber("0b" + x[:11])
-
-    #convert arg1 to binary
-    CheckFitsInBits(arg1Int, 16)
-    const16 = format(arg1Int, '016b')
-
-    #convert arg2 to number
-    arg2Int = getReg(line[2])
-
-    #convert arg2 to binary
-    dreg = format(arg2Int, '04b')
-
-    #create instruction
-    instruction = "0111" + const16 + "000" + "1" + "0000" + dreg + " //Set highest 16 bits of " + line[2] + " to " + str(arg1Int)
-
-    return instruction
-
-
-#compiles nop instruction
-#should have 0 arguments
-def compileNop(line):
-    if len(line) != 1:
-        raise Exception("Incorrect number of arguments. Expected 0, but got " + str(len(line)-1))
-
-    return "00000000000000000000000000000000 //NOP"
-
-#compiles .dw instruction
-def compileDw(line):
-    if len(line) < 2:
-        raise Exception("Incorrect number of arguments. Expected 1 or more, but got " + str(len(line)-1))
-    
-    instruction = "data"
-
-    for i in line:
-        if i != ".dw":
-            number = getNumber(i)
-            CheckFitsInBits(number, 32)
-            instruction = instruction + " " + '{0:032b}'.format(number)
-
-    return instruction
-
-
-#compiles .dd instruction
-def compileDd(line):
-    if len(line) < 2:
-        raise Exception("Incorrect number of arguments. Expected 1 or more, but got " + str(len(line)-1))
-    
-    instruction = "data"
-
-    counter = 1
-    for i in line:
-        if i != ".dd":
-            number = getNumber(i)
-            CheckFitsInBits(number, 16)
-            if counter < 1:
-                counter = counter + 1
-                instruction = instruction + "" + '{0:016b}'.format(number)
-            else:
-                instruction = instruction + " " + '{0:016b}'.format(number)
-                counter = 0
-
-    if counter == 0:
-        instruction = instruction + "0000000000000000"
-
-    return instruction
-
-#compiles .db instruction
-def compileDb(line):
-    if len(line) < 2:
-        raise Exception("Incorrect number of arguments. Expected 1 or more, but got " + str(len(line)-1))
-    
-    instruction = "data"
-
-    counter = 3
-    for i in line:
-        if i != ".db":
-            number = getNumber(i)
-            CheckFitsInBits(number, 8)
-            if counter < 3:
-                counter = counter + 1
-                instruction = instruction + "" + '{0:08b}'.format(number)
-            else:
-                instruction = instruction + " " + '{0:08b}'.format(number)
-                counter = 0
-
-    if counter == 0:
-        instruction = instruction + "000000000000000000000000"
-    if counter == 1:
-        instruction = instruction + "0000000000000000"
-    if counter == 2:
-        instruction = instruction + "00000000"
-
-    return instruction
-
-#compiles .ds instruction by converting it to a .db instruction
-def compileDs(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    #.db instruction
-    dbList = []
-
-    dbList.append(".db")
-
-    # check for " "
-    if (line[1][0] == "\"" and line[1][-1] == "\""):
-        dbList = dbList + [str(ord(char)) for char in line[1][1:-1]]
-        #TODO convert string to ascii list using [ord(char) for char in string]
-    else:
-        raise Exception("Invalid string: " + line[1])
-    
-    return compileDb(dbList)
-
-
-#compiles readintid instruction
-#should have 1 argument
-#arg1 should be a valid register
-def compileReadIntID(line):
-    if len(line) != 2:
-        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
-
-    #convert arg1 to number
-    arg1Int = getReg(line[1])
-
-    #convert arg1 to binary
-    dreg = format(arg1Int, '04b')
-
-    #create instruction
-    instruction = "1110" + "0000000000000000" + "0000" + "0001" + dreg + " //Read interrupt id to " + line[1]
-
-    return instruction
-
-
-#compile nothing
-def compileNothing(line):
-    return "ignore"
\ No newline at end of file
+'''
+Library for compiling single instructions
+'''
+
+import re
+
+#converts string to int
+#string can by binary, decimal or hex, or a constant expression of these
+def getNumber(word, allowNeg=False):
+    value = 0
+    #check for expression
+    if isExpression(word):
+        value = evaluate(word)
+
+    #check for binary number
+    elif len(word) > 2 and word[:2] == '0b':
+        try:
+            value = int(word, 2)
+        except ValueError:
+            raise ValueError(str(word) + " is not a valid binary number")
+
+    #check for hex number
+    elif len(word) > 2 and word[:2] == '0x':
+        try:
+            value = int(word, 16)
+        except ValueError:
+            raise ValueError(str(word) + " is not a valid hex number")
+
+    #check for decimal number
+    else:
+        try:
+            value = int(word, 10)
+        except ValueError:
+            raise ValueError(str(word) + " is not a valid decimal number")
+
+    #check for negative numbers
+    if value < 0 and not allowNeg:
+        raise ValueError(str(word) + " is a negative number (which are not allowed)")
+
+    if allowNeg:
+
+        if value < 0:
+            return abs(value), True
+        else:
+            return value, False
+    return value
+
+
+#converts string to int, representing the register
+#string must be in format: rx
+#where x is a number between 0 and 15 (including 0 and 15)
+def getReg(word):
+    value = 0
+
+    #check if first char starts with an r
+    if word[0].lower() == 'r':
+        #check for rbp and rsp (rbp == r14, rsp == r15)
+        if word.lower() == "rbp":
+            return 14
+        if word.lower() == "rsp":
+            return 15
+
+        #parse number after r
+        try:
+            value = int(word[1:], 10)
+        except ValueError:
+            raise ValueError("Register" + str(word) + " is not a valid register")
+    else:
+        raise ValueError("Register " + str(word) + " does not start with 'r'")
+
+    if value < 0 or value > 15:
+        raise ValueError("Register " + str(word) + " is not a valid register")
+
+    return value
+
+#checks if the given value fits in the given number of bits
+def CheckFitsInBits(value, bits):
+    if not (value.bit_length() <= bits):
+        raise ValueError("Value " + str(value) + " does not fit in " + str(bits) + " bits")
+
+#checks if the given word is a label instead of a number
+#for expressions, checks if the expression contains a label
+def isLabel(word):
+    return len(getSymbols(word)) > 0
+
+"""
+------------------CONSTANT EXPRESSIONS---------------------
+"""
+
+#characters of the operators in expressions
+OPERATOR_CHARS = "+-*/%&|^~()<>"
+
+#operators with two operands and their precedence, higher binds stronger
+BINARY_OPERATORS = {
+    "*"     : 5,
+    "/"     : 5,
+    "%"     : 5,
+    "+"     : 4,
+    "-"     : 4,
+    "<<"    : 3,
+    ">>"    : 3,
+    "&"     : 2,
+    "^"     : 1,
+    "|"     : 0,
+}
+
+#splits an expression into operators and operands
+TOKEN_REGEX = re.compile(r"<<|>>|[-+*/%&|^~()]|[^-+*/%&|^~()<>\s]+|.")
+
+#checks if the given word is an expression instead of a single number or label
+#a leading - followed by a digit is part of a negative number
+def isExpression(word):
+    return word[:1] in ("(", "~") or word[:1] == "-" and not word[1:2].isdigit() or any(char in OPERATOR_CHARS for char in word[1:])
+
+#checks if the given operand of an expression is a number
+def isNumber(word):
+    try:
+        getNumber(word, True)
+        return True
+    except ValueError:
+        return False
+
+#returns the labels in the given word or expression
+def getSymbols(word):
+    if not isExpression(word):
+        return [] if isNumber(word) else [word]
+    return [token for token in TOKEN_REGEX.findall(word) if token[0] not in OPERATOR_CHARS and not isNumber(token)]
+
+#replaces each label in the given word or expression by function(label)
+def mapSymbols(word, function):
+    if not isExpression(word):
+        return word if isNumber(word) else function(word)
+    return "".join([token if token[0] in OPERATOR_CHARS or isNumber(token) else function(token) for token in TOKEN_REGEX.findall(word)])
+
+#computes the value of a constant expression
+#supports + - * / % << >> & ^ | with C precedence, unary - and ~, and parentheses
+def evaluate(expression):
+    tokens = TOKEN_REGEX.findall(expression)
+    value, idx = evaluateBinary(tokens, 0, 0, expression)
+    if idx != len(tokens):
+        raise ValueError(expression + " is not a valid expression")
+    return value
+
+#evaluates the operand at tokens[idx], returns the value and the index of the next token
+def evaluateOperand(tokens, idx, expression):
+    if idx >= len(tokens):
+        raise ValueError(expression + " is not a valid expression")
+
+    token = tokens[idx]
+    if token == "(":
+        value, idx = evaluateBinary(tokens, idx + 1, 0, expression)
+        if idx >= len(tokens) or tokens[idx] != ")":
+            raise ValueError(expression + " has unbalanced parentheses")
+        return value, idx + 1
+    if token == "-":
+        value, idx = evaluateOperand(tokens, idx + 1, expression)
+        return -value, idx
+    if token == "~":
+        value, idx = evaluateOperand(tokens, idx + 1, expression)
+        return ~value, idx
+    if token[0] in OPERATOR_CHARS:
+        raise ValueError(expression + " is not a valid expression")
+    if not isNumber(token):
+        raise ValueError("label " + token + " in " + expression + " is undefined")
+
+    value, neg = getNumber(token, True)
+    return (-value if neg else value), idx + 1
+
+#evaluates operators with at least the given precedence (precedence climbing)
+def evaluateBinary(tokens, idx, precedence, expression):
+    value, idx = evaluateOperand(tokens, idx, expression)
+
+    while idx < len(tokens) and BINARY_OPERATORS.get(tokens[idx], -1) >= precedence:
+        operator = tokens[idx]
+        right, idx = evaluateBinary(tokens, idx + 1, BINARY_OPERATORS[operator] + 1, expression)
+
+        if operator == "*":
+            value = value * right
+        elif operator in ("/", "%"):
+            if right == 0:
+                raise ValueError("Division by zero in " + expression)
+            #round towards zero, like C
+            quotient = abs(value) // abs(right)
+            if (value < 0) != (right < 0):
+                quotient = -quotient
+            value = quotient if operator == "/" else value - quotient * right
+        elif operator == "+":
+            value = value + right
+        elif operator == "-":
+            value = value - right
+        elif operator == "<<":
+            value = value << right
+        elif operator == ">>":
+            value = value >> right
+        elif operator == "&":
+            value = value & right
+        elif operator == "^":
+            value = value ^ right
+        else:
+            value = value | right
+
+    return value, idx
+
+#formats an instruction word as a line of the text output
+def formatWord(word, comment):
+    return '{0:032b}'.format(word) + " //" + comment
+
+"""
+------------------INSTRUCTION SET TABLE---------------------
+"""
+
+#operand field types
+#each field is described as (type, shift, bits, flag)
+REG         = 0 #register of 4 bits at shift
+CONST       = 1 #unsigned constant of bits at shift
+OFFSET      = 2 #constant of bits at shift, negative values set the bit at flag (N)
+REGCONST    = 3 #register at shift, or constant of bits at 12 which sets bit 27 (C)
+ADDRESS     = 4 #constant of bits at shift, or a label that is compiled in pass two
+LABELLOW    = 5 #lowest 16 bits of a label address
+LABELHIGH   = 6 #highest 11 bits of a 27 bit label address
+BRANCH      = 7 #16 bit offset that is added to the address of the branch, labels are converted into an offset
+
+#ARITH instructions: 0000 |C| OPCODE | 11 bit constant | A REG | B REG | D REG
+def arith(opcode):
+    return (opcode << 23, ((REG, 8, 4, 0), (REGCONST, 4, 11, 0), (REG, 0, 4, 0)))
+
+#branch instructions: opcode | 16 bit constant | A REG | B REG | xxxx
+def branch(opcode):
+    return (opcode << 28, ((REG, 8, 4, 0), (REG, 4, 4, 0), (BRANCH, 12, 16, 0)))
+
+#maps each mnemonic to (instruction word without operands, operand fields, comment)
+#the comment is formatted with the words of the line, so {1} is the first argument
+ISA = {
+    "halt"          : (0xFFFFFFFF, (), "Halt"),
+    "read"          : (0b1110 << 28, ((OFFSET, 12, 16, 5), (REG, 8, 4, 0), (REG, 0, 4, 0)), "Read at address in {2} with offset {1} to {3}"),
+    "write"         : (0b1101 << 28, ((OFFSET, 12, 16, 0), (REG, 8, 4, 0), (REG, 4, 4, 0)), "Write value in {3} to address in {2} with offset {1}"),
+    "copy"          : (0b1100 << 28, ((OFFSET, 12, 16, 0), (REG, 8, 4, 0), (REG, 4, 4, 0)), "Copy from address in {2} to address in {3} with offset {1}"),
+    "push"          : (0b1011 << 28, ((REG, 4, 4, 0),), "Push {1} to stack"),
+    "pop"           : (0b1010 << 28, ((REG, 0, 4, 0),), "Pop from stack to {1}"),
+    "jump"          : (0b1001 << 28, ((ADDRESS, 1, 27, 0),), "Jump to constant address {1}"),
+    "jumpo"         : (0b1001 << 28 | 1, ((CONST, 1, 27, 0),), "Jump to offset address {1}"),
+    "jumpr"         : (0b1000 << 28, ((CONST, 12, 16, 0), (REG, 4, 4, 0)), "Jump to reg {2} with offset {1}"),
+    "jumpro"        : (0b1000 << 28 | 1, ((CONST, 12, 16, 0), (REG, 4, 4, 0)), "Jump to offset in reg {2} with offset {1}"),
+    "load"          : (0b0111 << 28, ((CONST, 12, 16, 0), (REG, 0, 4, 0)), "Set {2} to {1}"),
+    "loadhi"        : (0b0111 << 28 | 1 << 8, ((CONST, 12, 16, 0), (REG, 0, 4, 0)), "Set highest 16 bits of {2} to {1}"),
+    "loadlabellow"  : (0b0111 << 28, ((LABELLOW, 12, 16, 0), (REG, 0, 4, 0)), "Set {2} to {1}"),
+    "loadlabelhigh" : (0b0111 << 28 | 1 << 8, ((LABELHIGH, 12, 16, 0), (REG, 0, 4, 0)), "Set highest 16 bits of {2} to {1}"),
+    "beq"           : branch(0b0110) + ("If {1} == {2}, then jump to offset {3}",),
+    "bne"           : branch(0b0101) + ("If {1} != {2}, then jump to offset {3}",),
+    "bgt"           : branch(0b0100) + ("If {1} > {2}, then jump to offset {3}",),
+    "bge"           : branch(0b0011) + ("If {1} >= {2}, then jump to offset {3}",),
+    "savpc"         : (0b0010 << 28, ((REG, 0, 4, 0),), "Save PC to {1}"),
+    "reti"          : (0b0001 << 28, (), "Return from interrupt"),
+    "or"            : arith(0b0000) + ("Compute {1} OR {2} and write result to {3}",),
+    "and"           : arith(0b0001) + ("Compute {1} AND {2} and write result to {3}",),
+    "xor"           : arith(0b0010) + ("Compute {1} XOR {2} and write result to {3}",),
+    "add"           : arith(0b0011) + ("Compute {1} + {2} and write result to {3}",),
+    "sub"           : arith(0b0100) + ("Compute {1} - {2} and write result to {3}",),
+    "shiftl"        : arith(0b0101) + ("Compute {1} << {2} and write result to {3}",),
+    "shiftr"        : arith(0b0110) + ("Compute {1} >> {2} and write result to {3}",),
+    "mult"          : arith(0b0111) + ("Compute {1} * {2} and write result to {3}",),
+    "not"           : (0b1000 << 23, ((REG, 8, 4, 0), (REG, 0, 4, 0)), "Compute NOT {1} and write result to {2}"),
+    "nop"           : (0, (), "NOP"),
+    "readintid"     : (0b1110 << 28 | 1 << 4, ((REG, 0, 4, 0),), "Read interrupt id to {1}"),
+}
+
+#field types that can have a label (or an expression with labels) as argument
+LABEL_FIELDS = (CONST, OFFSET, ADDRESS, LABELLOW, LABELHIGH, BRANCH)
+
+"""
+------------------LINE COMPILING FUNCTIONS---------------------
+"""
+
+#returns the index of the argument that is a label, or None if line has no label argument
+def getLabelArg(line):
+    fields = ISA[line[0].lower()][1]
+
+    if len(line) != len(fields) + 1:
+        return None
+
+    for idx, field in enumerate(fields, start=1):
+        if field[0] in LABEL_FIELDS and isLabel(line[idx]):
+            return idx
+
+    return None
+
+#checks if the line is a branch with a label as target
+def hasBranchLabel(line):
+    fields = ISA[line[0].lower()][1]
+    return len(fields) == 3 and fields[2][0] == BRANCH and getLabelArg(line) == 3
+
+
+#compiles an instruction from the ISA table into an instruction word and a comment
+#all labels in line should already be replaced by their address
+def encode(line):
+    base, fields, comment = ISA[line[0].lower()]
+
+    if len(line) != len(fields) + 1:
+        raise Exception("Incorrect number of arguments. Expected " + str(len(fields)) + ", but got " + str(len(line)-1))
+
+    word = base
+    args = line
+
+    for idx, (kind, shift, bits, flag) in enumerate(fields, start=1):
+        arg = line[idx]
+
+        if kind == REG:
+            word |= getReg(arg) << shift
+            continue
+
+        elif kind == CONST or kind == ADDRESS or kind == BRANCH:
+            value = getNumber(arg)
+            CheckFitsInBits(value, bits)
+            word |= value << shift
+
+        elif kind == OFFSET:
+            value, neg = getNumber(arg, True)
+            CheckFitsInBits(value, bits)
+            word |= value << shift | neg << flag
+            if neg:
+                value = -value
+
+        elif kind == REGCONST:
+            if arg[0].lower() == 'r':   #register argument
+                word |= getReg(arg) << shift
+                continue
+            else:                       #constant argument
+                value = getNumber(arg)
+                CheckFitsInBits(value, bits)
+                word |= 1 << 27 | value << 12
+
+        else: #LABELLOW or LABELHIGH
+            value = getNumber(arg)
+            if kind == LABELLOW:
+                value = value & 0xFFFF
+            else:
+                value = value >> 16
+                CheckFitsInBits(value, bits)
+            word |= value << shift
+
+        #the comment shows the value of expressions and the part of the address that is loaded
+        if kind == LABELLOW or kind == LABELHIGH or isExpression(arg):
+            if args is line:
+                args = list(line)
+            args[idx] = str(value)
+
+    return word, comment.format(*args)
+
+
+#compiles addr2reg instruction into loadlabellow and loadlabelhigh
+#should have 2 arguments
+#arg 1 should be a valid label
+#arg 2 should be a reg
+def compileAddr2reg(line):
+    if len(line) != 3:
+        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
+
+    #check if register is valid
+    getReg(line[2])
+
+    return [["loadlabellow", line[1], line[2]], ["loadlabelhigh", line[1], line[2]]]
+
+
+#compiles load32 instruction into load and loadhi
+#should have 2 arguments
+#arg 1 should be a number within 32 bits, or an expression with labels
+#arg 2 should be a reg
+def compileLoad32(line):
+    if len(line) != 3:
+        raise Exception("Incorrect number of arguments. Expected 2, but got " + str(len(line)-1))
+
+    #the value of labels is not known yet, so load both halves
+    if isLabel(line[1]):
+        getReg(line[2])
+        return [["loadlabellow", line[1], line[2]], ["loadlabelhigh", line[1], line[2]]]
+
+    #convert arg1 to number
+    arg1Int = getNumber(line[1])
+
+    #check if it fits in 16 bits, so we can skip the loadhi
+    if arg1Int.bit_length() <= 16:
+        return [["load", line[1], line[2]]]
+
+    #check if it fits in 32 bits
+    CheckFitsInBits(arg1Int, 32)
+
+    return [["load", str(arg1Int & 0xFFFF), line[2]], ["loadhi", str(arg1Int >> 16), line[2]]]
+
+
+#compiles a branch to a label that cannot be reached into an inverted branch over a jump
+#the inverted branch skips the jump when the condition of the original branch is false
+def compileFarBranch(line):
+    mnemonic, a, b, label = line[0].lower(), line[1], line[2], line[3]
+
+    if mnemonic == "beq":
+        inverted = ["bne", a, b, "2"]
+    elif mnemonic == "bne":
+        inverted = ["beq", a, b, "2"]
+    elif mnemonic == "bgt":     #not a > b is b >= a
+        inverted = ["bge", b, a, "2"]
+    else:                       #not a >= b is b > a
+        inverted = ["bgt", b, a, "2"]
+
+    return [inverted, ["jump", label]]
+
+
+#packs the arguments of a data instruction into 32 bit words
+#each argument should fit in the given number of bits
+#if a word cannot be filled, it will be padded by zeros
+def compileData(line, bits):
+    if len(line) < 2:
+        raise Exception("Incorrect number of arguments. Expected 1 or more, but got " + str(len(line)-1))
+
+    perWord = 32 // bits
+    words = []
+    word = 0
+    counter = 0
+
+    for i in line[1:]:
+        number = getNumber(i)
+        CheckFitsInBits(number, bits)
+        counter = counter + 1
+        word |= number << (32 - counter * bits)
+        if counter == perWord:
+            words.append(word)
+            word = 0
+            counter = 0
+
+    if counter != 0:
+        words.append(word)
+
+    return words
+
+#compiles .dw instruction
+def compileDw(line):
+    return compileData(line, 32)
+
+#compiles .dd instruction
+def compileDd(line):
+    return compileData(line, 16)
+
+#compiles .db instruction
+def compileDb(line):
+    return compileData(line, 8)
+
+#compiles .ds instruction by converting it to a .db instruction
+def compileDs(line):
+    if len(line) != 2:
+        raise Exception("Incorrect number of arguments. Expected 1, but got " + str(len(line)-1))
+
+    #.db instruction
+    dbList = []
+
+    dbList.append(".db")
+
+    # check for " "
+    if (line[1][0] == "\"" and line[1][-1] == "\""):
+        dbList = dbList + [str(ord(char)) for char in line[1][1:-1]]
+    else:
+        raise Exception("Invalid string: " + line[1])
+
+    return compileDb(dbList)
+
+
+#instructions that are converted into one or more instructions from the ISA table
+PSEUDO = {
+    "addr2reg"  : compileAddr2reg,
+    "load32"    : compileLoad32,
+}
+
+#instructions that are converted into data words
+DATA = {
+    ".dw"       : compileDw,
+    ".dd"       : compileDd,
+    ".db"       : compileDb,
+    ".ds"       : compileDs,
+}
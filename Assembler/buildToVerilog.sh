@@ -1,7 +1,7 @@
 # Build script for assembly files
-if (python3 Assembler.py > ../Programmer/code.list) # compile and write to code.list in Programmer folder
+if (python3 Assembler.py -o ../Programmer/code.bin -p 4096 -l ../Programmer/code.list) # compile to code.bin and code.list in Programmer folder
    then
-   		# convert list to binary files, then copy the files to verilog folder
+   		# copy the binary file to verilog folder
    		# comment out the uart flasher to use simulation instead
        	
        	# WSL2 version
@@ -16,6 +16,6 @@ if (python3 Assembler.py > ../Programmer/code.list) # compile and write to code.
        	# convert to text file
 		(cd ../Verilog/memory && bash bin2txt.sh && echo "Converted to txt")
    else
-   		# print the error, which is in code.list
-       	(cat ../Programmer/code.list)
+   		# the error is already printed by the assembler
+       	echo "Failed to assemble"
 fi
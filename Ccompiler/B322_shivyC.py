@@ -38,19 +38,9 @@ SOFTWARE.
 """
 
 import argparse
-import pathlib
-import platform
-import subprocess
 import sys
-import pprint
 
-import shivyc.lexer as lexer
-import shivyc.preproc as preproc
-
-from shivyc.errors import error_collector, CompilerError
-from shivyc.parser.parser import parse
-from shivyc.il_gen import ILCode, SymbolTable, Context
-from shivyc.asm_gen import ASMCode, ASMGen
+from shivyc.errors import error_collector, collect_errors, CompilerError
 
 
 def main():
@@ -65,15 +55,19 @@ def main():
         print("Expected one input file, got ", str(len(arguments.files)))
         return -1
 
-    asm = process_file(arguments.files[0], arguments)
+    with collect_errors() as errors:
+        asm = process_file(arguments.files[0], arguments)
 
     # print complete assembly to stdout
     if asm:
         print(asm)
 
-    error_collector.show()
+    if arguments.json_diagnostics:
+        errors.show_json()
+    else:
+        errors.show()
 
-    if len(error_collector.issues) == 0:
+    if len(errors.issues) == 0:
         sys.exit(0)
     
     else:
@@ -94,16 +88,22 @@ def process_file(file, args):
 
 
 def process_c_file(file, args):
-    """Compile a C file into assembly code and return the code as string."""
+    """Compile a C file into assembly code and return the code as string.
+
+    Each stage of the compiler is imported when it is reached, so a compile
+    that stops early does not pay for importing the later stages.
+    """
     code = read_file(file)
     if not error_collector.ok():
         return None
 
-    token_list, defineDict = lexer.tokenize(code, file)
+    import shivyc.lexer as lexer
+    token_list = lexer.tokenize(code, file)
     if not error_collector.ok():
         return None
 
-    token_list = preproc.process(token_list, file, defineDict)
+    import shivyc.preproc as preproc
+    token_list = preproc.process(token_list, file)
     if not error_collector.ok():
         return None
 
@@ -112,11 +112,13 @@ def process_c_file(file, args):
     # If parse() can salvage the input into a parse tree, it may emit an
     # ast_root even when there are errors saved to the error_collector. In this
     # case, we still want to continue the compiler stages.
+    from shivyc.parser.parser import parse
     ast_root = parse(token_list)
 
     if not ast_root:
         return None
 
+    from shivyc.il_gen import ILCode, SymbolTable, Context
     il_code = ILCode()
 
     symbol_table = SymbolTable()
@@ -124,6 +126,7 @@ def process_c_file(file, args):
     if not error_collector.ok():
         return None
 
+    from shivyc.asm_gen import ASMCode, ASMGen
     asm_code = ASMCode()
 
     # This is the part we mostly want to modify to generate B322 ASM code instead of x86_64 ASM code
@@ -157,6 +160,11 @@ def get_arguments():
                         help="display register allocator performance info",
                         dest="show_reg_alloc_perf", action="store_true")
 
+    # Boolean flag for whether to print warnings and errors as JSON
+    parser.add_argument("-json-diagnostics",
+                        help="display warnings and errors as JSON",
+                        dest="json_diagnostics", action="store_true")
+
     return parser.parse_args()
 
 
@@ -204,6 +212,8 @@ def find_library(file):
 
     If found, returns the path. Otherwise, returns None.
     """
+    import pathlib
+
     search_paths = [pathlib.Path("/usr/local/lib/x86_64-linux-gnu"),
                     pathlib.Path("/lib/x86_64-linux-gnu"),
                     pathlib.Path("/usr/lib/x86_64-linux-gnu"),
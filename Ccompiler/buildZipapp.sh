@@ -0,0 +1,18 @@
+#!/bin/bash
+
+# script for packing the C compiler into a single executable file, B322_shivyC.pyz
+# the archive contains precompiled bytecode, so the interpreter does not have to compile the compiler on a cold start
+# the bytecode only works with the python3 version that built the archive, other versions fall back to the source code
+
+build=$(mktemp -d)
+trap 'rm -rf "$build"' EXIT
+
+cp B322_shivyC.py "$build"
+cp -r shivyc "$build"
+find "$build" -name "__pycache__" -prune -exec rm -rf {} +
+
+# zipimport only loads .pyc files that are next to their source, not the ones in __pycache__
+python3 -m compileall -q -b "$build" || exit 1
+
+python3 -m zipapp "$build" -m "B322_shivyC:main" -p "/usr/bin/env python3" -o B322_shivyC.pyz || exit 1
+echo "Created B322_shivyC.pyz, use it like: python3 B322_shivyC.pyz file.c"
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+"""
+Check the startup time of the C compiler.
+
+Runs the compiler on a C file under `python3 -X importtime` and adds up the
+time spent importing modules, which is the part of every compile that does
+not depend on the input. The check fails if the imports take longer than the
+startup budget, or if the compiler imports a module that a compile does not
+need. The best of several runs is used, because a single run is noisy.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Maximum time in milliseconds that the imports of a compile may take.
+STARTUP_BUDGET_MS = 60
+
+# Modules that are slow to import and not needed to compile a file. They
+# used to be imported on every run and should stay out of the startup path.
+FORBIDDEN_MODULES = {"pprint", "dataclasses", "inspect", "subprocess",
+                     "platform", "pathlib", "json"}
+
+
+def measure(compiler, c_file):
+    """Compile c_file once and return the import times.
+
+    Returns a dict mapping the name of each imported module to its
+    cumulative import time in microseconds, and the total import time of the
+    top level imports in microseconds.
+    """
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", compiler, c_file],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
+
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+
+        # top level imports are indented by exactly one space
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return modules, total
+
+
+def main():
+    """Run the startup check and return the exit code."""
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("file", nargs="?",
+                        default=os.path.join(here, "tests", "a.c"),
+                        help="C file to compile (default: tests/a.c)")
+    parser.add_argument("-n", type=int, default=10, dest="runs",
+                        help="number of runs (default: 10)")
+    parser.add_argument("-b", type=float, default=STARTUP_BUDGET_MS,
+                        dest="budget", help="startup budget in milliseconds")
+    parser.add_argument("-v", action="store_true", dest="verbose",
+                        help="list the slowest imports of the best run")
+    args = parser.parse_args()
+
+    compiler = os.path.join(here, "B322_shivyC.py")
+
+    # The first run writes the bytecode caches, so it is not counted.
+    measure(compiler, args.file)
+    modules, total = min((measure(compiler, args.file)
+                          for _ in range(args.runs)), key=lambda m: m[1])
+
+    ok = True
+    print(f"startup imports: {total / 1000:.1f} ms "
+          f"(budget {args.budget:g} ms)")
+    if total > args.budget * 1000:
+        print("startup budget exceeded")
+        ok = False
+
+    for name in sorted(FORBIDDEN_MODULES & modules.keys()):
+        print(f"module '{name}' is imported on startup")
+        ok = False
+
+    if args.verbose:
+        slowest = sorted(modules.items(), key=lambda m: -m[1])[:20]
+        for name, cumulative in slowest:
+            print(f"{cumulative / 1000:8.1f} ms  {name}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,10 +12,10 @@ do
         echo "C code successfully compiled"
 
         echo "Assembling B332 ASM code"
-        if (cd ../Assembler && python3 Assembler.py > ../Programmer/code.list) # compile and write to code.list in Programmer folder
+        if (cd ../Assembler && python3 Assembler.py -o ../Programmer/code.bin -p 4096 -l ../Programmer/code.list) # compile to code.bin and code.list in Programmer folder
         then
                 echo "B332 ASM code successfully assembled"
-                # convert list to binary files and send to FPGC4
+                # send binary file to FPGC4
 
                 # WSL2 version
                 # (cd ../Programmer && bash compileROM.sh && echo "Sending binary to FPGC4" && powershell.exe "python uartFlasher_win.py testMode; exit \$LASTEXITCODE ")
@@ -29,9 +29,8 @@ do
 
                 # WSL version
 
-        else # assemble failed, run again to show error
+        else # assemble failed, the error is already printed
             echo "Failed to assemble B332 ASM code"
-            cd ../Assembler && python3 Assembler.py
         fi
     else # compile failed, run again to show error
         echo "Failed to compile C code"
@@ -1,10 +1,14 @@
 """Objects for the IL->ASM stage of the compiler."""
 
 import itertools
+from copy import copy
 
-import pprint
 import shivyc.asm_cmds as asm_cmds
+import shivyc.ctypes as ctypes
+import shivyc.il_cmds.control as control_cmds
+import shivyc.il_cmds.value as value_cmds
 import shivyc.spots as spots
+from shivyc.il_gen import ILValue
 from shivyc.spots import Spot, RegSpot, MemSpot, LiteralSpot
 
 
@@ -258,12 +262,27 @@ Return_Interrupt:
 class NodeGraph:
     """Graph storing conflict and preference information.
 
-    self._real_nodes - list of all real nodes in this graph
-    self._all_nodes - list of all nodes in this graph, including precolored
-    self.conf - dictionary mapping each node to nodes with which it
-    has a conflict edge
-    self._pref - dictionary mapping each node to nodes with which it
-    has a preference edge
+    Every node gets an integer id when it is added to the graph. The
+    conflict edges are stored both as a bit matrix, where bit i of the row
+    of a node is set if the node conflicts with the node with id i, and as
+    an ordered set of neighbors of each node for iteration. The ordered
+    sets are dictionaries, because the order in which neighbors and
+    preferences are visited affects the result, and must not depend on the
+    ids of the ILValue objects.
+
+    self._ids - dictionary mapping each node to its id
+    self._real_nodes - ordered set of all real nodes in this graph
+    self._all_nodes - ordered set of all nodes in this graph, including
+    precolored
+    self._conf - dictionary mapping each node to an ordered set of nodes
+    with which it has a conflict edge
+    self._conf_bits - dictionary mapping each node to its row of the
+    conflict bit matrix
+    self._pref - dictionary mapping each node to an ordered set of nodes
+    with which it has a preference edge
+    self._shared - set of nodes whose conflict and preference sets are
+    shared with a copy of this graph, and must be copied before they are
+    changed
 
     The conflict and preference relations are symmetric. That is,
     if `n1 in self.conf[n2]`, then `n2 in self._conf[n1]` and vice versa.
@@ -271,55 +290,85 @@ class NodeGraph:
 
     def __init__(self, nodes=None):
         """Initialize NodeGraph."""
-        self._real_nodes = nodes or []
-        self._all_nodes = self._real_nodes[:]
-        self._conf = {n: [] for n in self._all_nodes}
-        self._pref = {n: [] for n in self._all_nodes}
+        self._ids = {}
+        self._real_nodes = {}
+        self._all_nodes = {}
+        self._conf = {}
+        self._conf_bits = {}
+        self._pref = {}
+        self._shared = set()
+
+        for n in nodes or []:
+            self._add_node(n)
+            self._real_nodes[n] = None
+
+    def _add_node(self, n):
+        """Add node n, without any edges, to the graph."""
+        self._ids[n] = len(self._ids)
+        self._all_nodes[n] = None
+        self._conf[n] = {}
+        self._conf_bits[n] = 0
+        self._pref[n] = {}
+
+    def _own(self, n):
+        """Copy the edge sets of n if they are shared with another graph."""
+        if n in self._shared:
+            self._shared.discard(n)
+            self._conf[n] = dict(self._conf[n])
+            self._pref[n] = dict(self._pref[n])
 
     def is_node(self, n):
         """Check whether given node is in the graph."""
-        return n in self._conf and n in self._pref
+        return n in self._conf
 
     def add_dummy_node(self, v):
         """Add a dummy node to graph."""
-        self._all_nodes.append(v)
-        self._conf[v] = []
-        self._pref[v] = []
+        self._add_node(v)
 
         # Dummy nodes must mutually conflict
-        for n in self._all_nodes:
+        for n in list(self._all_nodes):
             if n not in self._real_nodes and n != v:
                 self.add_conflict(n, v)
 
     def add_conflict(self, n1, n2):
         """Add a conflict edge between n1 and n2."""
-        if n2 not in self._conf[n1]:
-            self._conf[n1].append(n2)
-        if n1 not in self._conf[n2]:
-            self._conf[n2].append(n1)
+        if not self.conflicts(n1, n2):
+            self._own(n1)
+            self._own(n2)
+            self._conf[n1][n2] = None
+            self._conf[n2][n1] = None
+            self._conf_bits[n1] |= 1 << self._ids[n2]
+            self._conf_bits[n2] |= 1 << self._ids[n1]
 
     def add_pref(self, n1, n2):
         """Add a preference edge between n1 and n2."""
         if n2 not in self._pref[n1]:
-            self._pref[n1].append(n2)
+            self._own(n1)
+            self._pref[n1][n2] = None
         if n1 not in self._pref[n2]:
-            self._pref[n2].append(n1)
+            self._own(n2)
+            self._pref[n2][n1] = None
 
     def pop(self, n):
         """Remove and return node n from this graph."""
+        bit = 1 << self._ids[n]
+        for c in self._conf[n]:
+            if c != n:
+                self._own(c)
+                self._conf[c].pop(n, None)
+                self._conf_bits[c] &= ~bit
+        for p in self._pref[n]:
+            if p != n:
+                self._own(p)
+                del self._pref[p][n]
+
         del self._conf[n]
+        del self._conf_bits[n]
         del self._pref[n]
+        self._shared.discard(n)
 
-        if n in self._real_nodes:
-            self._real_nodes.remove(n)
-        self._all_nodes.remove(n)
-
-        for v in self._conf:
-            if n in self._conf[v]:
-                self._conf[v].remove(n)
-        for v in self._pref:
-            if n in self._pref[v]:
-                self._pref[v].remove(n)
+        self._real_nodes.pop(n, None)
+        del self._all_nodes[n]
         return n
 
     def merge(self, n1, n2):
@@ -329,75 +378,89 @@ class NodeGraph:
         graph and n1 gets the preference neighbors and conflict neighbors
         that n2 previously had.
         """
+        bit1 = 1 << self._ids[n1]
+        bit2 = 1 << self._ids[n2]
 
-        # Merge conflict lists
-        total_conf = self._conf[n1][:]
+        # Merge conflict sets, and restore symmetric invariant
+        self._own(n1)
         for c in self._conf[n2]:
-            if c not in total_conf:
-                total_conf.append(c)
-
-        self._conf[n1] = total_conf
-
-        # Restore symmetric invariant
-        for c in self._conf[n1]:
-            if n2 in self._conf[c]:
-                self._conf[c].remove(n2)
-            if n1 not in self._conf[c]:
-                self._conf[c].append(n1)
+            self._own(c)
+            self._conf[c].pop(n2, None)
+            self._conf[c][n1] = None
+            self._conf_bits[c] = (self._conf_bits[c] & ~bit2) | bit1
+            self._conf[n1][c] = None
+        self._conf_bits[n1] |= self._conf_bits[n2]
 
         # Merge preference lists
-        total_pref = self._pref[n1][:]
+        total_pref = dict(self._pref[n1])
         for p in self._pref[n2]:
-            if p not in total_pref:
-                total_pref.append(p)
+            total_pref[p] = None
 
-        if n1 in total_pref: total_pref.remove(n1)
-        if n2 in total_pref: total_pref.remove(n2)
+        total_pref.pop(n1, None)
+        total_pref.pop(n2, None)
         self._pref[n1] = total_pref
 
         # Restore symmetric invariant
-        for c in self._pref[n1]:
-            if n2 in self._pref[c]:
-                self._pref[c].remove(n2)
-            if n1 not in self._pref[c]:
-                self._pref[c].append(n1)
+        for c in total_pref:
+            self._own(c)
+            self._pref[c].pop(n2, None)
+            self._pref[c].setdefault(n1, None)
 
         del self._conf[n2]
+        del self._conf_bits[n2]
         del self._pref[n2]
-        self._real_nodes.remove(n2)
-        self._all_nodes.remove(n2)
+        self._shared.discard(n2)
+        del self._real_nodes[n2]
+        del self._all_nodes[n2]
 
     def remove_pref(self, n1, n2):
         """Remove the preference edge between n1 and n2."""
-        self._pref[n1].remove(n2)
-        self._pref[n2].remove(n1)
+        self._own(n1)
+        self._own(n2)
+        del self._pref[n1][n2]
+        del self._pref[n2][n1]
+
+    def conflicts(self, n1, n2):
+        """Return whether n1 and n2 have a conflict edge."""
+        return bool(self._conf_bits[n1] >> self._ids[n2] & 1)
+
+    def union_degree(self, n1, n2):
+        """Return the number of nodes conflicting with n1 or n2."""
+        return bin(self._conf_bits[n1] | self._conf_bits[n2]).count("1")
 
     def prefs(self, n):
-        """Return the list of nodes to which n has a preference edge."""
+        """Return the ordered set of nodes to which n has a preference edge."""
         return self._pref[n]
 
     def confs(self, n):
-        """Return the list of nodes with which n has a conflict edge."""
+        """Return the ordered set of nodes conflicting with n."""
         return self._conf[n]
 
     def nodes(self):
         """Return the real nodes currently in this graph."""
-        return self._real_nodes
+        return self._real_nodes.keys()
 
     def all_nodes(self):
         """Return all nodes in this graph, including pseudonodes."""
-        return self._all_nodes
+        return self._all_nodes.keys()
 
     def copy(self):
-        """Return a deep copy of this graph, but with same ILValue objects."""
+        """Return a copy of this graph, but with same ILValue objects.
+
+        The conflict and preference sets of the nodes are shared by the two
+        graphs until either graph changes them.
+        """
         g = NodeGraph()
 
-        g._real_nodes = self._real_nodes[:]
-        g._all_nodes = self._all_nodes[:]
-        for n in self._all_nodes:
-            g._conf[n] = self._conf[n][:]
-            g._pref[n] = self._pref[n][:]
+        g._ids = self._ids.copy()
+        g._real_nodes = self._real_nodes.copy()
+        g._all_nodes = self._all_nodes.copy()
+        g._conf = self._conf.copy()
+        g._conf_bits = self._conf_bits.copy()
+        g._pref = self._pref.copy()
 
+        self._shared = set(self._all_nodes)
+        g._shared = set(self._all_nodes)
         return g
 
     def __str__(self):  # pragma: no cover
@@ -405,7 +468,290 @@ class NodeGraph:
         return ("Conf\n" +
                 "\n".join(str((v, self._conf[v])) for v in self._all_nodes)
                 + "\nPref\n" +
-                "\n".join(str((v, self._pref[v])) for v in self._all_nodes))
+                "\n".join(str((v, list(self._pref[v])))
+                          for v in self._all_nodes))
+
+
+class RegisterAllocator:
+    """Register allocator using iterated register coalescing.
+
+    This is the algorithm of George & Appel, "Iterated Register
+    Coalescing". Nodes are kept on worklists by their degree and whether
+    they are move related, so each step of simplify, coalesce, freeze or
+    spill takes the next node from a worklist instead of searching the
+    whole graph. The preference edges of the graph play the role of moves.
+
+    The dummy nodes of the graph are the precolored registers. A node that
+    gets no register when colors are assigned is spilled, together with the
+    nodes coalesced into it, and placed in memory by the caller. Several
+    nodes may be spilled this way in one allocation.
+
+    g (NodeGraph) - Conflict and preference graph. Coalescing adds conflict
+    edges to this graph.
+    registers (List[Spot]) - Registers to allocate, preferred-first.
+    spill_costs (Dict(ILValue -> number)) - Estimated cost of keeping each
+    node in memory instead of a register. Coalescing adds the cost of a
+    node to the node it is coalesced into.
+
+    The worklists are dictionaries used as ordered sets, so the allocation
+    only depends on the order of the nodes in the graph.
+    """
+
+    def __init__(self, g, registers, spill_costs):
+        """Initialize the worklists for the given graph."""
+        self.g = g
+        self.registers = registers
+        self.K = len(registers)
+        self.spill_costs = dict(spill_costs)
+
+        self.precolored = set(g.all_nodes()) - set(g.nodes())
+        self.degree = {n: len(g.confs(n)) for n in g.nodes()}
+
+        # Node worklists and sets
+        self.simplify_worklist = {}
+        self.freeze_worklist = {}
+        self.spill_worklist = {}
+        self.coalesced = {}
+        self.select_stack = []
+        self.on_stack = set()
+        self.alias = {}
+
+        # Moves, which are the preference edges as (node, node) tuples. A
+        # move is on exactly one of the move worklists, or is coalesced,
+        # constrained or frozen and then on none of them.
+        self.worklist_moves = {}
+        self.active_moves = {}
+        self.move_list = {n: {} for n in g.all_nodes()}
+        seen = set()
+        for n1 in g.all_nodes():
+            seen.add(n1)
+            for n2 in g.prefs(n1):
+                if n2 not in seen:
+                    move = (n1, n2)
+                    self.worklist_moves[move] = None
+                    self.move_list[n1][move] = None
+                    self.move_list[n2][move] = None
+
+        for n in g.nodes():
+            if self.degree[n] >= self.K:
+                self.spill_worklist[n] = None
+            elif self.move_related(n):
+                self.freeze_worklist[n] = None
+            else:
+                self.simplify_worklist[n] = None
+
+    def allocate(self):
+        """Allocate registers.
+
+        Returns a dictionary mapping every node that got a register to that
+        register, and a list of the groups of nodes that must be spilled.
+        The nodes of a group were coalesced, so they can share one spot.
+        """
+        while True:
+            if self.simplify_worklist:
+                self.simplify()
+            elif self.worklist_moves:
+                self.coalesce()
+            elif self.freeze_worklist:
+                self.freeze()
+            elif self.spill_worklist:
+                self.select_spill()
+            else:
+                break
+
+        return self.assign_colors()
+
+    def adjacent(self, n):
+        """Return the neighbors of n that are still in the graph."""
+        return [t for t in self.g.confs(n)
+                if t not in self.on_stack and t not in self.coalesced]
+
+    def node_moves(self, n):
+        """Return the moves of n that may still be coalesced."""
+        return [m for m in self.move_list[n]
+                if m in self.active_moves or m in self.worklist_moves]
+
+    def move_related(self, n):
+        """Return whether n has a move that may still be coalesced."""
+        return any(m in self.active_moves or m in self.worklist_moves
+                   for m in self.move_list[n])
+
+    def get_alias(self, n):
+        """Return the node that n has been coalesced into, or n itself."""
+        while n in self.coalesced:
+            n = self.alias[n]
+        return n
+
+    def simplify(self):
+        """Remove a node of low degree that is not move related."""
+        n = next(iter(self.simplify_worklist))
+        del self.simplify_worklist[n]
+
+        self.select_stack.append(n)
+        self.on_stack.add(n)
+        for t in self.adjacent(n):
+            self.decrement_degree(t)
+
+    def decrement_degree(self, n):
+        """Decrement the degree of n, moving it to a lower worklist."""
+        if n in self.precolored:
+            return
+
+        self.degree[n] -= 1
+        if self.degree[n] == self.K - 1:
+            self.enable_moves([n] + self.adjacent(n))
+            del self.spill_worklist[n]
+            if self.move_related(n):
+                self.freeze_worklist[n] = None
+            else:
+                self.simplify_worklist[n] = None
+
+    def enable_moves(self, nodes):
+        """Make the active moves of the given nodes worth trying again."""
+        for n in nodes:
+            for m in self.node_moves(n):
+                if m in self.active_moves:
+                    del self.active_moves[m]
+                    self.worklist_moves[m] = None
+
+    def add_worklist(self, n):
+        """Move n to the simplify worklist if it can be simplified now."""
+        if (n in self.freeze_worklist and not self.move_related(n) and
+                self.degree[n] < self.K):
+            del self.freeze_worklist[n]
+            self.simplify_worklist[n] = None
+
+    def is_significant(self, n):
+        """Return whether n has significant degree."""
+        return n in self.precolored or self.degree[n] >= self.K
+
+    def coalesce(self):
+        """Coalesce the next move, if it is safe to do so.
+
+        A move with a precolored node is coalesced by the George test, and
+        a move between two other nodes by the Briggs test.
+        """
+        move = next(iter(self.worklist_moves))
+        del self.worklist_moves[move]
+
+        x = self.get_alias(move[0])
+        y = self.get_alias(move[1])
+        u, v = (y, x) if y in self.precolored else (x, y)
+
+        if u == v:
+            self.add_worklist(u)
+        elif v in self.precolored or self.g.conflicts(u, v):
+            self.add_worklist(u)
+            self.add_worklist(v)
+        elif u in self.precolored and all(
+                t in self.precolored or self.degree[t] < self.K or
+                self.g.conflicts(t, u) for t in self.adjacent(v)):
+            self.combine(u, v)
+            self.add_worklist(u)
+        elif u not in self.precolored and sum(
+                self.is_significant(t)
+                for t in set(self.adjacent(u)) | set(self.adjacent(v))
+        ) < self.K:
+            self.combine(u, v)
+            self.add_worklist(u)
+        else:
+            self.active_moves[move] = None
+
+    def combine(self, u, v):
+        """Coalesce v into u."""
+        if v in self.freeze_worklist:
+            del self.freeze_worklist[v]
+        else:
+            del self.spill_worklist[v]
+        self.coalesced[v] = None
+        self.alias[v] = u
+        if u not in self.precolored:
+            self.spill_costs[u] += self.spill_costs[v]
+        self.move_list[u].update(self.move_list[v])
+        self.enable_moves([v])
+
+        # Each neighbor of v loses v as a neighbor and gains u, unless it
+        # already conflicts with u.
+        for t in self.adjacent(v):
+            if self.g.conflicts(t, u):
+                self.decrement_degree(t)
+            else:
+                self.g.add_conflict(t, u)
+                if u not in self.precolored:
+                    self.degree[u] += 1
+
+        if (u not in self.precolored and self.degree[u] >= self.K and
+                u in self.freeze_worklist):
+            del self.freeze_worklist[u]
+            self.spill_worklist[u] = None
+
+    def freeze(self):
+        """Give up coalescing the moves of a node of low degree."""
+        n = next(iter(self.freeze_worklist))
+        del self.freeze_worklist[n]
+        self.simplify_worklist[n] = None
+        self.freeze_moves(n)
+
+    def freeze_moves(self, n):
+        """Give up coalescing all moves of n."""
+        for move in self.node_moves(n):
+            x, y = move
+            if self.get_alias(y) == self.get_alias(n):
+                v = self.get_alias(x)
+            else:
+                v = self.get_alias(y)
+
+            self.active_moves.pop(move, None)
+            self.worklist_moves.pop(move, None)
+
+            if (v in self.freeze_worklist and not self.move_related(v) and
+                    self.degree[v] < self.K):
+                del self.freeze_worklist[v]
+                self.simplify_worklist[v] = None
+
+    def select_spill(self):
+        """Choose a node of high degree to be simplified, and maybe spilled.
+
+        The node with the lowest spill cost per conflict is chosen, which
+        is cheap to keep in memory and frees a register for many others.
+        """
+        n = min(self.spill_worklist,
+                key=lambda n: self.spill_costs[n] / self.degree[n])
+        del self.spill_worklist[n]
+        self.simplify_worklist[n] = None
+        self.freeze_moves(n)
+
+    def assign_colors(self):
+        """Pop nodes off the select stack and give each a register."""
+        spotmap = {n: n for n in self.precolored}
+        spilled = []
+
+        while self.select_stack:
+            n = self.select_stack.pop()
+            used = set()
+            for t in self.g.confs(n):
+                t = self.get_alias(t)
+                if t in spotmap:
+                    used.add(spotmap[t])
+
+            for reg in self.registers:
+                if reg not in used:
+                    spotmap[n] = reg
+                    break
+            else:
+                spilled.append(n)
+
+        groups = {n: [n] for n in spilled}
+        for n in self.coalesced:
+            alias = self.get_alias(n)
+            if alias in spotmap:
+                spotmap[n] = spotmap[alias]
+            else:
+                groups[alias].append(n)
+
+        for n in self.precolored:
+            del spotmap[n]
+        return spotmap, list(groups.values())
 
 
 class ASMGen:
@@ -424,6 +770,10 @@ class ASMGen:
     # List of registers used by the get_reg function.
     all_registers = alloc_registers
 
+    # Number of times registers are allocated again after splitting the
+    # live ranges of spilled values.
+    split_rounds = 3
+
     def __init__(self, il_code, symbol_table, asm_code, arguments):
         """Initialize ASMGen."""
         self.il_code = il_code
@@ -506,68 +856,45 @@ class ASMGen:
                 global_spotmap[v] = MemSpot(spots.RBP, -self.offset)
                 free_values.remove(v)
 
-        # Perform liveliness analysis
-        live_vars = self._get_live_vars(commands, free_values)
-
-        #print(live_vars)
-
-        # Generate conflict and preference graph
-        g_bak = self._generate_graph(commands, free_values, live_vars)
-
-        spilled_nodes = []
-
-        while True:
-            g = g_bak.copy()
-
-            # Remove all nodes that have been spilled for this iteration
-            for n in spilled_nodes:
-                g.pop(n)
-
-            removed_nodes = []
-            merged_nodes = {}
-
-            # Repeat simplification, coalescing, and freeze until freeze
-            # does not work.
-            while True:
-                # Repeat simplification and coalescing until nothing
-                # happens.
-                while True:
-                    simplified = self._simplify_all(removed_nodes, g)
-                    merged = self._coalesce_all(merged_nodes, g)
+        live_vars, g_bak, spotmap, spilled_groups = self._allocate(
+            commands, free_values)
+
+        # Instead of keeping the spilled values in memory in the whole
+        # function, split their live ranges so that they are only in memory
+        # where no register is free. If a part of a split value is spilled
+        # again, that value is not split and registers are allocated again.
+        split = {v for group in spilled_groups for v in group
+                 if v.ctype.is_scalar() and
+                 not v.ctype.weak_compat(ctypes.bool_t)}
+        for _ in range(self.split_rounds):
+            if not split:
+                break
 
-                    if not simplified and not merged: break
+            split_commands, parents = self._split_live_ranges(
+                commands, live_vars, split)
+            if not parents:
+                break
 
-                if not self._freeze(g):
-                    break
+            split_values = self._get_free_values(
+                split_commands, global_spotmap)
+            result = self._allocate(split_commands, split_values)
 
-            # If no nodes remain, we are done
-            if not g.nodes():
+            failed = {parents[v] for group in result[3] for v in group
+                      if v in parents}
+            if not failed:
+                commands, free_values = split_commands, split_values
+                live_vars, g_bak, spotmap, spilled_groups = result
                 break
-            # If nodes do remain, spill one of them and retry
-            else:
-                # Spill node with highest number of conflicts. This node
-                # will never be a merged node because we merge nodes
-                # conservatively, so any recently merged node can be
-                # simplified immediately.
-                n = max(g.nodes(), key=lambda n: len(g.confs(n)))
-                spilled_nodes.append(n)
-
-        # Move any remaining nodes from graph into removed_nodes
-        # This accounts for pseudonodes which cannot be removed in the
-        # simplify phase.
-        while g.all_nodes():
-            removed_nodes.append(g.pop(g.all_nodes()[0]))
-
-        #print(removed_nodes)
-        # Pop values off the stack to generate spot assignments.
-        spotmap = self._generate_spotmap(removed_nodes, merged_nodes, g_bak)
-
-        #print(spotmap)
-
-        # Assign stack values to the spilled nodes
-        for v in spilled_nodes:
-            self.offset += v.ctype.size
-            spotmap[v] = MemSpot(spots.RBP, -self.offset)
+            split -= failed
+
+        # Assign stack values to the spilled nodes. Nodes that were
+        # coalesced do not conflict, so they share a stack value.
+        spilled_nodes = []
+        for group in spilled_groups:
+            self.offset += max(v.ctype.size for v in group)
+            for v in group:
+                spotmap[v] = MemSpot(spots.RBP, -self.offset)
+            spilled_nodes += group
 
         # Merge global spotmap into this spotmap
         for v in global_spotmap:
@@ -593,6 +920,159 @@ class ASMGen:
         # Generate assembly code
         self._generate_asm(commands, live_vars, spotmap)
 
+    def _allocate(self, commands, free_values):
+        """Allocate registers to the free values of a command list.
+
+        returns - tuple of the live variables of each command, the conflict
+        and preference graph, a spotmap for the values that got a register,
+        and a list of the groups of values that must be spilled
+        """
+        # Perform liveliness analysis
+        live_vars = self._get_live_vars(commands, free_values)
+
+        # Generate conflict and preference graph
+        g = self._generate_graph(commands, free_values, live_vars)
+
+        # Allocate registers by iterated register coalescing. The allocator
+        # adds conflicts to the graph it is given, so give it a copy.
+        spill_costs = self._get_spill_costs(commands, free_values)
+        allocator = RegisterAllocator(
+            g.copy(), self.alloc_registers, spill_costs)
+        spotmap, spilled_groups = allocator.allocate()
+
+        return live_vars, g, spotmap, spilled_groups
+
+    def _split_live_ranges(self, commands, live_vars, split):
+        """Split the live ranges of the given values into regions.
+
+        The commands are split into regions at the start of each basic
+        block and after each function call, which clobbers the registers.
+        In each region that references a value at least twice, the value
+        is renamed to a new ILValue. The new value is copied from the old
+        one at the start of the region if the region uses it before
+        defining it, and copied back at the end of the region if the
+        region defines it and it is live after the region. So the old
+        value is only referenced by these copies, and the new value has a
+        short live range that can get a register even when the old one
+        cannot.
+
+        A value whose only definition sets it to a literal is
+        rematerialized: it is renamed in every region that uses it and
+        the new value is set to the literal, instead of copied from
+        memory.
+
+        commands - list of commands to split
+        live_vars - live variables of each command, as from _get_live_vars
+        split - set of ILValues to split
+        returns - tuple of the new list of commands, and a dictionary
+        mapping each new ILValue to the value it was split from
+        """
+        # Find the values to rematerialize
+        defs = {}
+        for command in commands:
+            for v in command.outputs():
+                if v in split:
+                    defs.setdefault(v, []).append(command)
+        remat = {}
+        for v, def_cmds in defs.items():
+            if (len(def_cmds) == 1 and
+                    isinstance(def_cmds[0], value_cmds.Set) and
+                    def_cmds[0].arg in self.il_code.literals):
+                remat[v] = def_cmds[0].arg
+
+        starts = [0]
+        for i, command in enumerate(commands):
+            if command.label_name() and i != starts[-1]:
+                starts.append(i)
+            if ((command.targets() or isinstance(command, control_cmds.Call))
+                    and i + 1 < len(commands)):
+                starts.append(i + 1)
+        ends = starts[1:] + [len(commands)]
+
+        new_commands = []
+        parents = {}
+        for start, end in zip(starts, ends):
+            # Count the references to each value, and find the values used
+            # before they are defined and the values defined in the region.
+            counts = {}
+            used_first = set()
+            defined = set()
+            for command in commands[start:end]:
+                for v in command.inputs():
+                    if v in split:
+                        counts[v] = counts.get(v, 0) + 1
+                        if v not in defined:
+                            used_first.add(v)
+                for v in command.outputs():
+                    if v in split:
+                        counts[v] = counts.get(v, 0) + 1
+                        defined.add(v)
+
+            renames = {}
+            copies_in = []
+            copies_out = []
+            live_out = set(live_vars[end - 1][1])
+            for v, count in counts.items():
+                if count < 2 and not (v in remat and v not in defined):
+                    continue
+
+                new_v = ILValue(v.ctype)
+                renames[v] = new_v
+                parents[new_v] = v
+                if v in used_first:
+                    copies_in.append(value_cmds.Set(new_v, remat.get(v, v)))
+                if v in defined and v in live_out:
+                    copies_out.append(value_cmds.Set(v, new_v))
+
+            region = [self._rename_values(command, renames)
+                      for command in commands[start:end]]
+
+            # Copy in after the label of the region. Copy out before the
+            # jump or call that ends it, so that the new values are not
+            # live across the call, except for the value the call returns.
+            last = commands[end - 1]
+            head = 1 if commands[start].label_name() else 0
+            region[head:head] = copies_in
+            if last.targets():
+                region[-1:-1] = copies_out
+            elif isinstance(last, control_cmds.Call):
+                ret = [c for c in copies_out if c.output in last.outputs()]
+                region[-1:-1] = [c for c in copies_out if c not in ret]
+                region += ret
+            else:
+                region += copies_out
+            new_commands += region
+
+        # A rematerialized value that is no longer used need not be set.
+        used = {v for command in new_commands for v in command.inputs()}
+        new_commands = [command for command in new_commands
+                        if not (isinstance(command, value_cmds.Set) and
+                                command.output in remat and
+                                command.output not in used)]
+
+        return new_commands, parents
+
+    def _rename_values(self, command, renames):
+        """Return a copy of command with its ILValues renamed.
+
+        renames - dictionary mapping ILValues to the ILValues to replace
+        them with
+        returns - the command itself if it references none of the values
+        """
+        if not renames or not any(
+                v in renames for v in command.inputs() + command.outputs()):
+            return command
+
+        new_command = copy(command)
+        for name, value in vars(command).items():
+            if isinstance(value, ILValue):
+                setattr(new_command, name, renames.get(value, value))
+            elif isinstance(value, list):
+                setattr(new_command, name,
+                        [renames.get(v, v) if isinstance(v, ILValue) else v
+                         for v in value])
+        return new_command
+
     def _get_global_spotmap(self):
         """Generate global spotmap.
 
@@ -673,67 +1153,169 @@ class ASMGen:
 
         return free_values
 
+    def _get_spill_costs(self, commands, free_values):
+        """Estimate the cost of spilling each free value.
+
+        Each use or definition of a value costs 10 ** d, where d is the
+        loop depth of the command. A loop is the range of commands from a
+        label to a later jump back to it, so values used in inner loops,
+        like loop counters, are the most costly to spill.
+
+        returns - dictionary mapping each free value to its spill cost
+        """
+        labels = {}
+        for i, command in enumerate(commands):
+            if command.label_name():
+                labels[command.label_name()] = i
+
+        # Find the loop depth of each command by adding one at the start of
+        # each loop and subtracting one after its end.
+        change = [0] * (len(commands) + 1)
+        for i, command in enumerate(commands):
+            for label in command.targets():
+                if labels[label] <= i:
+                    change[labels[label]] += 1
+                    change[i + 1] -= 1
+
+        spill_costs = {v: 0 for v in free_values}
+        depth = 0
+        for i, command in enumerate(commands):
+            depth += change[i]
+            weight = 10 ** depth
+            for v in command.inputs() + command.outputs():
+                if v in spill_costs:
+                    spill_costs[v] += weight
+
+        return spill_costs
+
     def _get_live_vars(self, commands, free_values):
         """Given a set of free ILValues, find when those ILValues are live.
 
+        The commands are split into basic blocks, and the live variables at
+        the entry and exit of each block are found by a worklist dataflow
+        analysis, where a set of ILValues is an integer with one bit per
+        free value. The live variables of each command are then recovered
+        in one backward pass over each block.
+
         free_values - list of ILValues for which to perform liveliness analysis
         returns - array mapping command indices to a tuple where first
         element is a list of variables live coming into the command and the
         second is a list of the variables live exiting the command
         """
-        # Preprocess all commands to get a mapping from labels to command
-        # number.
-        labels = {c.label_name(): i for i, c in enumerate(commands)
-                  if c.label_name()}
-
-        # Last iteration of live variables
-        prev_live_vars = None
-
-        # This iteration of live variables
-        live_vars = [([], []) for i in range(len(commands))]
-
-        while live_vars != prev_live_vars:
-            prev_live_vars = live_vars[:]
-
-            # List of currently live variables
-            cur_live = []
-
-            # Iterate through commands in backwards order
-            for i, command in list(enumerate(commands))[::-1]:
-                # If current command is a jump, add the live inputs of all
-                # possible targets to the current live list.
-                for label in command.targets():
-                    i2 = labels[label]
-                    for v in prev_live_vars[i2][0]:
-                        if v not in cur_live:
-                            cur_live.append(v)
+        if not commands:
+            return []
 
-                # Variables live on output from this command
-                out_live = cur_live[:]
+        bit = {v: 1 << i for i, v in enumerate(free_values)}
 
+        # Bitsets of the free values used and defined by each command
+        uses = []
+        defs = []
+        for command in commands:
+            used = 0
+            for v in command.inputs():
+                used |= bit.get(v, 0)
+            defined = 0
+            for v in command.outputs():
+                defined |= bit.get(v, 0)
+            uses.append(used)
+            defs.append(defined)
+
+        # Split the commands into basic blocks. A block starts at a label
+        # and ends after a command that may jump. Every command may also
+        # continue with the next command.
+        starts = [0]
+        for i, command in enumerate(commands):
+            if command.label_name() and i != starts[-1]:
+                starts.append(i)
+            if command.targets() and i + 1 < len(commands):
+                starts.append(i + 1)
+        ends = starts[1:] + [len(commands)]
+
+        block_of = {commands[start].label_name(): b
+                    for b, start in enumerate(starts)
+                    if commands[start].label_name()}
+
+        # Successors and predecessors of each block
+        succs = []
+        for b, end in enumerate(ends):
+            succ = [block_of[label] for label in commands[end - 1].targets()]
+            if b + 1 < len(starts):
+                succ.append(b + 1)
+            succs.append(succ)
+
+        preds = [[] for _ in starts]
+        for b, succ in enumerate(succs):
+            for b2 in succ:
+                preds[b2].append(b)
+
+        # Summarize each block as a function from variables live on exit to
+        # variables live on entry, in the form (live & ~kill) | gen.
+        gens = []
+        kills = []
+        for start, end in zip(starts, ends):
+            gen = kill = 0
+            for i in range(end - 1, start - 1, -1):
+                gen = (uses[i] & ~defs[i]) | (gen & ~defs[i])
+                kill |= defs[i]
+            gens.append(gen)
+            kills.append(kill)
+
+        # Find the variables live on entry to and exit from each block
+        live_in = [0] * len(starts)
+        live_out = [0] * len(starts)
+        worklist = list(range(len(starts)))
+        on_worklist = set(worklist)
+        while worklist:
+            b = worklist.pop()
+            on_worklist.discard(b)
+
+            out = 0
+            for b2 in succs[b]:
+                out |= live_in[b2]
+            live_out[b] = out
+
+            new_in = (out & ~kills[b]) | gens[b]
+            if new_in != live_in[b]:
+                live_in[b] = new_in
+                for b2 in preds[b]:
+                    if b2 not in on_worklist:
+                        worklist.append(b2)
+                        on_worklist.add(b2)
+
+        # Convert bitsets back to lists of ILValues, reusing the list for
+        # equal bitsets.
+        lists = {}
+
+        def to_list(bits):
+            if bits not in lists:
+                live = lists[bits] = []
+                rest = bits
+                while rest:
+                    low = rest & -rest
+                    live.append(free_values[low.bit_length() - 1])
+                    rest ^= low
+            return lists[bits]
+
+        # Recover the variables live at each command
+        live_vars = [None] * len(commands)
+        for b, (start, end) in enumerate(zip(starts, ends)):
+            cur_live = live_out[b]
+            for i in range(end - 1, start - 1, -1):
                 # Add variables used in this command to current live variables
-                for v in command.inputs():
-                    if v in free_values and v not in cur_live:
-                        cur_live.append(v)
+                used_live = cur_live | uses[i]
 
-                # Remove variables defined in this command to live variables
-                for v in command.outputs():
-                    if v in free_values:
-                        if v in cur_live:
-                            cur_live.remove(v)
-                        else:
-                            # If variable is defined in command but was not
-                            # live, make it live on output from this command.
+                # If a variable is defined in the command but was not live,
+                # make it live on output from this command.
+                #
+                # TODO: Deal with this more efficiently. If the output is
+                # not live, then we don't actually need to perform this
+                # computation.
+                out_live = cur_live | (defs[i] & ~used_live)
 
-                            # TODO: Deal with this more efficiently.
-                            # If the output is not live, then we don't actually
-                            # need to perform this computation.
-                            out_live.append(v)
+                # Remove variables defined in this command from live variables
+                cur_live = used_live & ~defs[i]
 
-                # Variables live on input from this command
-                in_live = cur_live[:]
-
-                live_vars[i] = (in_live, out_live)
+                live_vars[i] = (to_list(cur_live), to_list(out_live))
 
         return live_vars
 
@@ -794,172 +1376,6 @@ class ASMGen:
                         g.add_pref(v, s)
         return g
 
-    def _simplify_all(self, removed_nodes, g):
-        """Repeat the Simplify step until no more can be done.
-
-        Returns False iff no simplification is done.
-
-        removed_nodes - stack of removed nodes to which this function adds
-        the nodes it removes
-        """
-
-        # Get nodes without preference edges
-        no_pref = [v for v in g.nodes() if not g.prefs(v)]
-
-        # Repeat simplification until no more nodes can be removed
-        did_something = False
-        while True:
-            rem = self._simplify_once(no_pref, g)
-            if rem:
-                removed_nodes.append(rem)
-                no_pref.remove(rem)
-                did_something = True
-            else:
-                break
-
-        return did_something
-
-    def _simplify_once(self, nodes, g):
-        """Remove and return a node in nodes if it has low conflict degree."""
-        for v in nodes:
-            # If the node has low conflict degree remove it from the graph
-            if len(g.confs(v)) < len(self.alloc_registers):
-                return g.pop(v)
-
-    def _coalesce_all(self, merged_nodes, g):
-        """Repeat the coalesce step until no more can be done.
-
-        Returns False iff no simplification is done.
-
-        merged_nodes - Mapping from node to list of nodes. Every node in the
-        list of nodes has been merged into the key node.
-        """
-        did_something = False
-        while True:
-            merge = self._coalesce_once(g)
-            if merge:
-                if merge[0] not in merged_nodes:
-                    merged_nodes[merge[0]] = []
-
-                merged_nodes[merge[0]].append(merge[1])
-                did_something = True
-            else:
-                break
-
-        return did_something
-
-    def _coalesce_once(self, g):
-        """Perform one iteration of the coalesce step.
-
-        Returns the merged pair if a merge was successfully completed. The
-        first element is the preserved node, and the second element is the
-        removed node.
-        """
-        for v1 in g.nodes():
-            for v2 in g.prefs(v1):
-                # If the two nodes conflict, automatically continue.
-                if v1 in g.confs(v2):
-                    continue
-
-                total_confs = len(set(g.confs(v1)) | set(g.confs(v2)))
-
-                # If one is a spot, use a special heuristic.
-                # (described on section 6, page 311 of George & Appel)
-                if isinstance(v1, Spot):
-                    v1, v2 = v2, v1
-                if isinstance(v2, Spot):
-                    for T in g.confs(v1):
-                        if v2 in g.confs(T):
-                            continue
-                        if len(g.confs(T)) < len(self.alloc_registers):
-                            continue
-                        break
-                    else:
-                        # We can merge v1 into v2.
-                        g.merge(v2, v1)
-                        return v2, v1
-
-                # Otherwise, apply regular merging rules.
-                elif total_confs < len(self.alloc_registers):
-                    g.merge(v1, v2)
-                    return v1, v2
-
-    def _freeze(self, g):
-        """Remove one preference edge.
-
-        This function finds two nodes, preferably of low conflict degree,
-        that are connected by a preference edge. Then, this preference edge
-        is removed from the graph. Returns false iff nothing is done.
-        """
-
-        # Sort a list of nodes by conflict degree
-        nodes = sorted(g.all_nodes(), key=lambda n: len(g.confs(n)))
-        index_pairs = list(itertools.combinations(list(enumerate(nodes)), 2))
-
-        # Sort pairs to prioritize nodes which appear earlier in `nodes`
-        index_pairs.sort(key=lambda p: p[0][0] + p[1][0])
-
-        # Extract just the node pairs
-        pairs = [(p[0][1], p[1][1]) for p in index_pairs]
-
-        # Now, the earlier pairs in `pairs` have lower conflict degree and
-        # are thus superior candidates for freezing.
-        for n1, n2 in pairs:
-                if n1 in g.prefs(n2):
-                    g.remove_pref(n1, n2)
-                    return True
-
-        return False
-
-    def _generate_spotmap(self, removed_nodes, merged_nodes, g):
-        """Pop values off stack to generate spot assignments."""
-
-        # Get a set of nodes which interfere with n or anything merged into it
-        def get_conflicts(n):
-            conflicts = set(g.confs(n))
-            for n1 in merged_nodes.get(n, []):
-                conflicts |= get_conflicts(n1)
-            return conflicts
-
-        # Get a set of nodes which are merged into `n`
-        def get_merged(n):
-            merged = {n}
-            for n1 in merged_nodes.get(n, []):
-                merged |= get_merged(n1)
-            return merged
-
-        # Build up spotmap
-        spotmap = {}
-        i = 0
-        while removed_nodes:
-            i += 1
-
-            # Allocate register to node `n`
-            n1 = removed_nodes.pop()
-            regs = self.alloc_registers[::-1]
-
-            # If n1 is a Spot (i.e. dummy node), immediately assign it a
-            # register.
-            if n1 in regs:
-                reg = n1
-            else:
-                # Don't chose any conflicting spots
-                for n2 in get_conflicts(n1):
-                    # If n2 is a physical spot
-                    if n2 in regs:
-                        regs.remove(n2)
-                    if n2 in spotmap and spotmap[n2] in regs:
-                        regs.remove(spotmap[n2])
-
-                # Based on algorithm, there should always be register remaining
-                reg = regs.pop()
-
-            # Assign this register to every node merged into n1
-            for n2 in get_merged(n1):
-                spotmap[n2] = reg
-
-        return spotmap
-
     def _generate_asm(self, commands, live_vars, spotmap):
         """Generate assembly code."""
 
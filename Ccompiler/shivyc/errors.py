@@ -3,43 +3,116 @@
 The main executable catches an exception and prints it for the user.
 
 """
+import bisect
+import itertools
+from contextlib import contextmanager
 
 
 class ErrorCollector:
     """Class that accumulates all errors and warnings encountered.
 
+    Issues are kept in the order they were added, with a running count of
+    errors and warnings, and are only sorted by position when displayed.
+
     We create a global instance of this class so all parts of the compiler can
-    access it and add errors to it. This is kind of janky, but it's much easier
-    than passing an instance to every function that could potentially fail.
+    access it and add errors to it (see collect_errors).
 
+    issues (List[CompilerError]) - Issues in the order they were added.
+    errors (int) - Number of errors among the issues.
+    warnings (int) - Number of warnings among the issues.
     """
 
     def __init__(self):
         """Initialize the ErrorCollector with no issues to report."""
         self.issues = []
+        self.errors = 0
+        self.warnings = 0
 
     def add(self, issue):
         """Add the given error or warning (CompilerError) to list of errors."""
         self.issues.append(issue)
-        self.issues.sort()
+        if issue.warning:
+            self.warnings += 1
+        else:
+            self.errors += 1
 
     def ok(self):
         """Return True iff there are no errors."""
-        return not any(not issue.warning for issue in self.issues)
+        return not self.errors
+
+    def truncate(self, count):
+        """Remove every issue except the first count issues added."""
+        for issue in self.issues[count:]:
+            if issue.warning:
+                self.warnings -= 1
+            else:
+                self.errors -= 1
+        del self.issues[count:]
+
+    def sorted_issues(self):
+        """Return the issues sorted by their position.
+
+        Issues without a range come first. Issues in different files are
+        ordered by the file in which an issue was first added.
+        """
+        files = {}
+
+        def position(issue):
+            if not issue.range:
+                return 0, 0, 0, 0
+            start = issue.range.start
+            return (1, files.setdefault(start.file, len(files)),
+                    start.line, start.col)
+
+        return sorted(self.issues, key=position)
 
     def show(self):  # pragma: no cover
         """Display all warnings and errors."""
-        for issue in self.issues:
+        for issue in self.sorted_issues():
             print(issue)
 
+    def show_json(self):  # pragma: no cover
+        """Display all warnings and errors as a JSON list."""
+        import json
+        print(json.dumps([issue.to_json() for issue in self.sorted_issues()],
+                         indent=2))
+
     def clear(self):
         """Clear all warnings and errors. Intended only for testing use."""
         self.issues = []
+        self.errors = 0
+        self.warnings = 0
 
 
 error_collector = ErrorCollector()
 
 
+@contextmanager
+def collect_errors(collector=None):
+    """Collect the errors added to error_collector in the given collector.
+
+    All parts of the compiler add their errors to the global
+    `error_collector`. This is kind of janky, but it's much easier than
+    passing a collector to every function that could potentially fail.
+
+    collector (ErrorCollector) - Collector to use, or None for a new one.
+
+    Swaps the issues of collector into error_collector and yields collector.
+    On exit the issues are swapped back, so collector holds every issue
+    added meanwhile and error_collector is as it was before. The parser and
+    preprocessor also keep their state in globals, so compilations must not
+    run concurrently.
+    """
+    collector = collector or ErrorCollector()
+    outer = dict(vars(error_collector))
+    vars(error_collector).update(vars(collector))
+    try:
+        yield collector
+    finally:
+        vars(collector).update(vars(error_collector))
+        vars(error_collector).update(outer)
+
+
 class Position:
     """Class representing a position in source code.
 
@@ -62,6 +135,36 @@ class Position:
         return Position(self.file, self.line, self.col + 1, self.full_line)
 
 
+class Source:
+    """Class representing the text of a source file.
+
+    Positions in the file are stored as offsets into the text, and are only
+    converted into a Position when a diagnostic needs one.
+
+    file (str) - Name of the file.
+    text (str) - Full contents of the file.
+    """
+
+    def __init__(self, file, text):
+        """Initialize Source object."""
+        self.file = file
+        self.text = text
+        self._line_starts = None
+
+    def position(self, offset):
+        """Return the Position of the character at the given offset."""
+        if self._line_starts is None:
+            self._line_starts = list(itertools.accumulate(
+                [0] + [len(line) for line in self.text.splitlines(True)]))
+
+        line = bisect.bisect_right(self._line_starts, offset)
+        line = min(line, len(self._line_starts) - 1)
+        start = self._line_starts[line - 1]
+        end = self._line_starts[line]
+        full_line = "".join(self.text[start:end].splitlines())
+        return Position(self.file, line, offset - start + 1, full_line)
+
+
 class Range:
     """Class representing a continuous range between two positions.
 
@@ -79,6 +182,42 @@ class Range:
         return Range(self.start, other.end)
 
 
+class SourceRange(Range):
+    """Range between two offsets in a Source.
+
+    The start and end Positions are computed when they are first needed, so
+    creating a range for every token is cheap.
+
+    source (Source) - Source file of the range.
+    start_offset (int) - offset of the first character, inclusive
+    end_offset (int) - offset of the last character, inclusive
+    """
+
+    def __init__(self, source, start_offset, end_offset=None):
+        """Initialize SourceRange objects."""
+        self.source = source
+        self.start_offset = start_offset
+        self.end_offset = (start_offset if end_offset is None
+                           else end_offset)
+
+    @property
+    def start(self):
+        """Return the start Position of this range."""
+        return self.source.position(self.start_offset)
+
+    @property
+    def end(self):
+        """Return the end Position of this range."""
+        return self.source.position(self.end_offset)
+
+    def __add__(self, other):
+        """Add Range objects by concatenating their ranges."""
+        if isinstance(other, SourceRange) and other.source is self.source:
+            return SourceRange(self.source, self.start_offset,
+                               other.end_offset)
+        return Range(self.start, other.end)
+
+
 class CompilerError(Exception):
     """Class representing compile-time errors.
 
@@ -146,6 +285,16 @@ class CompilerError(Exception):
             return (f"{bold_color}shivyc: {color_code}{issue_type}:"
                     f"{reset_color} {self.descrip}")
 
+    def to_json(self):
+        """Return a dictionary describing this issue, for JSON output."""
+        issue = {"severity": "warning" if self.warning else "error",
+                 "message": self.descrip}
+        if self.range:
+            start, end = self.range.start, self.range.end
+            issue.update(file=start.file, line=start.line, column=start.col,
+                         end_line=end.line, end_column=end.col)
+        return issue
+
     def __lt__(self, other):  # pragma: no cover
         """Provides sort order for printing errors."""
 
@@ -82,31 +82,21 @@ class _GeneralJump(ILCommand):
             asm_code.add(asm_cmds.Cmp(spotmap[self.cond], zero_spot, size))
 
 
-        asm_code.add(self.command(RegSpot("r0"), RegSpot("r12"), LiteralSpot(2)))
-        #not bgt r12 r0 2 -> bge r0 r12 2
-        #not bge r12 r0 2 -> bgt r0 r12 2
+        # the assembler turns this into an inverted branch over a jump
+        # when the label is above the branch or too far away
+        asm_code.add(self.command(RegSpot("r0"), RegSpot("r12"), LiteralSpot("Label_" + self.label)))
 
-        #not beq r12 r0 2 -> bne r0 r12 2
-        #not bne r12 r0 2 -> beq r0 r12 2
-
-        asm_code.add(asm_cmds.Jump(self.label))
-
-        #asm_code.add(self.command(self.label))
-
-# NOTE:
-# these comparisons are inverted, because in b332 asm we jump to offset 2 to skip the jump to label
-# confusing, so think hard on this!
 
 class JumpZero(_GeneralJump):
     """Jumps to a label if given condition is zero."""
 
-    command = asm_cmds.Bne
+    command = asm_cmds.Beq
 
 
 class JumpNotZero(_GeneralJump):
-    """Jumps to a label if given condition is zero."""
+    """Jumps to a label if given condition is not zero."""
 
-    command = asm_cmds.Beq
+    command = asm_cmds.Bne
 
 
 class Return(ILCommand):
@@ -234,8 +224,34 @@ class Call(ILCommand):
             useR13 = True
             asm_code.add(asm_cmds.Read(func_spot, spots.RegSpot("r13"), func_size))
 
+        # Move the arguments in registers into the argument registers. An
+        # argument may be in the register of another argument, so this is a
+        # parallel move: a register is only written once no remaining move
+        # reads it, and a cycle of moves is broken by saving one register
+        # in r12.
+        moves = {}
+        for arg, reg in zip(self.args, self.arg_regs):
+            if isinstance(spotmap[arg], RegSpot) and spotmap[arg] != reg:
+                moves[reg] = (spotmap[arg], arg.ctype.size)
+
+        while moves:
+            sources = {src for src, _ in moves.values()}
+            for reg, (src, size) in moves.items():
+                if reg not in sources:
+                    asm_code.add(asm_cmds.Mov(reg, src, size))
+                    del moves[reg]
+                    break
+            else:
+                reg = next(iter(moves))
+                asm_code.add(asm_cmds.Mov(spots.RegSpot("r12"), reg))
+                for r, (src, size) in moves.items():
+                    if src == reg:
+                        moves[r] = (spots.RegSpot("r12"), size)
+
+        # The arguments in memory or literals do not read any register, so
+        # they are moved last.
         for arg, reg in zip(self.args, self.arg_regs):
-            if spotmap[arg] == reg:
+            if spotmap[arg] == reg or isinstance(spotmap[arg], RegSpot):
                 continue
 
             if isinstance(spotmap[arg], spots.MemSpot):
@@ -100,9 +100,19 @@ class _AddMult(ILCommand):
                     asm_code.add(self.Inst(temp, spots.RegSpot("r12"), size))
 
                 else:
-                    asm_code.add(asm_cmds.Read(arg1_spot, temp, size))
-                    asm_code.add(asm_cmds.Read(arg2_spot, spots.RegSpot("r12"), size))
-                    asm_code.add(self.Inst(temp, spots.RegSpot("r12"), size))
+                    # At least one argument is in memory
+                    if isinstance(arg1_spot, spots.MemSpot):
+                        asm_code.add(asm_cmds.Read(arg1_spot, temp, size))
+                    elif isinstance(arg1_spot, spots.LiteralSpot):
+                        asm_code.add(asm_cmds.Load(arg1_spot, temp, size))
+                    else:
+                        asm_code.add(asm_cmds.Mov(temp, arg1_spot, size))
+
+                    if isinstance(arg2_spot, spots.MemSpot):
+                        asm_code.add(asm_cmds.Read(arg2_spot, spots.RegSpot("r12"), size))
+                        asm_code.add(self.Inst(temp, spots.RegSpot("r12"), size))
+                    else:
+                        asm_code.add(self.Inst(temp, arg2_spot, size))
             
 
             else:  # both are imm64
@@ -110,7 +120,10 @@ class _AddMult(ILCommand):
                     "never reach because of constant folding")
 
         if temp != spotmap[self.output]:
-            asm_code.add(asm_cmds.Mov(spotmap[self.output], temp, size))
+            if isinstance(spotmap[self.output], spots.MemSpot):
+                asm_code.add(asm_cmds.Write(spotmap[self.output], temp, size))
+            else:
+                asm_code.add(asm_cmds.Mov(spotmap[self.output], temp, size))
 
 
 class Add(_AddMult):
@@ -183,7 +196,10 @@ class _BitShiftCmd(ILCommand):
                                     [arg2_spot, spots.RCX])
                 asm_code.add(asm_cmds.Mov(temp_spot, arg1_spot, arg1_size))
                 arg1_spot = temp_spot
-            asm_code.add(asm_cmds.Mov(spots.RCX, arg2_spot, arg2_size))
+            if isinstance(arg2_spot, spots.MemSpot):
+                asm_code.add(asm_cmds.Read(arg2_spot, spots.RCX, arg2_size))
+            else:
+                asm_code.add(asm_cmds.Mov(spots.RCX, arg2_spot, arg2_size))
             arg2_spot = spots.RCX
 
         if spotmap[self.output] == arg1_spot:
@@ -198,7 +214,10 @@ class _BitShiftCmd(ILCommand):
                     asm_code.add(asm_cmds.Mov(temp_spot, arg1_spot, arg1_size))
             asm_code.add(self.Inst(temp_spot, arg2_spot, arg1_size))
             if temp_spot != out_spot:
-                asm_code.add(asm_cmds.Mov(out_spot, temp_spot, arg1_size))
+                if isinstance(out_spot, spots.MemSpot):
+                    asm_code.add(asm_cmds.Write(out_spot, temp_spot, arg1_size))
+                else:
+                    asm_code.add(asm_cmds.Mov(out_spot, temp_spot, arg1_size))
 
 
 class RBitShift(_BitShiftCmd):
@@ -260,7 +279,10 @@ class _AndOrXorCmd(ILCommand):
                                     [arg2_spot, spots.RCX])
                 asm_code.add(asm_cmds.Mov(temp_spot, arg1_spot, arg1_size))
                 arg1_spot = temp_spot
-            asm_code.add(asm_cmds.Mov(spots.RCX, arg2_spot, arg2_size))
+            if isinstance(arg2_spot, spots.MemSpot):
+                asm_code.add(asm_cmds.Read(arg2_spot, spots.RCX, arg2_size))
+            else:
+                asm_code.add(asm_cmds.Mov(spots.RCX, arg2_spot, arg2_size))
             arg2_spot = spots.RCX
 
         if spotmap[self.output] == arg1_spot:
@@ -277,7 +299,10 @@ class _AndOrXorCmd(ILCommand):
 
             asm_code.add(self.Inst(temp_spot, arg2_spot, arg1_size))
             if temp_spot != out_spot:
-                asm_code.add(asm_cmds.Mov(out_spot, temp_spot, arg1_size))
+                if isinstance(out_spot, spots.MemSpot):
+                    asm_code.add(asm_cmds.Write(out_spot, temp_spot, arg1_size))
+                else:
+                    asm_code.add(asm_cmds.Mov(out_spot, temp_spot, arg1_size))
 
 
 class And(_AndOrXorCmd):
@@ -1,12 +1,12 @@
 """Objects used for the AST -> IL phase of the compiler."""
 
-from collections import namedtuple
 from copy import copy
 
 from shivyc.ctypes import CType
 import shivyc.il_cmds.control as control_cmds
 import shivyc.il_cmds.value as value_cmds
 from shivyc.errors import CompilerError
+from shivyc.scopes import ScopedTable
 
 
 class ILCode:
@@ -163,8 +163,6 @@ class SymbolTable:
     This object stores variable names, types, typedefs, and maintains
     information on the variable linkages and storage durations.
     """
-    Tables = namedtuple('Tables', ['vars', 'structs'])
-
     # Definition statuses
     UNDEFINED = 1
     TENTATIVE = 2
@@ -181,11 +179,12 @@ class SymbolTable:
     def __init__(self):
         """Initialize symbol table.
 
-        `tables` is a list of namedtuples of dictionaries. Each dictionary
-        in the namedtuple is the symbol table for a different namespace.
+        `vars` and `structs` are the scoped tables for the namespace of
+        ordinary identifiers and the namespace of struct and union tags.
 
         """
-        self.tables = []
+        self.vars = ScopedTable()
+        self.structs = ScopedTable()
 
         # Store variable linkages
         # ILValue -> INTERNAL / EXTERNAL
@@ -206,15 +205,15 @@ class SymbolTable:
         # ILValue -> name
         self.names = {}
 
-        self.new_scope()
-
     def new_scope(self):
         """Initialize a new scope for the symbol table."""
-        self.tables.append(self.Tables(dict(), dict()))
+        self.vars.new_scope()
+        self.structs.new_scope()
 
     def end_scope(self):
         """End the most recently started scope."""
-        self.tables.pop()
+        self.vars.end_scope()
+        self.structs.end_scope()
 
     def _lookup_raw(self, name):
         """Look up the identifier or ctype with the given name.
@@ -223,9 +222,7 @@ class SymbolTable:
 
         name (str) - Identifier name to search for.
         """
-        for table, _ in self.tables[::-1]:
-            if name in table:
-                return table[name]
+        return self.vars.lookup(name)
 
     def lookup_variable(self, identifier):
         """Look up the given identifier.
@@ -264,8 +261,8 @@ class SymbolTable:
         name = identifier.content
 
         # if it's already declared in this scope
-        if name in self.tables[-1].vars:
-            var = self.tables[-1].vars[name]
+        var = self.vars.lookup_local(name)
+        if var is not None:
             if isinstance(var, CType):
                 err = f"redeclared type definition '{name}' as variable"
                 raise CompilerError(err, identifier.r)
@@ -288,7 +285,7 @@ class SymbolTable:
             # completed an object type)
             var.ctype = ctype
 
-        self.tables[-1].vars[name] = var
+        self.vars.bind(name, var)
 
         # Set this variable's linkage if it has one
         if linkage:
@@ -311,8 +308,7 @@ class SymbolTable:
 
         If not found, returns None.
         """
-        for _, structs in self.tables[::-1]:
-            if tag in structs: return structs[tag]
+        return self.structs.lookup(tag)
 
     def add_struct_union(self, tag, ctype):
         """Add struct or union to the symbol table and return it.
@@ -322,17 +318,17 @@ class SymbolTable:
         Otherwise, this function adds this type to the topmost scope and
         returns it.
         """
-        if tag not in self.tables[-1].structs:
-            self.tables[-1].structs[tag] = ctype
+        if self.structs.lookup_local(tag) is None:
+            self.structs.bind(tag, ctype)
 
-        return self.tables[-1].structs[tag]
+        return self.structs.lookup_local(tag)
 
     def add_typedef(self, identifier, ctype):
         """Add a type definition to the symbol table."""
 
         name = identifier.content
-        if name in self.tables[-1].vars:
-            old_ctype = self.tables[-1].vars[name]
+        old_ctype = self.vars.lookup_local(name)
+        if old_ctype is not None:
             if isinstance(old_ctype, ILValue):
                 err = f"'{name}' redeclared as type definition in same scope"
                 raise CompilerError(err, identifier.r)
@@ -342,7 +338,7 @@ class SymbolTable:
             else:
                 return
 
-        self.tables[-1].vars[name] = ctype
+        self.vars.bind(name, ctype)
 
     def lookup_typedef(self, identifier):
         """Look up a typedef from the symbol table.
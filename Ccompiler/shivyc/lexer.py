@@ -3,249 +3,244 @@
 The lexing phase takes the entire contents of a raw input file and
 generates a flat list of tokens present in that input file.
 
+The input is scanned with one compiled regular expression. Characters are
+identified by their offset in the input text, and a Position is only created
+when a token range is actually used in a diagnostic.
+
 """
+import array
+import bisect
 import re
 
 import shivyc.token_kinds as token_kinds
-from shivyc.errors import CompilerError, Position, Range, error_collector
+from shivyc.errors import CompilerError, Source, SourceRange, error_collector
 from shivyc.tokens import Token
 from shivyc.token_kinds import symbol_kinds, keyword_kinds
 
-defineDict = {}
+# Map of symbol text to symbol kind, and of keyword text to keyword kind.
+symbol_map = {kind.text_repr: kind for kind in symbol_kinds}
+keyword_map = {kind.text_repr: kind for kind in keyword_kinds}
+
+# Master pattern that matches the next lexeme of a line. The symbols are
+# listed longest first (see TokenKind), so the longest symbol is matched. A
+# chunk is a run of characters that are neither whitespace nor the start of a
+# symbol, and becomes a keyword, number or identifier.
+symbol_chars = "".join(sorted({kind.text_repr[0] for kind in symbol_kinds}))
+lexeme_re = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<comment>/\*)"
+    r"|(?P<line_comment>//)"
+    r"|(?P<quote>[\"'])"
+    r"|(?P<symbol>" + "|".join(re.escape(kind.text_repr)
+                               for kind in symbol_kinds) + ")"
+    r"|(?P<chunk>[^\s" + re.escape(symbol_chars) + "]+)")
+
+identifier_re = re.compile(r"[_a-zA-Z][_a-zA-Z0-9]*$")
+
+# Line breaks recognized by str.splitlines, which is used to number the lines
+# of a Source. An escaped newline is a backslash followed by a line break, or
+# a backslash at the very end of the input.
+# TODO: GCC supports \ followed by whitespace. Should ShivyC do this too?
+break_chars = r"\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+line_break = r"(?:\r\n|[" + break_chars + "])"
+continuation_re = re.compile(r"\\(?:" + line_break + r"|\Z)")
+line_re = re.compile(r"([^" + break_chars + "]*)(?:" + line_break + r"|\Z)")
+
+
+class SplicedSource:
+    """Input text with every escaped newline removed.
+
+    The escaped newlines are removed in one pass over the text. For each
+    removal, the offset in the spliced text at which it happened and the
+    total number of characters removed so far are recorded, so an offset in
+    the spliced text can be mapped back to an offset in the source.
+
+    source (Source) - Source file that was spliced.
+    text (str) - Text of the source without escaped newlines.
+    """
+
+    def __init__(self, source):
+        """Splice the given source."""
+        self.source = source
+        self._splices = array.array("l")
+        self._removed = array.array("l")
+
+        pieces = []
+        start = 0
+        removed = 0
+        for match in continuation_re.finditer(source.text):
+            pieces.append(source.text[start:match.start()])
+            removed += match.end() - match.start()
+            self._splices.append(match.end() - removed)
+            self._removed.append(removed)
+            start = match.end()
+        pieces.append(source.text[start:])
+
+        self.text = "".join(pieces)
+
+    def offset(self, i):
+        """Return the source offset of self.text[i]."""
+        splice = bisect.bisect_right(self._splices, i)
+        return i + self._removed[splice - 1] if splice else i
+
+
+class Line:
+    """Class representing a logical line of the input.
 
-class Tagged:
-    """Class representing tagged characters.
+    A logical line can consist of multiple physical lines that were joined
+    because of an escaped newline.
 
-    c (char) - the character that is tagged
-    p (Position) - position of the tagged character
-    r (Range) - a length-one range for the character
+    text (str) - Text of the line, without newline characters.
+    spliced (SplicedSource) - Spliced text the line is part of.
+    start (int) - Offset of the line in the spliced text.
     """
 
-    def __init__(self, c, p):
-        """Initialize object."""
-        self.c = c
-        self.p = p
-        self.r = Range(p, p)
+    def __init__(self, text, spliced, start):
+        """Initialize a line that starts at the given spliced offset."""
+        self.text = text
+        self.spliced = spliced
+        self.start = start
+
+    def range(self, start, end=None):
+        """Return the range of text[start] up to and including text[end]."""
+        start_offset = self.spliced.offset(self.start + start)
+        end_offset = (start_offset if end is None
+                      else self.spliced.offset(self.start + end))
+        return SourceRange(self.spliced.source, start_offset, end_offset)
+
+    def end_range(self):
+        """Return the range of the last character of the line."""
+        return self.range(max(len(self.text) - 1, 0))
 
 
 def tokenize(code, filename):
     """Convert given code into a flat list of Tokens.
 
-    lines - List of list of Tagged objects, where each embedded list is a
-    separate line in the input program.
     return - List of Token objects.
     """
     # Store tokens as they are generated
     tokens = []
 
-    lines = split_to_tagged_lines(code, filename)
-    join_extended_lines(lines)
-
+    spliced = SplicedSource(Source(filename, code))
 
     in_comment = False
-    for line in lines:
+    for line in split_to_lines(spliced):
         try:
             line_tokens, in_comment = tokenize_line(line, in_comment)
+            if line_tokens:
+                line_tokens[0].bol = True
             tokens += line_tokens
         except CompilerError as e:
             error_collector.add(e)
 
-    #for token in tokens:
-    #    print(token.__dict__)
-    return tokens, defineDict
-
-
-def split_to_tagged_lines(text, filename):
-    """Split the input text into tagged lines.
-
-    No newline escaping or other preprocessing is done by this function.
-
-    text (str) - Input file contents as a string.
-    filename (str) - Input file name.
-    return - Tagged lines. List of list of Tagged objects, where each second
-    order list is a separate line in the input progam. No newline characters.
-    """
-    lines = text.splitlines()
-    tagged_lines = []
-    for line_num, line in enumerate(lines):
-        tagged_line = []
-        for col, char in enumerate(line):
-            p = Position(filename, line_num + 1, col + 1, line)
-            tagged_line.append(Tagged(char, p))
-        tagged_lines.append(tagged_line)
-
-        line_num += 1
-
-    return tagged_lines
+    return tokens
 
 
-def join_extended_lines(lines):
-    """Join together any lines which end in an escaped newline.
+def split_to_lines(spliced):
+    """Generate the logical lines of the spliced input text.
 
-    This function modifies the given lines object in place.
-
-    lines - List of list of Tagged objects, where each embedded list is a
-    separate line in the input program.
+    spliced (SplicedSource) - Input text without escaped newlines.
+    return - Iterator of Line objects, one for each logical line.
     """
-    # TODO: GCC supports \ followed by whitespace. Should ShivyC do this too?
-
-    i = 0
-    while i < len(lines):
-        if lines[i] and lines[i][-1].c == "\\":
-            # There is a next line to collapse into this one
-            if i + 1 < len(lines):
-                del lines[i][-1]  # remove trailing backslash
-                lines[i] += lines[i + 1]  # concatenate with next line
-                del lines[i + 1]  # remove next line
-
-                # Decrement i, so this line is checked for a new trailing
-                # backslash.
-                i -= 1
-
-            # There is no next line to collapse into this one
-            else:
-                # TODO: print warning?
-                del lines[i][-1]  # remove trailing backslash
-
-        i += 1
+    for match in line_re.finditer(spliced.text):
+        if match.end() == match.start():
+            break
+        yield Line(match.group(1), spliced, match.start())
 
 
 def tokenize_line(line, in_comment):
     """Tokenize the given single line.
 
-    line - List of Tagged objects.
+    line - Line object.
     in_comment - Whether the first character in this line is part of a
     C-style comment body.
     return - List of Token objects, and boolean indicating whether the next
     character is part of a comment body.
     """
     tokens = []
+    text = line.text
+
+    # First check (using a really hacky way) if this is ASM code
+    full_line = text.strip()
+    if full_line[0:5] == 'ASM("':
+        # TODO: create a special ASM token, and add the full string to the
+        # token
+        r = line.range(0, 1)
+        tokens.append(Token(token_kinds.asmcode, full_line, full_line, r=r))
+        tokens.append(Token(token_kinds.semicolon, ";", ";", r=r))
+        return tokens, in_comment
 
-    # line[chunk_start:chunk_end] is the section of the line currently
-    # being considered for conversion into a token; this string will be
-    # called the 'chunk'. Everything before the chunk has already been
-    # tokenized, and everything after has not yet been examined
-    chunk_start = 0
-    chunk_end = 0
-
-    # Flag that is set True if the line begins with `#` and `include`,
-    # perhaps with comments and whitespace in between.
-    include_line = False
     # Flag that is set True if the line is an include directive and the
     # filename has been seen and succesfully parsed.
     seen_filename = False
 
-    # Flag for defines
-    define_line = False
-
-    while chunk_end < len(line):
-        # First check (using a really hacky way) if this is ASM code
-
-        if chunk_start == 0:
-            fullLine = ""
-            for i in line:
-                fullLine += i.c
-            #print(fullLine)
-            fullLine = fullLine.strip() # remove leading and trailing whitespaces/tabs
-            if fullLine[0:5] == 'ASM("':
-                #print (fullLine)
-                chunk_start = len(line)
-                chunk_end = len(line)
-
-                # TODO: create a special ASM token, and add the full string to the token
-                tokens.append(Token(token_kinds.asmcode, fullLine, fullLine, r=Range(line[0].p, line[1].p)))
-                tokens.append(Token(token_kinds.semicolon, ";", ";", r=Range(line[0].p, line[1].p)))
-
-                break # break the while loop
-
-
-
-        symbol_kind = match_symbol_kind_at(line, chunk_end)
-        next_symbol_kind = match_symbol_kind_at(line, chunk_end + 1)
+    # Flag that is set True if whitespace or a comment was skipped since the
+    # last token.
+    separated = False
 
-        # Set include_line flag True as soon as a `#include` is detected.
-        if match_include_command(tokens):
-            include_line = True
+    i = 0
+    while i < len(text):
+        if in_comment:
+            # Skip until the end of the comment
+            end = text.find("*/", i)
+            if end == -1:
+                break
+            in_comment = False
+            separated = True
+            i = end + 2
+            continue
+
+        match = lexeme_re.match(text, i)
+        if not match:
+            break
+        kind = match.lastgroup
 
-        if match_define_command(tokens):
-            define_line = True
+        if kind == "space":
+            separated = True
+            i = match.end()
+            continue
 
-        if in_comment:
-            # If next characters end the comment...
-            if (symbol_kind == token_kinds.star and
-                    next_symbol_kind == token_kinds.slash):
-                in_comment = False
-                chunk_start = chunk_end + 2
-                chunk_end = chunk_start
-            # Otherwise, just skip one character.
-            else:
-                chunk_start = chunk_end + 1
-                chunk_end = chunk_start
-
-        # If next characters start a comment, process previous chunk and set
-        # in_comment to true.
-        elif (symbol_kind == token_kinds.slash and
-                next_symbol_kind == token_kinds.star):
-            add_chunk(line[chunk_start:chunk_end], tokens)
+        # If next characters start a comment, set in_comment to true.
+        if kind == "comment":
             in_comment = True
+            i = match.end()
+            continue
 
         # If next two characters are //, we skip the rest of this line.
-        elif (symbol_kind == token_kinds.slash and
-                next_symbol_kind == token_kinds.slash):
+        if kind == "line_comment":
             break
 
-        # Skip spaces and process previous chunk.
-        elif line[chunk_end].c.isspace():
-            add_chunk(line[chunk_start:chunk_end], tokens)
-            chunk_start = chunk_end + 1
-            chunk_end = chunk_start
-
-        # Really hacky way to parse the define lines
-        elif define_line:
-            fullLine = ""
-            for i in line:
-                fullLine += i.c
-
-            if fullLine.split()[2][0:2].lower() == "0x":
-                defineDict[fullLine.split()[1]] = str(int(fullLine.split()[2], 16))
-            elif fullLine.split()[2][0:2].lower() == "0b":
-                defineDict[fullLine.split()[1]] = str(int(fullLine.split()[2], 2))
-            else:
-                defineDict[fullLine.split()[1]] = fullLine.split()[2]
-            break
+        count = len(tokens)
 
-        # If this is an include line, and not a comment or whitespace,
-        # expect the line to match an include filename.
-        elif include_line:
+        # If this is an include line, expect the line to match an include
+        # filename.
+        if match_include_command(tokens) or seen_filename:
 
             # If the filename has already been seen, there should be no more
             # tokens.
             if seen_filename:
                 descrip = "extra tokens at end of include directive"
-                raise CompilerError(descrip, line[chunk_end].r)
+                raise CompilerError(descrip, line.range(i))
 
-            filename, end = read_include_filename(line, chunk_end)
+            filename, end = read_include_filename(line, i)
             tokens.append(Token(token_kinds.include_file, filename,
-                                r=Range(line[chunk_end].p, line[end].p)))
+                                r=line.range(i, end)))
 
-            chunk_start = end + 1
-            chunk_end = chunk_start
+            i = end + 1
             seen_filename = True
 
         # If next character is a quote, we read the whole string as a token.
-        elif symbol_kind in {token_kinds.dquote, token_kinds.squote}:
-            if symbol_kind == token_kinds.dquote:
-                quote_str = '"'
+        elif kind == "quote":
+            if text[i] == '"':
                 kind = token_kinds.string
                 add_null = True
             else:
-                quote_str = "'"
                 kind = token_kinds.char_string
                 add_null = False
 
-            chars, end = read_string(line, chunk_end + 1, quote_str, add_null)
-            rep = chunk_to_str(line[chunk_end:end + 1])
-            r = Range(line[chunk_end].p, line[end].p)
+            chars, end = read_string(line, i + 1, text[i], add_null)
+            rep = text[i:end + 1]
+            r = line.range(i, end)
 
             if kind == token_kinds.char_string and len(chars) == 0:
                 err = "empty character constant"
@@ -255,70 +250,30 @@ def tokenize_line(line, in_comment):
                 error_collector.add(CompilerError(err, r))
 
             tokens.append(Token(kind, chars, rep, r=r))
+            i = end + 1
 
-            chunk_start = end + 1
-            chunk_end = chunk_start
-
-        # If next character is another symbol, add previous chunk and then
-        # add the symbol.
-        elif symbol_kind:
-            symbol_start_index = chunk_end
-            symbol_end_index = chunk_end + len(symbol_kind.text_repr) - 1
+        # If next characters are a symbol, add the symbol.
+        elif kind == "symbol":
+            r = line.range(i, match.end() - 1)
+            tokens.append(Token(symbol_map[match.group()], r=r))
+            i = match.end()
 
-            r = Range(line[symbol_start_index].p, line[symbol_end_index].p)
-            symbol_token = Token(symbol_kind, r=r)
-
-            add_chunk(line[chunk_start:chunk_end], tokens)
-            tokens.append(symbol_token)
-
-            chunk_start = chunk_end + len(symbol_kind.text_repr)
-            chunk_end = chunk_start
-
-        # Include another character in the chunk.
+        # Otherwise, convert the chunk into a token.
         else:
-            chunk_end += 1
+            add_chunk(match.group(), line.range(i, match.end() - 1), tokens)
+            i = match.end()
 
-    # Flush out anything that is left in the chunk to the output
-    add_chunk(line[chunk_start:chunk_end], tokens)
+        if len(tokens) > count:
+            tokens[count].spaced = separated
+            separated = False
 
     # Catch a `#include` on a line by itself.
-    if (include_line or match_include_command(tokens)) and not seen_filename:
-        read_include_filename(line, chunk_end)
+    if match_include_command(tokens) and not seen_filename:
+        read_include_filename(line, len(text))
 
     return tokens, in_comment
 
 
-def chunk_to_str(chunk):
-    """Convert the given chunk to a string.
-
-    chunk - list of Tagged characters.
-    return - string representation of the list of Tagged characters
-    """
-    return "".join(c.c for c in chunk)
-
-
-def match_symbol_kind_at(content, start):
-    """Return the longest matching symbol token kind.
-
-    content - List of Tagged objects in which to search for match.
-    start (int) - Index, inclusive, at which to start searching for a match.
-    returns (TokenType or None) - Symbol token found, or None if no token
-    is found.
-
-    """
-    for symbol_kind in symbol_kinds:
-        try:
-            for i, c in enumerate(symbol_kind.text_repr):
-                if content[start + i].c != c:
-                    break
-            else:
-                return symbol_kind
-        except IndexError:
-            pass
-
-    return None
-
-
 def match_include_command(tokens):
     """Check if end of `tokens` is a `#include` directive."""
     return (len(tokens) == 2 and
@@ -327,21 +282,13 @@ def match_include_command(tokens):
             tokens[-1].content == "include")
 
 
-def match_define_command(tokens):
-    """Check if end of `tokens` is a `#define` directive."""
-    return (len(tokens) == 3 and
-            tokens[0].kind == token_kinds.pound and
-            tokens[1].kind == token_kinds.identifier and
-            tokens[1].content == "define")
-
-
 def read_string(line, start, delim, null):
     """Return a lexed string list in input characters.
 
     Also returns the index of the string end quote.
 
-    line[start] should be the first character after the opening quote of the
-    string to be lexed. This function continues reading characters until
+    line.text[start] should be the first character after the opening quote of
+    the string to be lexed. This function continues reading characters until
     an unescaped closing quote is reached. The length returned is the
     number of input characters that were read, not the length of the
     string. The latter is the length of the lexed string list.
@@ -350,11 +297,12 @@ def read_string(line, start, delim, null):
     ASCII value (between 0 and 128) of the corresponding character in
     the string. The returned lexed string includes a null-terminator.
 
-    line - List of Tagged objects for each character in the line.
+    line - Line object.
     start - Index at which to start reading the string.
     delim - Delimiter with which the string ends, like `"` or `'`
     null - Whether to add a null-terminator to the returned character list
     """
+    text = line.text
     i = start
     chars = []
 
@@ -373,135 +321,124 @@ def read_string(line, start, delim, null):
     hexdigits = "0123456789abcdefABCDEF"
 
     while True:
-        if i >= len(line):
+        if i >= len(text):
             descrip = "missing terminating quote"
-            raise CompilerError(descrip, line[start - 1].r)
-        elif line[i].c == delim:
+            raise CompilerError(descrip, line.range(start - 1))
+        elif text[i] == delim:
             if null: chars.append(0)
             return chars, i
-        elif (i + 1 < len(line)
-              and line[i].c == "\\"
-              and line[i + 1].c in escapes):
-            chars.append(escapes[line[i + 1].c])
+        elif (i + 1 < len(text)
+              and text[i] == "\\"
+              and text[i + 1] in escapes):
+            chars.append(escapes[text[i + 1]])
             i += 2
-        elif (i + 1 < len(line)
-              and line[i].c == "\\"
-              and line[i + 1].c in octdigits):
-            octal = line[i + 1].c
+        elif (i + 1 < len(text)
+              and text[i] == "\\"
+              and text[i + 1] in octdigits):
+            octal = text[i + 1]
             i += 2
-            while (i < len(line)
+            while (i < len(text)
                    and len(octal) < 3
-                   and line[i].c in octdigits):
-                octal += line[i].c
+                   and text[i] in octdigits):
+                octal += text[i]
                 i += 1
             chars.append(int(octal, 8))
-        elif (i + 2 < len(line)
-              and line[i].c == "\\"
-              and line[i + 1].c == "x"
-              and line[i + 2].c in hexdigits):
-            hexa = line[i + 2].c
+        elif (i + 2 < len(text)
+              and text[i] == "\\"
+              and text[i + 1] == "x"
+              and text[i + 2] in hexdigits):
+            hexa = text[i + 2]
             i += 3
-            while i < len(line) and line[i].c in hexdigits:
-                hexa += line[i].c
+            while i < len(text) and text[i] in hexdigits:
+                hexa += text[i]
                 i += 1
             chars.append(int(hexa, 16))
         else:
-            chars.append(ord(line[i].c))
+            chars.append(ord(text[i]))
             i += 1
 
 
 def read_include_filename(line, start):
     """Read a filename that follows a #include directive.
 
-    Expects line[start] to be one of `<` or `"`, then reads characters until a
-    matching symbol is reached. Then, returns as a string the characters
-    read including the initial and final symbol markers. The index returned
-    is that of the closing token in the filename.
+    Expects line.text[start] to be one of `<` or `"`, then reads characters
+    until a matching symbol is reached. Then, returns as a string the
+    characters read including the initial and final symbol markers. The index
+    returned is that of the closing token in the filename.
     """
-    if start < len(line) and line[start].c == '"':
+    text = line.text
+    if start < len(text) and text[start] == '"':
         end = '"'
-    elif start < len(line) and line[start].c == "<":
+    elif start < len(text) and text[start] == "<":
         end = ">"
     else:
         descrip = "expected \"FILENAME\" or <FILENAME> after include directive"
-        if start < len(line):
-            char = line[start]
+        if start < len(text):
+            r = line.range(start)
         else:
-            char = line[-1]
+            r = line.end_range()
 
-        raise CompilerError(descrip, char.r)
+        raise CompilerError(descrip, r)
 
-    i = start + 1
-    try:
-        while line[i].c != end:
-            i += 1
-    except IndexError:
+    i = text.find(end, start + 1)
+    if i == -1:
         descrip = "missing terminating character for include filename"
-        raise CompilerError(descrip, line[start].r)
+        raise CompilerError(descrip, line.range(start))
 
-    return chunk_to_str(line[start:i + 1]), i
+    return text[start:i + 1], i
 
 
-def add_chunk(chunk, tokens):
-    """Convert chunk into a token if possible and add to tokens.
+def add_chunk(chunk, r, tokens):
+    """Convert chunk into a token and add to tokens.
 
-    If chunk is non-empty but cannot be made into a token, this function
-    records a compiler error. We don't need to check for symbol kind tokens
-    here because they are converted before they are shifted into the chunk.
+    If chunk cannot be made into a token, this function raises a compiler
+    error. We don't need to check for symbol kind tokens here because they
+    are never part of a chunk.
 
-    chunk - Chunk to convert into a token, as list of Tagged characters.
+    chunk (str) - Chunk to convert into a token.
+    r (Range) - Range of the chunk.
     tokens (List[Token]) - List of the tokens thusfar parsed.
 
     """
-    if chunk:
-        range = Range(chunk[0].p, chunk[-1].p)
-
-        keyword_kind = match_keyword_kind(chunk)
-        if keyword_kind:
-            tokens.append(Token(keyword_kind, r=range))
-            return
-
-        number_string = match_number_string(chunk)
-        if number_string:
-            tokens.append(Token(token_kinds.number, number_string, r=range))
-            return
-
-        identifier_name = match_identifier_name(chunk)
-        if identifier_name:
-            if identifier_name == "ASM":
-                return
-            tokens.append(Token(
-                token_kinds.identifier, identifier_name, r=range))
+    keyword_kind = match_keyword_kind(chunk)
+    if keyword_kind:
+        tokens.append(Token(keyword_kind, r=r))
+        return
+
+    number_string = match_number_string(chunk)
+    if number_string:
+        tokens.append(Token(token_kinds.number, number_string, r=r))
+        return
+
+    identifier_name = match_identifier_name(chunk)
+    if identifier_name:
+        if identifier_name == "ASM":
             return
+        tokens.append(Token(
+            token_kinds.identifier, identifier_name, r=r))
+        return
 
-        descrip = f"unrecognized token at '{chunk_to_str(chunk)}'"
-        raise CompilerError(descrip, range)
+    descrip = f"unrecognized token at '{chunk}'"
+    raise CompilerError(descrip, r)
 
 
-def match_keyword_kind(token_repr):
-    """Find the longest keyword token kind with representation token_repr.
+def match_keyword_kind(token_str):
+    """Find the keyword token kind with representation token_str.
 
-    token_repr - Token representation to match exactly, as list of Tagged
-    characters.
+    token_str (str) - Token representation to match exactly.
     returns (TokenKind, or None) - Keyword token kind that matched.
 
     """
-    token_str = chunk_to_str(token_repr)
-    for keyword_kind in keyword_kinds:
-        if keyword_kind.text_repr == token_str:
-            return keyword_kind
-    return None
+    return keyword_map.get(token_str)
 
 
-def match_number_string(token_repr):
+def match_number_string(token_str):
     """Return a string that represents the given constant number.
 
-    token_repr - List of Tagged characters.
+    token_str (str) - Token representation.
     returns (str, or None) - String representation of the number.
 
     """
-    token_str = chunk_to_str(token_repr)
-    
     if token_str[0:2].lower() == "0x":
         return str(int(token_str, 16))
     if token_str[0:2].lower() == "0b":
@@ -509,15 +446,14 @@ def match_number_string(token_repr):
     return token_str if token_str.isdigit() else None
 
 
-def match_identifier_name(token_repr):
+def match_identifier_name(token_str):
     """Return a string that represents the name of an identifier.
 
-    token_repr - List of Tagged characters.
+    token_str (str) - Token representation.
     returns (str, or None) - String name of the identifier.
 
     """
-    token_str = chunk_to_str(token_repr)
-    if re.match(r"[_a-zA-Z][_a-zA-Z0-9]*$", token_str):
+    if identifier_re.match(token_str):
         return token_str
     else:
         return None
@@ -16,9 +16,10 @@ import shivyc.tree.decl_nodes as decl_nodes
 import shivyc.tree.nodes as nodes
 from shivyc.parser.expression import parse_expression
 from shivyc.parser.utils import (add_range, ParserError, match_token, token_is,
-                                 raise_error, log_error, token_in)
+                                 raise_error, log_error, token_in, memoize)
 
 
+@memoize
 @add_range
 def parse_func_definition(index):
     """Parse a function definition.
@@ -27,7 +28,7 @@ def parse_func_definition(index):
     declaration specifiers to the end of the function definition body. """
 
     specs, index = parse_decl_specifiers(index)
-    decl, index = parse_declarator(index)
+    decl, index = parse_declarator(index, False)
 
     from shivyc.parser.statement import parse_compound_statement
     body, index = parse_compound_statement(index)
@@ -36,6 +37,7 @@ def parse_func_definition(index):
     return nodes.Declaration(root, body), index
 
 
+@memoize
 @add_range
 def parse_declaration(index):
     """Parse a declaration into a tree.nodes.Declaration node.
@@ -48,6 +50,7 @@ def parse_declaration(index):
     return nodes.Declaration(node), index
 
 
+@memoize
 @add_range
 def parse_declarator(index, is_typedef=False):
     """Parse the tokens that comprise a declarator.
@@ -89,6 +92,7 @@ def parse_abstract_declarator(index):
     return root, index
 
 
+@memoize
 @add_range
 def parse_decls_inits(index, parse_inits=True):
     """Parse declarations and initializers into a decl_nodes.Root node.
@@ -142,6 +146,26 @@ def parse_decls_inits(index, parse_inits=True):
     return node, index
 
 
+_type_specs = set(ctypes.simple_types.keys())
+_type_specs |= {token_kinds.signed_kw, token_kinds.unsigned_kw}
+
+_type_quals = {token_kinds.const_kw}
+
+_storage_specs = {token_kinds.auto_kw, token_kinds.static_kw,
+                  token_kinds.extern_kw, token_kinds.typedef_kw}
+
+
+def starts_decl_specifiers(index):
+    """Return whether a declaration specifier starts at the given index."""
+    return (token_in(index, _type_specs) or
+            token_in(index, _type_quals) or
+            token_in(index, _storage_specs) or
+            token_in(index, {token_kinds.struct_kw, token_kinds.union_kw}) or
+            (token_is(index, token_kinds.identifier) and
+             p.symbols.is_typedef(p.tokens[index])))
+
+
+@memoize
 def parse_decl_specifiers(index, _spec_qual=False):
     """Parse a declaration specifier list.
 
@@ -157,14 +181,6 @@ def parse_decl_specifiers(index, _spec_qual=False):
     Node objects. A Node object will be included for a struct or union
     declaration, and a token for all other declaration specifiers.
     """
-    type_specs = set(ctypes.simple_types.keys())
-    type_specs |= {token_kinds.signed_kw, token_kinds.unsigned_kw}
-
-    type_quals = {token_kinds.const_kw}
-
-    storage_specs = {token_kinds.auto_kw, token_kinds.static_kw,
-                     token_kinds.extern_kw, token_kinds.typedef_kw}
-
     specs = []
 
     # The type specifier class, either SIMPLE, STRUCT, or TYPEDEF,
@@ -201,16 +217,17 @@ def parse_decl_specifiers(index, _spec_qual=False):
             index += 1
             type_spec_class = TYPEDEF
 
-        elif type_spec_class in {None, SIMPLE} and token_in(index, type_specs):
+        elif (type_spec_class in {None, SIMPLE} and
+              token_in(index, _type_specs)):
             specs.append(p.tokens[index])
             index += 1
             type_spec_class = SIMPLE
 
-        elif token_in(index, type_quals):
+        elif token_in(index, _type_quals):
             specs.append(p.tokens[index])
             index += 1
 
-        elif token_in(index, storage_specs):
+        elif token_in(index, _storage_specs):
             if not _spec_qual:
                 specs.append(p.tokens[index])
             else:
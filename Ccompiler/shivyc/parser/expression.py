@@ -5,9 +5,10 @@ import shivyc.token_kinds as token_kinds
 import shivyc.tree.expr_nodes as expr_nodes
 import shivyc.tree.decl_nodes as decl_nodes
 from shivyc.parser.utils import (add_range, match_token, token_is, ParserError,
-                                 raise_error, log_error, token_in)
+                                 raise_error, log_error, token_in, memoize)
 
 
+@memoize
 @add_range
 def parse_expression(index):
     """Parse expression."""
@@ -16,6 +17,7 @@ def parse_expression(index):
         {token_kinds.comma: expr_nodes.MultiExpr})
 
 
+@memoize
 @add_range
 def parse_assignment(index):
     """Parse an assignment expression."""
@@ -28,102 +30,90 @@ def parse_assignment(index):
 
     left, index = parse_conditional(index)
 
-    if index < len(p.tokens):
+    if index < len(p.tokens) and p.tokens[index].kind in _assignment_ops:
         op = p.tokens[index]
-        kind = op.kind
-    else:
-        op = None
-        kind = None
-
-    node_types = {token_kinds.equals: expr_nodes.Equals,
-                  token_kinds.plusequals: expr_nodes.PlusEquals,
-                  token_kinds.minusequals: expr_nodes.MinusEquals,
-                  token_kinds.starequals: expr_nodes.StarEquals,
-                  token_kinds.divequals: expr_nodes.DivEquals,
-                  token_kinds.modequals: expr_nodes.ModEquals}
-
-    if kind in node_types:
         right, index = parse_assignment(index + 1)
-        return node_types[kind](left, right, op), index
+        return _assignment_ops[op.kind](left, right, op), index
     else:
         return left, index
 
 
+# Assignment operators, from the kind of the operator token to the node it
+# produces. Assignment is right-associative.
+_assignment_ops = {token_kinds.equals: expr_nodes.Equals,
+                   token_kinds.plusequals: expr_nodes.PlusEquals,
+                   token_kinds.minusequals: expr_nodes.MinusEquals,
+                   token_kinds.starequals: expr_nodes.StarEquals,
+                   token_kinds.divequals: expr_nodes.DivEquals,
+                   token_kinds.modequals: expr_nodes.ModEquals}
+
+
 @add_range
 def parse_conditional(index):
     """Parse a conditional expression."""
     # TODO: Parse ternary operator
-    return parse_logical_or(index)
+    return parse_binary(index, 1)
 
 
-@add_range
-def parse_logical_or(index):
-    """Parse logical or expression."""
-    return parse_series(
-        index, parse_logical_and,
-        {token_kinds.bool_or: expr_nodes.BoolOr})
+def parse_binary(index, min_prec):
+    """Parse a binary expression by precedence climbing.
 
+    Parses a cast expression followed by any binary operators with
+    precedence at least min_prec, and their right operands. Each right
+    operand is parsed with a minimum precedence one higher than its
+    operator, so operators of equal precedence are left-associative.
 
-@add_range
-def parse_logical_and(index):
-    """Parse logical and expression."""
-    # TODO: Implement bitwise operators here.
-    return parse_series(
-        index, parse_equality,
-        {token_kinds.bool_and: expr_nodes.BoolAnd})
+    index (int) - Index at which to start parsing.
+    min_prec (int) - Lowest precedence of binary operator to parse.
+    """
+    start = index
+    left, index = parse_cast(index)
 
+    tokens = p.tokens
+    while index < len(tokens):
+        op = tokens[index]
+        prec, NodeClass = _binary_ops.get(op.kind, (0, None))
+        if prec < min_prec:
+            break
 
-@add_range
-def parse_equality(index):
-    """Parse equality expression."""
-    # TODO: Implement relational and shift expressions here.
-    return parse_series(
-        index, parse_relational,
-        {token_kinds.twoequals: expr_nodes.Equality,
-         token_kinds.notequal: expr_nodes.Inequality})
+        right, index = parse_binary(index + 1, prec + 1)
+        left = NodeClass(left, right, op)
+        left.r = p.token_range(start, index)
 
+    return left, index
 
-@add_range
-def parse_relational(index):
-    """Parse relational expression."""
-    return parse_series(
-        index, parse_bitwise,
-        {token_kinds.lt: expr_nodes.LessThan,
-         token_kinds.gt: expr_nodes.GreaterThan,
-         token_kinds.ltoe: expr_nodes.LessThanOrEq,
-         token_kinds.gtoe: expr_nodes.GreaterThanOrEq})
 
+# Binary operators, from the kind of the operator token to the precedence of
+# the operator and the node it produces. A higher precedence binds tighter.
+_binary_ops = {
+    token_kinds.bool_or: (1, expr_nodes.BoolOr),
+    token_kinds.bool_and: (2, expr_nodes.BoolAnd),
 
-@add_range
-def parse_bitwise(index):
-    return parse_series(
-        index, parse_additive,
-        {token_kinds.lbitshift: expr_nodes.LBitShift,
-         token_kinds.rbitshift: expr_nodes.RBitShift,
-         token_kinds.bor: expr_nodes.Bor,
-         token_kinds.band: expr_nodes.Band,
-         token_kinds.bxor: expr_nodes.Bxor})
+    # TODO: Implement bitwise operators here.
+    token_kinds.twoequals: (3, expr_nodes.Equality),
+    token_kinds.notequal: (3, expr_nodes.Inequality),
 
+    token_kinds.lt: (4, expr_nodes.LessThan),
+    token_kinds.gt: (4, expr_nodes.GreaterThan),
+    token_kinds.ltoe: (4, expr_nodes.LessThanOrEq),
+    token_kinds.gtoe: (4, expr_nodes.GreaterThanOrEq),
 
-@add_range
-def parse_additive(index):
-    """Parse additive expression."""
-    return parse_series(
-        index, parse_multiplicative,
-        {token_kinds.plus: expr_nodes.Plus,
-         token_kinds.minus: expr_nodes.Minus})
+    token_kinds.lbitshift: (5, expr_nodes.LBitShift),
+    token_kinds.rbitshift: (5, expr_nodes.RBitShift),
+    token_kinds.bor: (5, expr_nodes.Bor),
+    token_kinds.band: (5, expr_nodes.Band),
+    token_kinds.bxor: (5, expr_nodes.Bxor),
 
+    token_kinds.plus: (6, expr_nodes.Plus),
+    token_kinds.minus: (6, expr_nodes.Minus),
 
-@add_range
-def parse_multiplicative(index):
-    """Parse multiplicative expression."""
-    return parse_series(
-        index, parse_cast,
-        {token_kinds.star: expr_nodes.Mult,
-         token_kinds.slash: expr_nodes.Div,
-         token_kinds.mod: expr_nodes.Mod})
+    token_kinds.star: (7, expr_nodes.Mult),
+    token_kinds.slash: (7, expr_nodes.Div),
+    token_kinds.mod: (7, expr_nodes.Mod),
+}
 
 
+@memoize
 @add_range
 def parse_cast(index):
     """Parse cast expression."""
@@ -23,14 +23,19 @@ from shivyc.parser.utils import (add_range, log_error, ParserError,
 from shivyc.parser.declaration import parse_declaration, parse_func_definition
 
 
-def parse(tokens_to_parse):
+def parse(tokens_to_parse, memoize=True):
     """Parse the given tokens into an AST.
 
     Also, as the entry point for the parser, responsible for setting the
     tokens global variable.
+
+    memoize (bool) - Whether to save parse results in the memo table, so
+    backtracking does not parse the same tokens twice.
     """
     p.best_error = None
     p.tokens = tokens_to_parse
+    p.symbols = p.SimpleSymbolTable()
+    p.memo = {} if memoize else None
 
     with log_error():
         return parse_root(0)[0]
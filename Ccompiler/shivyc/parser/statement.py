@@ -4,29 +4,31 @@ import shivyc.token_kinds as token_kinds
 import shivyc.tree.nodes as nodes
 import shivyc.parser.utils as p
 
-from shivyc.parser.declaration import parse_declaration
+from shivyc.parser.declaration import (parse_declaration,
+                                       starts_decl_specifiers)
 from shivyc.parser.expression import parse_expression
 from shivyc.parser.utils import (add_range, log_error, match_token, token_is,
-                                 ParserError)
+                                 ParserError, memoize)
 
 
+@memoize
 @add_range
 def parse_statement(index):
     """Parse a statement.
 
-    Try each possible type of statement, catching/logging exceptions upon
-    parse failures. On the last try, raise the exception on to the caller.
+    Each type of statement other than an expression statement starts with
+    its own token, so the statement is parsed by the function for its
+    first token, or else as an expression statement. The other functions
+    would fail on the first token, so they are not tried.
 
     """
-    for func in (parse_compound_statement, parse_return, parse_break,
-                 parse_continue, parse_if_statement, parse_while_statement,
-                 parse_for_statement):
-        with log_error():
-            return func(index)
+    if index < len(p.tokens) and p.tokens[index].kind in _statement_funcs:
+        return _statement_funcs[p.tokens[index].kind](index)
 
     return parse_expr_statement(index)
 
 
+@memoize
 @add_range
 def parse_compound_statement(index):
     """Parse a compound statement.
@@ -39,12 +41,15 @@ def parse_compound_statement(index):
     index = match_token(index, token_kinds.open_brack, ParserError.GOT)
 
     # Read block items (statements/declarations) until there are no more.
+    # A statement cannot start with a declaration specifier, so in that case
+    # only a declaration is tried.
     items = []
     while True:
         with log_error():
-            item, index = parse_statement(index)
-            items.append(item)
-            continue
+            if not starts_decl_specifiers(index):
+                item, index = parse_statement(index)
+                items.append(item)
+                continue
 
         with log_error():
             item, index = parse_declaration(index)
@@ -203,3 +208,15 @@ def parse_expr_statement(index):
     node, index = parse_expression(index)
     index = match_token(index, token_kinds.semicolon, ParserError.AFTER)
     return nodes.ExprStatement(node), index
+
+
+# Function to parse each type of statement, by the kind of its first token.
+_statement_funcs = {
+    token_kinds.open_brack: parse_compound_statement,
+    token_kinds.return_kw: parse_return,
+    token_kinds.break_kw: parse_break,
+    token_kinds.continue_kw: parse_continue,
+    token_kinds.if_kw: parse_if_statement,
+    token_kinds.while_kw: parse_while_statement,
+    token_kinds.for_kw: parse_for_statement,
+}
@@ -1,9 +1,9 @@
 """Utilities for the parser."""
 
-from contextlib import contextmanager
-import copy
+import itertools
 
 from shivyc.errors import CompilerError, Range
+from shivyc.scopes import ScopedTable
 
 
 # This is a little bit messy, but worth the repetition it saves. In the
@@ -13,6 +13,11 @@ from shivyc.errors import CompilerError, Range
 tokens = None
 
 
+# Source of the version numbers of symbol tables. Every state of a table
+# gets a number that is never used for another state.
+_versions = itertools.count(1)
+
+
 class SimpleSymbolTable:
     """Table to record every declared symbol.
 
@@ -20,26 +25,69 @@ class SimpleSymbolTable:
     whether a given identifier denotes a type or a value. For every
     declared identifier, the table records whether or not it is a type
     defnition.
+
+    Every change to the table is recorded in a journal. A failed parse
+    attempt undoes its changes by rolling back the journal, and a memoized
+    parse replays the changes it made.
     """
     def __init__(self):
-        self.symbols = []
-        self.new_scope()
+        self.symbols = ScopedTable()
+        self.journal = []
+        self.version = 0
 
     def new_scope(self):
-        self.symbols.append({})
+        self._record("new_scope", (), None)
+        self.symbols.new_scope()
 
     def end_scope(self):
-        self.symbols.pop()
+        self._record("end_scope", (), self.symbols.end_scope())
 
     def add_symbol(self, identifier, is_typedef):
-        self.symbols[-1][identifier.content] = is_typedef
+        name = identifier.content
+        self._record("add_symbol", (identifier, is_typedef),
+                     self.symbols.lookup_local(name))
+        self.symbols.bind(name, is_typedef)
+
+    def _record(self, change, args, old):
+        """Record a change in the journal and give the table a new version.
+
+        old - The bindings removed by end_scope, or the value that
+        add_symbol overwrites.
+        """
+        self.journal.append((self.version, change, args, old))
+        self.version = next(_versions)
+
+    def mark(self):
+        """Return a mark of the current state for rollback and changes."""
+        return len(self.journal)
+
+    def rollback(self, mark):
+        """Undo all changes made since the given mark."""
+        while len(self.journal) > mark:
+            version, change, args, old = self.journal.pop()
+            if change == "new_scope":
+                self.symbols.end_scope()
+            elif change == "end_scope":
+                self.symbols.new_scope()
+                for name, is_typedef in old.items():
+                    self.symbols.bind(name, is_typedef)
+            elif old is None:
+                self.symbols.unbind(args[0].content)
+            else:
+                self.symbols.bind(args[0].content, old)
+            self.version = version
+
+    def changes(self, mark):
+        """Return the changes made since the given mark."""
+        return [(change, args) for _, change, args, _ in self.journal[mark:]]
+
+    def replay(self, changes):
+        """Make the given changes again."""
+        for change, args in changes:
+            getattr(self, change)(*args)
 
     def is_typedef(self, identifier):
-        name = identifier.content
-        for table in self.symbols[::-1]:
-            if name in table:
-                return table[name]
-        return False
+        return self.symbols.lookup(identifier.content, False)
 
 
 symbols = SimpleSymbolTable()
@@ -51,6 +99,11 @@ class ParserError(CompilerError):
     amount_parsed (int) - Number of tokens successfully parsed before this
     error was encountered. This value is used by the Parser to determine which
     error corresponds to the most successful parse.
+
+    Nearly every ParserError is raised by a parse attempt that fails while
+    the parser backtracks, and is never reported. So creating one only saves
+    the arguments, and the description and range of the error are computed
+    when they are first read.
     """
 
     # Options for the message_type constructor field.
@@ -80,10 +133,37 @@ class ParserError(CompilerError):
                -> "main.c:10: unexpected semicolon at ';'"
         """
         self.amount_parsed = index
+        self.message = message
+        self.tokens = tokens
+        self.message_type = message_type
+        self.warning = False
+        self._report = None
+
+    @property
+    def descrip(self):
+        """Return the description of this error."""
+        return self._get_report()[0]
+
+    @property
+    def range(self):
+        """Return the range at which this error appears."""
+        return self._get_report()[1]
+
+    def _get_report(self):
+        """Return the description and range of this error."""
+        if not self._report:
+            self._report = self._make_report()
+        return self._report
+
+    def _make_report(self):
+        """Compute the description and range of this error."""
+        message = self.message
+        tokens = self.tokens
+        index = self.amount_parsed
+        message_type = self.message_type
 
         if len(tokens) == 0:
-            super().__init__(f"{message} at beginning of source")
-            return
+            return f"{message} at beginning of source", None
 
         # If the index is too big, we're always using the AFTER form
         if index >= len(tokens):
@@ -96,19 +176,16 @@ class ParserError(CompilerError):
                 message_type = self.GOT
 
         if message_type == self.AT:
-            super().__init__(f"{message} at '{tokens[index]}'",
-                             tokens[index].r)
+            return f"{message} at '{tokens[index]}'", tokens[index].r
         elif message_type == self.GOT:
-            super().__init__(f"{message}, got '{tokens[index]}'",
-                             tokens[index].r)
+            return f"{message}, got '{tokens[index]}'", tokens[index].r
         elif message_type == self.AFTER:
             if tokens[index - 1].r:
                 new_range = Range(tokens[index - 1].r.end + 1)
             else:
                 new_range = None
 
-            super().__init__(
-                f"{message} after '{tokens[index - 1]}'", new_range)
+            return f"{message} after '{tokens[index - 1]}'", new_range
 
 
 def raise_error(err, index, error_type):
@@ -121,8 +198,7 @@ def raise_error(err, index, error_type):
 best_error = None
 
 
-@contextmanager
-def log_error():
+class log_error:
     """Wrap this context manager around conditional parsing code.
 
     For example,
@@ -138,17 +214,26 @@ def log_error():
 
     The value of e.amount_parsed is used to determine the amount
     successfully parsed before encountering the error.
+
+    This is a class rather than a generator based context manager because it
+    is entered for every parse attempt.
     """
-    global best_error, symbols
+    __slots__ = ("mark",)
+
+    def __enter__(self):
+        # mark the global symbols table, so if parsing fails we can reset it
+        self.mark = symbols.mark()
+
+    def __exit__(self, exc_type, e, traceback):
+        global best_error
+
+        if exc_type is None or not issubclass(exc_type, ParserError):
+            return False
 
-    # back up the global symbols table, so if parsing fails we can reset it
-    symbols_bak = copy.deepcopy(symbols)
-    try:
-        yield
-    except ParserError as e:
         if not best_error or e.amount_parsed >= best_error.amount_parsed:
             best_error = e
-        symbols = symbols_bak
+        symbols.rollback(self.mark)
+        return True
 
 
 def token_is(index, kind):
@@ -207,3 +292,52 @@ def add_range(parse_func):
         return node, end_index
 
     return parse_with_range
+
+
+# Memo table of parse results, from (parse function, index, arguments) to the
+# symbol table version at the start of the parse, the result, the symbol table
+# changes made by the parse, and the ParserError if the parse failed. The
+# parser sets this to None to disable memoization.
+memo = {}
+
+# Maximum number of entries in the memo table. The table is emptied when it
+# grows past this size.
+MAX_MEMO_SIZE = 100000
+
+
+def memoize(parse_func):
+    """Return a decorated function that saves its results in the memo table.
+
+    Accepts a parse_* function. When the function is called again at the same
+    index with the same arguments, and the symbol table is in the same state
+    as before, the saved result is returned, or the saved error raised, without
+    parsing the tokens again.
+    """
+    def parse_memoized(index, *args):
+        if memo is None:
+            return parse_func(index, *args)
+
+        key = (parse_func, index, args)
+        version = symbols.version
+        entry = memo.get(key)
+        if entry and entry[0] == version:
+            _, result, changes, error = entry
+            if error:
+                raise error.with_traceback(None)
+            symbols.replay(changes)
+            return result
+
+        if len(memo) >= MAX_MEMO_SIZE:
+            memo.clear()
+
+        mark = symbols.mark()
+        try:
+            result = parse_func(index, *args)
+        except ParserError as e:
+            memo[key] = (version, None, None, e)
+            raise
+
+        memo[key] = (version, result, symbols.changes(mark), None)
+        return result
+
+    return parse_memoized
@@ -1,89 +1,736 @@
 """Implementation of the ShivyC preprocessor.
 
-Currently, the preprocessor implementation is very simple and only handles
-include directives. Despite this, the implementation is also
-technically incorrect in many ways. For example, it expands #include
-directives wherever they appear, rather than only expanding them when the
-appear at the beginning of a line.
+The preprocessor runs on the tokens produced by the lexer. It executes the
+directives, which are the lines that start with a `#` token, and expands
+the object-like and function-like macros in the other lines.
+
+Macro expansion follows the algorithm of Dave Prosser, on which the C
+standard is based. Each token carries a hide set, the set of macro names
+whose expansion produced the token. A token is not expanded again if its
+name is in its own hide set, which stops recursive macros.
+
+Headers are lexed once per session. Their tokens are cached by path together
+with the modification time of the file, and a header that is protected by
+`#pragma once` or by an include guard is skipped on the next include without
+being processed again.
+
+Two rules keep the behavior of the earlier preprocessor, which existing code
+relies on. A header without `#pragma once` or an include guard is only
+included once in a translation unit, so headers may include each other. And
+the defines of a number that are not inside a conditional group are known
+from the start of their file, as if the file had been scanned for them
+before it is processed.
 """
-import pathlib
+import os
 
 import shivyc.lexer as lexer
 import shivyc.token_kinds as token_kinds
 
 from shivyc.errors import error_collector, CompilerError
+from shivyc.tokens import Token
 
+# Maximum nesting depth of #include directives.
+MAX_INCLUDE_DEPTH = 200
 
-def process(tokens, this_file, defineDict={}, includeList=[]):
-    """Process the given tokens and return the preprocessed token list."""
-    #for token in tokens:
-    #    print(token)
-    processed = []
-    i = 0
-    while i < len(tokens) - 2:
-        if (tokens[i].kind == token_kinds.pound and
-            tokens[i + 1].kind == token_kinds.identifier and
-            tokens[i + 1].content == "include" and
-             tokens[i + 2].kind == token_kinds.include_file):
-
-            # Replace tokens[i] -> tokens[i+2] with preprocessed contents of
-            # the included file.
+# Lexed headers, by resolved path. Each entry holds the modification time of
+# the file when it was read, its tokens, and the name of the macro that
+# guards it or None.
+header_cache = {}
+
+
+class Macro:
+    """Class representing a macro defined with #define.
+
+    name (str) - Name of the macro.
+    params (List[str], or None) - Parameter names of a function-like macro,
+    or None for an object-like macro. The extra arguments of a variadic
+    macro are named __VA_ARGS__.
+    body (List[Token]) - Replacement list of the macro.
+    """
+
+    def __init__(self, name, params, body):
+        """Initialize Macro object."""
+        self.name = name
+        self.params = params
+        self.body = body
+
+    def same_as(self, other):
+        """Return whether other is an identical redefinition of the macro."""
+        return (self.params == other.params and
+                [str(t) for t in self.body] == [str(t) for t in other.body])
+
+
+class Conditional:
+    """Class representing an #if, #ifdef or #ifndef group being processed.
+
+    active (bool) - Whether the lines of the current branch are included.
+    done (bool) - Whether a branch of this group was already included, or
+    the whole group is inside a skipped branch.
+    seen_else (bool) - Whether the #else of this group was reached.
+    r (Range) - Range of the directive that opened the group.
+    """
+
+    def __init__(self, active, done, r):
+        """Initialize Conditional object."""
+        self.active = active
+        self.done = done
+        self.seen_else = False
+        self.r = r
+
+
+class Preprocessor:
+    """Preprocessor for a single translation unit.
+
+    macros (Dict[str, Macro]) - Macros currently defined.
+    once (Set[str]) - Resolved paths of the headers marked `#pragma once`.
+    included (Set[str]) - Resolved paths of the headers included so far.
+    depth (int) - Current nesting depth of included files.
+    """
+
+    def __init__(self):
+        """Initialize a preprocessor with no macros defined."""
+        self.macros = {}
+        self.once = set()
+        self.included = set()
+        self.depth = 0
+
+    def process(self, tokens, this_file):
+        """Process the given tokens and return the preprocessed token list."""
+        out = []
+        self.process_file(tokens, this_file, out)
+        return [token for token, _ in out]
+
+    def process_file(self, tokens, this_file, out):
+        """Process the tokens of one file and add them to out.
+
+        out (List[Tuple[Token, frozenset]]) - Output tokens with their hide
+        sets.
+        """
+        self.predefine(tokens)
+
+        # Tokens still to be processed, in reverse order, with their hide sets.
+        pending = [(token, frozenset()) for token in reversed(tokens)]
+        conditionals = []
+
+        while pending:
+            token, hideset = pending.pop()
             try:
-                file, filename = read_file(tokens[i + 2].content, this_file)
-                if filename not in includeList:
-                    includeList.append(filename)
-                    lexTokens, _ = lexer.tokenize(file, filename)
-                    new_tokens = process(lexTokens, filename, defineDict, includeList)
-                    processed += new_tokens
-
-            except IOError:
-                error_collector.add(CompilerError(
-                    "unable to read included file",
-                    tokens[i + 2].r
-                ))
+                if token.bol and token.kind == token_kinds.pound:
+                    line = [token]
+                    while pending and not pending[-1][0].bol:
+                        line.append(pending.pop()[0])
+                    self.directive(line, this_file, conditionals, out)
+                elif not conditionals or conditionals[-1].active:
+                    self.expand_token(token, hideset, pending, out)
+            except CompilerError as e:
+                error_collector.add(e)
 
-            i += 3
+        for conditional in conditionals:
+            error_collector.add(CompilerError(
+                "unterminated conditional directive", conditional.r))
 
-        # Ignore defines. Currently the value of the define is not in the token list
-        elif (tokens[i].kind == token_kinds.pound and
-            tokens[i + 1].kind == token_kinds.identifier and
-            tokens[i + 1].content == "define"):
+    def predefine(self, tokens):
+        """Define the numbers defined in a file before it is processed.
 
-            i += 3
+        Only a `#define NAME number` line outside of any conditional group
+        is used, and only if the file defines NAME once and does not #undef
+        it, so the result does not depend on where the line is.
+        """
+        lines = {}
+        skip = set()
+        depth = 0
+        for i, token in enumerate(tokens):
+            if not (token.bol and token.kind == token_kinds.pound and
+                    i + 1 < len(tokens) and not tokens[i + 1].bol):
+                continue
+
+            line = [token]
+            for t in tokens[i + 1:]:
+                if t.bol:
+                    break
+                line.append(t)
+
+            name = line[1].content
+            if name in ("if", "ifdef", "ifndef"):
+                depth += 1
+            elif name == "endif":
+                depth -= 1
+            elif name in ("define", "undef") and len(line) > 2:
+                macro = line[2].content
+                if (name == "undef" or depth or macro in lines or
+                        len(line) != 4 or
+                        line[3].kind != token_kinds.number):
+                    skip.add(macro)
+                else:
+                    lines[macro] = line
+
+        for macro, line in lines.items():
+            if macro not in skip and macro not in self.macros:
+                self.define(line, line[0].r + line[1].r)
+
+    def directive(self, line, this_file, conditionals, out):
+        """Execute the directive in the given line of tokens."""
+        if len(line) == 1:
+            return
+
+        name = line[1].content
+        r = line[0].r + line[1].r
+        skipping = bool(conditionals) and not conditionals[-1].active
+
+        if name in ("if", "ifdef", "ifndef"):
+            # The group is pushed first so that a malformed condition is
+            # treated as false.
+            conditional = Conditional(False, skipping, r)
+            conditionals.append(conditional)
+            if not skipping:
+                if name == "if":
+                    active = self.evaluate(line[2:], r) != 0
+                else:
+                    active = ((self.macro_name(line, r) in self.macros) ==
+                              (name == "ifdef"))
+                conditional.active = conditional.done = active
+
+        elif name in ("elif", "else", "endif"):
+            if not conditionals:
+                raise CompilerError(f"#{name} without #if", r)
+
+            conditional = conditionals[-1]
+            if name == "endif":
+                conditionals.pop()
+            elif conditional.seen_else:
+                raise CompilerError(f"#{name} after #else", r)
+            elif conditional.done:
+                conditional.active = False
+            elif name == "elif":
+                conditional.active = False
+                active = self.evaluate(line[2:], r) != 0
+                conditional.active = conditional.done = active
+            else:
+                conditional.active = conditional.done = True
+
+            if name == "else":
+                conditional.seen_else = True
+
+        elif skipping:
+            return
+
+        elif name == "define":
+            self.define(line, r)
+
+        elif name == "undef":
+            self.macros.pop(self.macro_name(line, r), None)
+
+        elif name == "include":
+            self.include(line[2], this_file, out)
+
+        elif name == "pragma":
+            if len(line) > 2 and line[2].content == "once":
+                self.once.add(os.path.realpath(this_file))
+
+        elif name == "error":
+            descrip = " ".join(str(token) for token in line[2:])
+            raise CompilerError(f"#error {descrip}", r)
 
         else:
-            # Here we apply the Define dictionary
+            raise CompilerError(f"invalid preprocessing directive #{name}", r)
+
+    def macro_name(self, line, r):
+        """Return the macro name that follows the directive name in line."""
+        if len(line) < 3 or line[2].kind != token_kinds.identifier:
+            raise CompilerError("macro names must be identifiers", r)
+        return line[2].content
+
+    def define(self, line, r):
+        """Define the macro in the given #define line."""
+        name = self.macro_name(line, r)
+        body = line[3:]
+        params = None
+
+        if (body and body[0].kind == token_kinds.open_paren and
+             not body[0].spaced):
+            params, body = read_params(body, r)
+
+        macro = Macro(name, params, body)
+        old = self.macros.get(name)
+        if old and not old.same_as(macro):
+            error_collector.add(CompilerError(
+                f"'{name}' redefined", line[2].r, warning=True))
+        self.macros[name] = macro
+
+    def include(self, file_token, this_file, out):
+        """Process the file included by the given include_file token."""
+        try:
+            path = find_file(file_token.content, this_file)
+            resolved = os.path.realpath(path)
+            if resolved in self.once:
+                return
+
+            tokens, guard = read_header(path, resolved)
+        except IOError:
+            raise CompilerError("unable to read included file",
+                                file_token.r)
+
+        if guard in self.macros:
+            return
+
+        # A header that is not guarded is only included once
+        if guard is None and resolved in self.included:
+            return
+        self.included.add(resolved)
+
+        if self.depth >= MAX_INCLUDE_DEPTH:
+            raise CompilerError("#include nested too deeply", file_token.r)
+
+        self.depth += 1
+        self.process_file(tokens, path, out)
+        self.depth -= 1
+
+    def expand_token(self, token, hideset, pending, out):
+        """Expand the given token if it names a macro.
+
+        The expansion is pushed back onto pending, so it is scanned again
+        together with the tokens that follow it. Any other token is added to
+        out.
+        """
+        macro = None
+        if (token.kind == token_kinds.identifier and
+             token.content not in hideset):
+            macro = self.macros.get(token.content)
+
+        if not macro:
+            out.append((token, hideset))
+            return
+
+        if macro.params is None:
+            expansion = self.substitute(macro, [], hideset | {macro.name},
+                                        token)
+        elif pending and pending[-1][0].kind == token_kinds.open_paren:
+            args, close_hideset = self.read_args(macro, token, pending)
+            expansion = self.substitute(
+                macro, args, (hideset & close_hideset) | {macro.name}, token)
+        else:
+            out.append((token, hideset))
+            return
+
+        pending.extend(reversed(expansion))
+
+    def expand_list(self, tokens):
+        """Fully expand the macros in the given list of tokens."""
+        pending = list(reversed(tokens))
+        out = []
+        while pending:
+            token, hideset = pending.pop()
+            self.expand_token(token, hideset, pending, out)
+        return out
+
+    def read_args(self, macro, name, pending):
+        """Read the arguments of a function-like macro invocation.
+
+        pending[-1] is the open parenthesis that follows the macro name.
+        return - List of arguments, each a list of tokens with their hide sets,
+        and the hide set of the closing parenthesis.
+        """
+        pending.pop()
+
+        args = [[]]
+        depth = 0
+        while True:
+            if not pending:
+                raise CompilerError(
+                    f"unterminated argument list invoking macro "
+                    f"'{macro.name}'", name.r)
+
+            token, hideset = pending.pop()
+            if token.kind == token_kinds.open_paren:
+                depth += 1
+            elif token.kind == token_kinds.close_paren:
+                if depth == 0:
+                    break
+                depth -= 1
+            elif (token.kind == token_kinds.comma and depth == 0 and
+                  not (macro.params[-1:] == ["__VA_ARGS__"] and
+                       len(args) == len(macro.params))):
+                args.append([])
+                continue
+
+            args[-1].append((token, hideset))
 
-            if str(tokens[i]) in defineDict:
-                if defineDict[str(tokens[i])].isdigit():
-                    tokens[i].kind = token_kinds.number
+        if not macro.params and args == [[]]:
+            args = []
+        elif (macro.params[-1:] == ["__VA_ARGS__"] and
+              len(args) == len(macro.params) - 1):
+            args.append([])
+
+        if len(args) != len(macro.params):
+            raise CompilerError(
+                f"macro '{macro.name}' requires {len(macro.params)} "
+                f"arguments, but {len(args)} given", name.r)
+
+        return args, hideset
+
+    def substitute(self, macro, args, hideset, name):
+        """Return the replacement list of a macro invocation.
+
+        The parameters in the replacement list are replaced by the
+        corresponding arguments, and the # and ## operators are applied.
+        Every token in the result gets the given hide set.
+
+        args (List[List[Tuple[Token, frozenset]]]) - Arguments of a
+        function-like macro invocation.
+        name (Token) - The macro name that was invoked. Its range is given to
+        the tokens of the replacement list.
+        """
+        params = {param: arg for param, arg in zip(macro.params or [], args)}
+        body = macro.body
+        out = []
+
+        # Whether the previous operand is followed by ##, and whether it
+        # produced any tokens.
+        pasting = False
+        last_nonempty = False
+
+        i = 0
+        while i < len(body):
+            token = body[i]
+            if (macro.params is not None and
+                 token.kind == token_kinds.pound and
+                 i + 1 < len(body) and body[i + 1].content in params):
+                arg = params[body[i + 1].content]
+                operand = [(stringize(arg, token.r), frozenset())]
+                i += 2
+            elif (token.kind == token_kinds.identifier and
+                  token.content in params):
+                arg = params[token.content]
+                if pasting or is_paste(body, i + 1):
+                    operand = list(arg)
                 else:
-                    error_collector.add(CompilerError(
-                        "Define value is not a number",
-                        tokens[i].r
-                    ))
-                tokens[i].content = defineDict[str(tokens[i])]
+                    operand = self.expand_list(arg)
+                i += 1
+            else:
+                operand = [(copy_token(token, name.r), frozenset())]
+                i += 1
+
+            if pasting and last_nonempty and operand:
+                left, left_hideset = out.pop()
+                right, _ = operand[0]
+                operand[0] = (paste(left, right, name.r), left_hideset)
+
+            out.extend(operand)
+            last_nonempty = bool(operand) or (pasting and last_nonempty)
+
+            pasting = is_paste(body, i)
+            if pasting:
+                i += 2
+
+        if out:
+            first, first_hideset = out[0]
+            first = copy_token(first, first.r)
+            first.spaced = name.spaced
+            out[0] = (first, first_hideset)
+
+        return [(token, token_hideset | hideset) for token, token_hideset
+                in out]
+
+    def evaluate(self, tokens, r):
+        """Evaluate the constant expression of an #if or #elif directive."""
+        # Replace `defined NAME` and `defined(NAME)` before expanding macros.
+        replaced = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if (token.kind == token_kinds.identifier and
+                 token.content == "defined"):
+                parens = (i + 1 < len(tokens) and
+                          tokens[i + 1].kind == token_kinds.open_paren)
+                name = i + 2 if parens else i + 1
+                if (name >= len(tokens) or
+                     tokens[name].kind != token_kinds.identifier or
+                     parens and (name + 1 >= len(tokens) or
+                                 tokens[name + 1].kind !=
+                                 token_kinds.close_paren)):
+                    raise CompilerError(
+                        "operator 'defined' requires an identifier", r)
+                value = "1" if tokens[name].content in self.macros else "0"
+                token = Token(token_kinds.number, value, r=token.r)
+                i = name + 2 if parens else name + 1
+            else:
+                i += 1
+            replaced.append((token, frozenset()))
+
+        expanded = [token for token, _ in self.expand_list(replaced)]
+        if not expanded:
+            raise CompilerError("#if with no expression", r)
+
+        value, end = ConstantExpression(expanded, r).parse(0, 0)
+        if end != len(expanded):
+            raise CompilerError(
+                f"unexpected '{expanded[end]}' in preprocessor expression",
+                expanded[end].r)
+        return value
+
+
+class ConstantExpression:
+    """Evaluator for the integer constant expression of an #if directive.
 
-            processed.append(tokens[i])
+    Identifiers that remain after macro expansion evaluate to zero.
+
+    tokens (List[Token]) - Tokens of the expression.
+    r (Range) - Range of the directive, used for errors at the end of the
+    expression.
+    """
+
+    # Precedence of each binary operator, higher binds tighter.
+    binary_precedence = {
+        token_kinds.bool_or: 1,
+        token_kinds.bool_and: 2,
+        token_kinds.bor: 3,
+        token_kinds.bxor: 4,
+        token_kinds.band: 5, token_kinds.amp: 5,
+        token_kinds.twoequals: 6, token_kinds.notequal: 6,
+        token_kinds.lt: 7, token_kinds.gt: 7,
+        token_kinds.ltoe: 7, token_kinds.gtoe: 7,
+        token_kinds.lbitshift: 8, token_kinds.rbitshift: 8,
+        token_kinds.plus: 9, token_kinds.minus: 9,
+        token_kinds.star: 10, token_kinds.slash: 10, token_kinds.mod: 10,
+    }
+
+    def __init__(self, tokens, r):
+        """Initialize ConstantExpression object."""
+        self.tokens = tokens
+        self.r = r
+
+    def parse(self, index, min_precedence):
+        """Parse the expression at index with operators of at least the given
+        precedence.
+
+        return - Value of the expression and index after it.
+        """
+        value, index = self.parse_unary(index)
+        while index < len(self.tokens):
+            op = self.tokens[index]
+            precedence = self.binary_precedence.get(op.kind, 0)
+            if precedence <= min_precedence:
+                break
+            right, index = self.parse(index + 1, precedence)
+            value = self.apply(op, value, right)
+        return value, index
+
+    def parse_unary(self, index):
+        """Parse a unary expression at index."""
+        if index >= len(self.tokens):
+            raise CompilerError("expected value in preprocessor expression",
+                                self.r)
+
+        token = self.tokens[index]
+        if token.kind == token_kinds.open_paren:
+            value, index = self.parse(index + 1, 0)
+            if (index >= len(self.tokens) or
+                 self.tokens[index].kind != token_kinds.close_paren):
+                raise CompilerError("expected ')' in preprocessor expression",
+                                    token.r)
+            return value, index + 1
+
+        unary = {token_kinds.plus: lambda v: v,
+                 token_kinds.minus: lambda v: -v,
+                 token_kinds.compl: lambda v: ~v,
+                 token_kinds.bool_not: lambda v: int(not v)}
+        if token.kind in unary:
+            value, index = self.parse_unary(index + 1)
+            return unary[token.kind](value), index
+
+        if token.kind == token_kinds.number:
+            return int(token.content), index + 1
+        if token.kind == token_kinds.char_string and token.content:
+            return token.content[0], index + 1
+        if token.kind == token_kinds.identifier:
+            return 0, index + 1
+
+        raise CompilerError(
+            f"unexpected '{token}' in preprocessor expression", token.r)
+
+    def apply(self, op, left, right):
+        """Apply the binary operator op to the given values."""
+        kind = op.kind
+        if kind in (token_kinds.slash, token_kinds.mod):
+            if right == 0:
+                raise CompilerError("division by zero in #if", op.r)
+            quotient = abs(left) // abs(right)
+            if (left < 0) != (right < 0):
+                quotient = -quotient
+            return quotient if kind == token_kinds.slash else (
+                left - quotient * right)
+
+        return {
+            token_kinds.bool_or: lambda: int(bool(left or right)),
+            token_kinds.bool_and: lambda: int(bool(left and right)),
+            token_kinds.bor: lambda: left | right,
+            token_kinds.bxor: lambda: left ^ right,
+            token_kinds.band: lambda: left & right,
+            token_kinds.amp: lambda: left & right,
+            token_kinds.twoequals: lambda: int(left == right),
+            token_kinds.notequal: lambda: int(left != right),
+            token_kinds.lt: lambda: int(left < right),
+            token_kinds.gt: lambda: int(left > right),
+            token_kinds.ltoe: lambda: int(left <= right),
+            token_kinds.gtoe: lambda: int(left >= right),
+            token_kinds.lbitshift: lambda: left << right,
+            token_kinds.rbitshift: lambda: left >> right,
+            token_kinds.plus: lambda: left + right,
+            token_kinds.minus: lambda: left - right,
+            token_kinds.star: lambda: left * right,
+        }[kind]()
+
+
+def process(tokens, this_file):
+    """Process the given tokens and return the preprocessed token list."""
+    return Preprocessor().process(tokens, this_file)
+
+
+def read_params(tokens, r):
+    """Read the parameter list of a function-like macro definition.
+
+    tokens[0] is the open parenthesis that follows the macro name.
+    return - List of parameter names and the replacement list that follows.
+    """
+    params = []
+    i = 1
+    while True:
+        if is_ellipsis(tokens, i):
+            params.append("__VA_ARGS__")
+            i += 3
+        elif i < len(tokens) and tokens[i].kind == token_kinds.identifier:
+            params.append(tokens[i].content)
             i += 1
+        elif i < len(tokens) and tokens[i].kind == token_kinds.close_paren \
+                and not params:
+            return params, tokens[i + 1:]
+        else:
+            raise CompilerError("expected parameter name in macro "
+                                "parameter list", r)
+
+        if i < len(tokens) and tokens[i].kind == token_kinds.close_paren:
+            return params, tokens[i + 1:]
+        if (params[-1] == "__VA_ARGS__" or i >= len(tokens) or
+             tokens[i].kind != token_kinds.comma):
+            raise CompilerError("expected ')' in macro parameter list", r)
+        i += 1
+
+
+def is_ellipsis(tokens, i):
+    """Return whether tokens[i] starts a `...` of three adjacent dots."""
+    return (i + 2 < len(tokens) and
+            all(token.kind == token_kinds.dot for token in tokens[i:i + 3]) and
+            not tokens[i + 1].spaced and not tokens[i + 2].spaced)
+
+
+def is_paste(tokens, i):
+    """Return whether tokens[i] starts a `##` of two adjacent pound signs."""
+    return (i + 1 < len(tokens) and
+            tokens[i].kind == token_kinds.pound and
+            tokens[i + 1].kind == token_kinds.pound and
+            not tokens[i + 1].spaced)
+
+
+def copy_token(token, r):
+    """Return a copy of the given token with range r."""
+    copy = Token(token.kind, token.content, token.rep, r=r)
+    copy.spaced = token.spaced
+    return copy
+
+
+def stringize(arg, r):
+    """Return a string token with the spelling of the given argument."""
+    text = ""
+    for token, _ in arg:
+        if text and token.spaced:
+            text += " "
+        text += str(token)
+
+    chars = [ord(c) for c in text] + [0]
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    return Token(token_kinds.string, chars, f'"{escaped}"', r=r)
 
-    return processed + tokens[i:]
 
+def paste(left, right, r):
+    """Return the token formed by pasting the spellings of left and right."""
+    text = str(left) + str(right)
+    issues = len(error_collector.issues)
+    tokens = lexer.tokenize(text, r.start.file)
+    if len(tokens) != 1 or len(error_collector.issues) != issues:
+        error_collector.truncate(issues)
+        raise CompilerError(
+            f"pasting '{left}' and '{right}' does not give a valid token", r)
 
-def read_file(include_file, this_file):
-    """Read the text of the given include file.
+    token = copy_token(tokens[0], r)
+    token.spaced = left.spaced
+    return token
+
+
+def find_file(include_file, this_file):
+    """Return the path of the given include file.
 
     include_file - the header name, including opening and closing quotes or
     angle brackets.
     this_file - location of the current file being preprocessed. used for
     locating quoted headers.
     """
-
     if include_file[0] == '"':
-        path = pathlib.Path(this_file).parent.joinpath(include_file[1:-1])
+        return os.path.join(os.path.dirname(this_file), include_file[1:-1])
     else:  # path is an include file
-        path = pathlib.Path(__file__).parent\
-            .joinpath("include").joinpath(include_file[1:-1])
+        return os.path.join(os.path.dirname(__file__), "include",
+                            include_file[1:-1])
+
+
+def read_header(path, resolved):
+    """Return the tokens of the given header and the macro that guards it.
+
+    The tokens are taken from the header cache if the file did not change
+    since it was lexed.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    cached = header_cache.get(resolved)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    with open(path) as file:
+        text = file.read()
+
+    errors = len(error_collector.issues)
+    tokens = lexer.tokenize(text, path)
+    guard = find_include_guard(tokens)
+
+    # Do not cache a header with lexer errors, so they are reported again.
+    if len(error_collector.issues) == errors:
+        header_cache[resolved] = (mtime, tokens, guard)
+    return tokens, guard
+
+
+def find_include_guard(tokens):
+    """Return the name of the macro that guards the given header, or None.
+
+    A header is guarded if it starts with `#ifndef NAME` and the matching
+    #endif is the last line of the header.
+    """
+    if not (len(tokens) >= 3 and tokens[0].kind == token_kinds.pound and
+            tokens[1].content == "ifndef" and
+            tokens[2].kind == token_kinds.identifier):
+        return None
+
+    depth = 0
+    for i, token in enumerate(tokens):
+        if not (token.bol and token.kind == token_kinds.pound and
+                i + 1 < len(tokens) and not tokens[i + 1].bol):
+            continue
+
+        name = tokens[i + 1].content
+        if name in ("if", "ifdef", "ifndef"):
+            depth += 1
+        elif name == "endif":
+            depth -= 1
+            if depth == 0:
+                rest = tokens[i + 2:]
+                if all(not t.bol for t in rest):
+                    return tokens[2].content
+                return None
 
-    with open(str(path)) as file:
-        return file.read(), str(path)
+    return None
@@ -0,0 +1,79 @@
+"""Table of names bound in nested scopes.
+
+Both the parser's typedef table and the IL generation symbol table use
+this to find the innermost binding of a name.
+
+"""
+
+
+class ScopedTable:
+    """Table mapping names to values, where each binding is in a scope.
+
+    Rather than one dictionary per scope that a lookup searches from the
+    innermost scope outwards, the table keeps a single dictionary from each
+    name to a stack of its bindings, with the innermost binding last. So a
+    lookup is one dictionary access, however deeply the scopes are nested.
+
+    Each scope also keeps a dictionary of the names bound in it, which is
+    used to pop their bindings when the scope ends. Ending a scope therefore
+    takes time proportional to the number of names bound in that scope.
+
+    bindings (Dict(str -> List)) - Stack of values bound to each name.
+    scopes (List[Dict(str -> value)]) - Names bound in each scope, and the
+    value each is bound to, from the outermost scope to the innermost.
+    """
+
+    def __init__(self):
+        """Initialize the table with a single scope and no bindings."""
+        self.bindings = {}
+        self.scopes = []
+        self.new_scope()
+
+    def new_scope(self):
+        """Start a new innermost scope."""
+        self.scopes.append({})
+
+    def end_scope(self):
+        """End the innermost scope and remove the bindings made in it.
+
+        return (Dict(str -> value)) - The bindings made in the scope.
+        """
+        scope = self.scopes.pop()
+        for name in scope:
+            stack = self.bindings[name]
+            stack.pop()
+            if not stack:
+                del self.bindings[name]
+        return scope
+
+    def lookup(self, name, default=None):
+        """Return the innermost value bound to name, or default if unbound."""
+        stack = self.bindings.get(name)
+        return stack[-1] if stack else default
+
+    def lookup_local(self, name, default=None):
+        """Return the value bound to name in the innermost scope.
+
+        Returns default if name is not bound in the innermost scope.
+        """
+        return self.scopes[-1].get(name, default)
+
+    def bind(self, name, value):
+        """Bind name to value in the innermost scope.
+
+        This replaces any binding of name already in the innermost scope.
+        """
+        scope = self.scopes[-1]
+        if name in scope:
+            self.bindings[name][-1] = value
+        else:
+            self.bindings.setdefault(name, []).append(value)
+        scope[name] = value
+
+    def unbind(self, name):
+        """Remove the binding of name in the innermost scope."""
+        del self.scopes[-1][name]
+        stack = self.bindings[name]
+        stack.pop()
+        if not stack:
+            del self.bindings[name]
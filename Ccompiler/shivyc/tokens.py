@@ -4,6 +4,9 @@ A TokenKind instance represents one of the kinds of tokens recognized (see
 token_kinds.py). A Token instance represents a token as produced by the lexer.
 
 """
+import sys
+
+from shivyc.errors import SourceRange
 
 
 class TokenKind:
@@ -38,6 +41,10 @@ class TokenKind:
 class Token:
     """Single unit element of the input as produced by the tokenizer.
 
+    Tokens are created in large numbers, so they have no instance dictionary
+    and keep only the offsets of their range in the source. The Range itself
+    is built when it is asked for.
+
     kind (TokenKind) - Kind of this token.
 
     content - Additional content about some tokens. For number tokens,
@@ -46,16 +53,40 @@ class Token:
     rep (str) - The string representation of this token. If not provided, the
     content parameter is used.
     r (Range) - Range of positions that this token covers.
+    bol (bool) - Whether this token is the first on its line.
+    spaced (bool) - Whether this token is preceded by whitespace.
 
     """
 
+    __slots__ = ("kind", "content", "rep", "bol", "spaced", "_range",
+                 "_source", "_start", "_end")
+
     def __init__(self, kind, content="", rep="", r=None):
         """Initialize this token."""
         self.kind = kind
 
         self.content = content if content else str(self.kind)
+        if isinstance(self.content, str):
+            self.content = sys.intern(self.content)
         self.rep = rep
-        self.r = r
+        self.bol = False
+        self.spaced = False
+
+        if isinstance(r, SourceRange):
+            self._range = None
+            self._source = r.source
+            self._start = r.start_offset
+            self._end = r.end_offset
+        else:
+            self._range = r
+            self._source = None
+
+    @property
+    def r(self):
+        """Return the Range of positions that this token covers."""
+        if self._source is None:
+            return self._range
+        return SourceRange(self._source, self._start, self._end)
 
     def __repr__(self):  # pragma: no cover
         return self.content
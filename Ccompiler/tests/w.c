@@ -0,0 +1,72 @@
+// Calls with many values live across them, so that the arguments of a
+// call are in each other's argument registers
+
+int helper(int a, int b)
+{
+	return a * 3 + b;
+}
+
+int helper3(int a, int b, int c)
+{
+	return a + b * 2 + c * 5;
+}
+
+int main()
+{
+	int v0 = 15;
+	int v1 = 42;
+	int v2 = 48;
+	int v3 = 1;
+	int v4 = 38;
+	int v5 = 29;
+	int v6 = 34;
+	int v7 = 33;
+	int v8 = 15;
+	int v9 = 35;
+	int v10 = 50;
+	int v11 = 50;
+	int v12 = 9;
+	int v13 = 10;
+	int v14 = 25;
+	int v15 = 23;
+
+	v4 = helper3(v12, v9, v13);
+	v2 = helper3(v7, v14, v0);
+	v6 = helper(v1, v7);
+	v9 = helper3(v13, v15, v11);
+	v6 = helper3(v1, v14, v7);
+	v14 = v11 + v12;
+	v0 = helper(v10, v8);
+	v0 = helper(v7, v8);
+	v15 = helper(v14, v10);
+	v9 = helper(v3, v4);
+	v15 = helper3(v9, v1, v11);
+	v3 = helper(v13, v7);
+	v8 = helper(v7, v8);
+	v6 = helper3(v6, v2, v3);
+	v6 = helper(v13, v0);
+	v10 = v3 + v15;
+	v12 = v6 + v8;
+	v5 = v13 + v12;
+	v5 = helper3(v15, v3, v1);
+
+	int sum = v0 + v1 + v2 + v3 + v4 + v5 + v6 + v7 + v8 + v9 + v10 + v11 + v12 + v13 + v14 + v15;
+
+	return sum - 3000; //3103 - 3000 = 103
+}
+
+void int1()
+{
+}
+
+void int2()
+{
+}
+
+void int3()
+{
+}
+
+void int4()
+{
+}